@@ -0,0 +1,169 @@
+import json
+import os
+import sqlite3
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+
+from sqlalchemy.dialects import mysql, postgresql
+
+from vantage6.algorithm.tools import wrappers
+from vantage6.algorithm.tools.decorators import data
+from vantage6.algorithm.tools.wrappers import get_column_names, load_data
+
+DATA = 'column1,column2\n1,2\n3,4\n'
+SAMPLE_DF = pd.DataFrame([[1, 2]], columns=['column1', 'column2'])
+
+
+def test_csv_column_names_read_from_header(tmp_path: Path):
+    db_file = tmp_path / 'columns.csv'
+    db_file.write_text(DATA)
+
+    with patch.object(wrappers.pd, 'read_csv',
+                      wraps=pd.read_csv) as read_csv:
+        assert get_column_names(str(db_file), 'csv') == \
+            ['column1', 'column2']
+    assert read_csv.call_args.kwargs['nrows'] == 0
+
+
+def test_csv_column_names_cached_until_file_changes(tmp_path: Path):
+    db_file = tmp_path / 'cached.csv'
+    db_file.write_text(DATA)
+
+    with patch.object(wrappers, 'read_csv_columns',
+                      wraps=wrappers.read_csv_columns) as read_columns:
+        assert get_column_names(str(db_file), 'csv') == \
+            ['column1', 'column2']
+        assert get_column_names(str(db_file), 'csv') == \
+            ['column1', 'column2']
+        assert read_columns.call_count == 1
+
+        db_file.write_text('column1,column2,column3\n1,2,3\n')
+        stat = db_file.stat()
+        os.utime(db_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert get_column_names(str(db_file), 'csv') == \
+            ['column1', 'column2', 'column3']
+        assert read_columns.call_count == 2
+
+
+def test_sql_column_names_read_without_rows():
+    connection = sqlite3.connect(':memory:')
+    connection.execute('CREATE TABLE data (column1, column2)')
+    connection.execute('INSERT INTO data VALUES (1, 2)')
+
+    with patch.object(wrappers.pd, 'read_sql',
+                      wraps=pd.read_sql) as read_sql:
+        assert get_column_names(
+            connection, 'sql', query='SELECT column2 FROM data;'
+        ) == ['column2']
+    assert 'LIMIT 0' in read_sql.call_args.args[0]
+
+
+def test_csv_loads_only_requested_columns_and_rows(tmp_path: Path):
+    db_file = tmp_path / 'projection.csv'
+    db_file.write_text('column1,column2,column3\n1,2,3\n4,5,6\n7,8,9\n')
+
+    with patch.object(wrappers.pd, 'read_csv',
+                      wraps=pd.read_csv) as read_csv:
+        df = load_data(str(db_file), 'csv', columns=['column3'],
+                       filters=[['column1', '>', 1], ['column2', '!=', 8]])
+
+    assert read_csv.call_args.kwargs['usecols'] == ['column3', 'column1',
+                                                   'column2']
+    assert df.columns.tolist() == ['column3']
+    assert df['column3'].tolist() == [6]
+
+
+def test_csv_column_types_do_not_depend_on_selection(tmp_path: Path):
+    db_file = tmp_path / 'types.csv'
+    db_file.write_text('number,text,date,missing\n'
+                       '1,a,2020-01-01,\n'
+                       '2,,2020-01-02,NA\n')
+    columns = ['number', 'text', 'date', 'missing']
+
+    all_columns = load_data(str(db_file), 'csv')
+    selected = load_data(str(db_file), 'csv', columns=columns)
+
+    pd.testing.assert_series_equal(selected.dtypes, all_columns.dtypes)
+    pd.testing.assert_frame_equal(selected, all_columns)
+
+
+def test_sql_selects_only_requested_columns():
+    connection = sqlite3.connect(':memory:')
+    connection.execute('CREATE TABLE data (column1, column2)')
+    connection.executemany('INSERT INTO data VALUES (?, ?)', [(1, 2), (3, 4)])
+
+    df = load_data(connection, 'sql', query='SELECT * FROM data',
+                   columns=['column2'], filters=[['column1', 'in', [3]]])
+
+    assert df.columns.tolist() == ['column2']
+    assert df['column2'].tolist() == [4]
+
+
+def test_sql_column_names_quoted_for_dialect():
+    query = 'SELECT * FROM data;'
+    columns = ['age', 'Weight', 'order']
+
+    # double quotes are string literals in MySQL by default
+    assert wrappers._select_columns(query, columns, mysql.dialect()) == \
+        'SELECT age, `Weight`, `order` FROM (SELECT * FROM data) ' \
+        'selected_columns'
+    assert wrappers._select_columns(query, columns, postgresql.dialect()) \
+        == 'SELECT age, "Weight", "order" FROM (SELECT * FROM data) ' \
+        'selected_columns'
+
+
+def test_sql_columns_selected_after_query_without_dialect():
+    connection = sqlite3.connect(':memory:')
+    connection.execute('CREATE TABLE data (column1, column2)')
+    connection.execute('INSERT INTO data VALUES (1, 2)')
+
+    with patch.object(wrappers, 'sqlalchemy', None):
+        df = load_data(connection, 'sql', query='SELECT * FROM data',
+                       columns=['column2'])
+
+    assert df.columns.tolist() == ['column2']
+    assert df['column2'].tolist() == [2]
+
+
+def test_data_decorator_combines_columns_and_filters(tmp_path: Path):
+    db_file = tmp_path / 'decorator.csv'
+    db_file.write_text('column1,column2,column3\n1,2,3\n4,5,6\n')
+    environ = {
+        'USER_REQUESTED_DATABASE_LABELS': 'default',
+        'DEFAULT_DATABASE_URI': str(db_file),
+        'DEFAULT_DATABASE_TYPE': 'csv',
+        'DEFAULT_COLUMNS': json.dumps(['column2']),
+        'DEFAULT_FILTERS': json.dumps([['column3', '>', 3]]),
+    }
+
+    @data(columns=['column1'], filters=[['column1', '>=', 1]])
+    def algorithm(df: pd.DataFrame) -> pd.DataFrame:
+        return df
+
+    with patch.dict(os.environ, environ):
+        df = algorithm()
+
+    assert df.columns.tolist() == ['column1', 'column2']
+    assert df.to_dict('list') == {'column1': [4], 'column2': [5]}
+
+
+def test_data_decorator_prefers_converted_database(tmp_path: Path):
+    environ = {
+        'USER_REQUESTED_DATABASE_LABELS': 'default',
+        'DEFAULT_DATABASE_URI': str(tmp_path / 'original.csv'),
+        'DEFAULT_DATABASE_TYPE': 'csv',
+        'DEFAULT_DATABASE_CACHE_URI': '/mnt/dataset-cache/default.parquet',
+    }
+
+    @data()
+    def algorithm(df: pd.DataFrame) -> pd.DataFrame:
+        return df
+
+    with patch.dict(os.environ, environ), \
+            patch('vantage6.algorithm.tools.decorators.load_data',
+                  return_value=SAMPLE_DF) as load:
+        assert algorithm() is SAMPLE_DF
+    load.assert_called_once_with('/mnt/dataset-cache/default.parquet',
+                                 'parquet', columns=None, filters=[])
@@ -1,3 +1,4 @@
+import io
 import jwt
 import json as json_lib
 import time
@@ -83,6 +84,24 @@ class AlgorithmClient(ClientBase):
         """
         return super().request(*args, **kwargs, retry=False)
 
+    def download(self, *args, **kwargs) -> bool:
+        """
+        Download binary data from the central server. This overwrites the
+        parent function so that containers will not try to refresh their
+        token, which they would be unable to do.
+
+        Parameters
+        ----------
+        *args, **kwargs
+            Arguments passed to the parent ClientBase.download function.
+
+        Returns
+        -------
+        bool
+            Whether the download succeeded.
+        """
+        return super().download(*args, **kwargs, retry=False)
+
     def authenticate(self, credentials: dict = None, path: str = None) -> None:
         """
         Overwrite base authenticate function to prevent algorithm containers
@@ -145,40 +164,6 @@ class AlgorithmClient(ClientBase):
 
         return self.result.from_task(task_id)
 
-    def _multi_page_request(self, endpoint: str, params: dict = None) -> dict:
-        """
-        Make multiple requests to the central server to get all pages of a list
-        of results.
-
-        Parameters
-        ----------
-        endpoint: str
-            Endpoint to which the request should be made.
-        params: dict
-            Parameters to be passed to the request.
-
-        Returns
-        -------
-        dict
-            Response from the central server.
-        """
-        if params is None:
-            params = {}
-        # get first page
-        page = 1
-        params["page"] = page
-        response = self.request(endpoint, params=params)
-
-        # append next pages (if any)
-        links = response.get("links")
-        while links and links.get("next"):
-            page += 1
-            params["page"] = page
-            response["data"] += self.request(endpoint, params=params)["data"]
-            links = response.get("links")
-
-        return response['data']
-
     class Run(ClientBase.SubClient):
         """
         Algorithm Run client for the algorithm container.
@@ -252,6 +237,13 @@ class AlgorithmClient(ClientBase):
             Any
                 Result of the algorithm run.
             """
+            # Try to obtain the result in binary format first, which is faster
+            # for large results. The proxy server decrypts it.
+            data = io.BytesIO()
+            if self.parent.download(f"run/{id_}/result", data):
+                self.parent.log.info('--> Attempting to decode results!')
+                return json_lib.loads(data.getvalue().decode())
+
             response = self.parent.request(f"result/{id_}")
 
             # Encryption is not done at the client level for the container. The
@@ -113,7 +113,8 @@ def _algorithm_client() -> callable:
 algorithm_client = _algorithm_client()
 
 
-def data(number_of_databases: int = 1) -> callable:
+def data(number_of_databases: int = 1, columns: list[str] = None,
+         filters: list[list] = None) -> callable:
     """
     Decorator that adds algorithm data to a function
 
@@ -134,6 +135,14 @@ def data(number_of_databases: int = 1) -> callable:
     number_of_databases: int
         Number of data sources to load. These will be loaded in order by which
         the user provided them. Default is 1.
+    columns: list[str]
+        Columns that the algorithm uses. Only these columns, and the columns
+        that the user requests in the task, are loaded. By default, all
+        columns are loaded.
+    filters: list[list]
+        Conditions as ``[column, operator, value]`` that the rows to load
+        must all satisfy, in addition to the filters that the user provides
+        in the task. See :func:`vantage6.algorithm.tools.wrappers.load_data`.
 
     Returns
     -------
@@ -146,6 +155,11 @@ def data(number_of_databases: int = 1) -> callable:
     >>> def my_algorithm(first_df: pd.DataFrame, second_df: pd.DataFrame,
     >>>                  <other arguments>):
     >>>     pass
+
+    To load only the columns that the algorithm uses:
+    >>> @data(columns=['age', 'weight'], filters=[['age', '>=', 18]])
+    >>> def my_algorithm(df: pd.DataFrame, <other arguments>):
+    >>>     pass
     """
     def protection_decorator(func: callable, *args, **kwargs) -> callable:
         @wraps(func)
@@ -180,7 +194,7 @@ def data(number_of_databases: int = 1) -> callable:
                 label = labels[i]
                 # read the data from the database
                 info("Reading data from database")
-                data_ = _get_data_from_label(label)
+                data_ = _get_data_from_label(label, columns, filters)
 
                 # do any data preprocessing here
                 info(f"Applying preprocessing for database '{label}'")
@@ -426,7 +440,8 @@ def _check_environment_var_exists_or_exit(var: str):
         exit(1)
 
 
-def _get_data_from_label(label: str) -> pd.DataFrame:
+def _get_data_from_label(label: str, columns: list[str] = None,
+                         filters: list[list] = None) -> pd.DataFrame:
     """
     Load data from a database based on the label
 
@@ -434,6 +449,13 @@ def _get_data_from_label(label: str) -> pd.DataFrame:
     ----------
     label : str
         Label of the database to load
+    columns : list[str]
+        Columns that the algorithm uses. They are loaded together with the
+        columns that the user requested in the task. If neither are given,
+        all columns are loaded.
+    filters : list[list]
+        Filters of the algorithm. The rows must satisfy these and the filters
+        that the user provided in the task.
 
     Returns
     -------
@@ -449,13 +471,43 @@ def _get_data_from_label(label: str) -> pd.DataFrame:
     database_type = os.environ.get(
         f"{label.upper()}_DATABASE_TYPE", "csv").lower()
 
+    # Combine the columns and filters of the algorithm with those that the
+    # user requested in the task
+    user_columns = json.loads(os.environ.get(f"{label.upper()}_COLUMNS",
+                                             "null"))
+    if columns and user_columns:
+        columns = list(dict.fromkeys(columns + user_columns))
+    elif user_columns:
+        columns = user_columns
+    filters = (filters or []) + json.loads(
+        os.environ.get(f"{label.upper()}_FILTERS", "[]")
+    )
+
+    # The node may provide a copy of the database that it converted to
+    # parquet, which is much faster to read. Excel databases are converted
+    # from their first sheet only.
+    sheet_name = os.environ.get(f"{label.upper()}_SHEET_NAME")
+    cache_uri = os.environ.get(f"{label.upper()}_DATABASE_CACHE_URI")
+    if cache_uri and not sheet_name:
+        try:
+            df = load_data(cache_uri, "parquet", columns=columns,
+                           filters=filters)
+            info(f"Using the copy of '{label}' that the node converted to "
+                 "parquet")
+            return df
+        except ImportError:
+            warn("Cannot read the converted copy of the database without "
+                 "pyarrow. Reading the original database instead.")
+
     # Load the data based on the database type. Try to provide environment
     # variables that should be available for some data types.
     return load_data(
         database_uri,
         database_type,
         query=os.environ.get(f"{label.upper()}_QUERY"),
-        sheet_name=os.environ.get(f"{label.upper()}_SHEET_NAME")
+        sheet_name=sheet_name,
+        columns=columns,
+        filters=filters
     )
 
 
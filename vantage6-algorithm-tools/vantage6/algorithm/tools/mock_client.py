@@ -37,6 +37,9 @@ class MockAlgorithmClient:
         - sheet_name: str (optional for Excel databases)
         - preprocessing: dict (optional, see the documentation for
             preprocessing for more information)
+        - columns: list[str] (optional, columns to load)
+        - filters: list[list] (optional, conditions that the rows to load
+            must satisfy, see `load_data`)
 
         Note that if the database is a pandas DataFrame, the type and
         input_data keys are not required.
@@ -106,7 +109,9 @@ class MockAlgorithmClient:
                         database_uri=dataset.get("database"),
                         db_type=dataset.get("db_type"),
                         query=dataset.get("query"),
-                        sheet_name=dataset.get("sheet_name")
+                        sheet_name=dataset.get("sheet_name"),
+                        columns=dataset.get("columns"),
+                        filters=dataset.get("filters")
                     )
                 df = preprocess_data(df, dataset.get("preprocessing", []))
                 org_data.append(df)
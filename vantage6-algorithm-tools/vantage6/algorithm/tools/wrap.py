@@ -28,6 +28,9 @@ def wrap_algorithm(module: str, log_traceback: bool = True) -> None:
     - ``<DB_LABEL>_DATABASE_URI``: uri of the each of the databases that
       the user requested, where ``<DB_LABEL>`` is the label of the
       database given in ``USER_REQUESTED_DATABASE_LABELS``.
+    - ``<DB_LABEL>_DATABASE_CACHE_URI``: optional, location of a copy of a
+      csv or excel database that the node converted to parquet. It is read
+      instead of the original database if it is available.
 
     The wrapper expects the input file to be a json file. Any other file
     format will result in an error.
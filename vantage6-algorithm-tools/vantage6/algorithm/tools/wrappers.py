@@ -17,6 +17,10 @@ by the vantage6 node based on its configuration file.
 """
 from __future__ import annotations
 import io
+import operator
+import os
+import sqlite3
+import threading
 import pandas as pd
 from enum import Enum
 
@@ -24,8 +28,41 @@ from SPARQLWrapper import SPARQLWrapper, CSV
 
 from vantage6.algorithm.tools.util import info, error
 
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+try:
+    import sqlalchemy
+    from sqlalchemy.engine import Dialect
+except ImportError:
+    sqlalchemy = None
+
 _SPARQL_RETURN_FORMAT = CSV
 
+# Column names of file databases, by the arguments of `get_column_names`.
+# Every entry holds the modification time and size of the file at the time
+# the column names were read, so that changes to the file are noticed. The
+# cache only lives in the current process: it serves repeated calls of the
+# node, but every algorithm container starts with an empty cache.
+_COLUMN_CACHE: dict[tuple, tuple[int, int, list[str]]] = {}
+_COLUMN_CACHE_LOCK = threading.Lock()
+
+# Operators that can be used in the filters of `load_data`. These are the
+# operators that pyarrow supports to filter parquet files.
+_FILTER_OPERATORS = {
+    '=': operator.eq,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    'in': lambda column, values: column.isin(values),
+    'not in': lambda column, values: ~column.isin(values),
+}
+
 
 class DatabaseType(str, Enum):
     """
@@ -55,7 +92,8 @@ class DatabaseType(str, Enum):
 
 
 def load_data(database_uri: str, db_type: str = None, query: str = None,
-              sheet_name: str = None) -> pd.DataFrame:
+              sheet_name: str = None, columns: list[str] = None,
+              filters: list[list] = None) -> pd.DataFrame:
     """
     Read data from database and give it back to the algorithm.
 
@@ -76,6 +114,16 @@ def load_data(database_uri: str, db_type: str = None, query: str = None,
     sheet_name : str
         The sheet name to read from the Excel file. This is optional and
         only for Excel databases.
+    columns : list[str]
+        The columns to load. This is optional, by default all columns are
+        loaded. Only these columns are read from parquet, csv and excel files,
+        and only these columns are selected from SQL databases.
+    filters : list[list]
+        Conditions that the rows to load must all satisfy, as
+        ``[column, operator, value]``, e.g. ``['age', '>=', 18]``. The
+        operators are ``=``, ``==``, ``!=``, ``<``, ``<=``, ``>``, ``>=``,
+        ``in`` and ``not in``. This is optional. Row groups of parquet files
+        that do not satisfy the conditions are not read at all.
 
     Returns
     -------
@@ -92,19 +140,83 @@ def load_data(database_uri: str, db_type: str = None, query: str = None,
         info(f"Available database types: {', '.join(DatabaseType)}")
         exit(1)
 
+    filters = _validate_filters(filters)
+    # the columns of the filters are needed as well to filter the rows
+    columns_to_read = list(dict.fromkeys(
+        columns + [column for column, _, _ in filters]
+    )) if columns else None
+
     if db_type == DatabaseType.EXCEL:
-        df = loader(database_uri, sheet_name=sheet_name)
-    elif db_type in (DatabaseType.SQL, DatabaseType.SPARQL):
+        df = loader(database_uri, sheet_name=sheet_name,
+                    columns=columns_to_read)
+    elif db_type in (DatabaseType.SQL, DatabaseType.SPARQL,
+                     DatabaseType.OMOP):
         if not query:
             error(f"Query is required for database type '{db_type}'")
             exit(1)
-        df = loader(database_uri, query=query)
+        df = loader(database_uri, query=query, columns=columns_to_read)
+    elif db_type == DatabaseType.PARQUET:
+        df = loader(database_uri, columns=columns_to_read, filters=filters)
     else:
-        df = loader(database_uri)
+        df = loader(database_uri, columns=columns_to_read)
+
+    if filters and not (db_type == DatabaseType.PARQUET and pq is not None):
+        df = _apply_filters(df, filters)
+    if columns:
+        df = df[columns]
 
     return df
 
 
+def _validate_filters(filters: list[list] | None) -> list[tuple]:
+    """
+    Check that the filters are valid, and exit the algorithm if not.
+
+    Parameters
+    ----------
+    filters : list[list] | None
+        Filters as ``[column, operator, value]``
+
+    Returns
+    -------
+    list[tuple]
+        The filters as tuples ``(column, operator, value)``
+    """
+    if not filters:
+        return []
+    valid_filters = []
+    for filter_ in filters:
+        if len(filter_) != 3 or filter_[1] not in _FILTER_OPERATORS:
+            error(f"Invalid filter {filter_}. A filter should be "
+                  "[column, operator, value], with operator one of "
+                  f"{', '.join(_FILTER_OPERATORS)}")
+            exit(1)
+        valid_filters.append(tuple(filter_))
+    return valid_filters
+
+
+def _apply_filters(df: pd.DataFrame, filters: list[tuple]) -> pd.DataFrame:
+    """
+    Select the rows of a dataframe that satisfy all filters.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The data to filter
+    filters : list[tuple]
+        Filters as ``(column, operator, value)``
+
+    Returns
+    -------
+    pd.DataFrame
+        The rows that satisfy all filters
+    """
+    mask = pd.Series(True, index=df.index)
+    for column, operator_, value in filters:
+        mask &= _FILTER_OPERATORS[operator_](df[column], value)
+    return df[mask]
+
+
 def get_column_names(database_uri: str, db_type: str = None, query: str = None,
                      sheet_name: str = None) -> list[str]:
     """
@@ -128,9 +240,157 @@ def get_column_names(database_uri: str, db_type: str = None, query: str = None,
     -------
     list[str]
         The column names of the dataframe
+
+    Notes
+    -----
+    Only the header or the metadata of the database is read, except for
+    SparQL databases, of which the query result is loaded entirely. Within a
+    process, the column names of files are cached until the modification
+    time or size of the file changes. Requests for the columns from the
+    `/column` endpoint of the server run in a new algorithm container each
+    time, so they read the header or metadata again.
+    """
+    reader = _select_column_reader(db_type)
+    if not reader:
+        df = load_data(database_uri, db_type, query, sheet_name)
+        return df.columns.tolist()
+
+    if db_type in (DatabaseType.SQL, DatabaseType.OMOP):
+        if not query:
+            error(f"Query is required for database type '{db_type}'")
+            exit(1)
+        return reader(database_uri, query=query)
+
+    key = (str(database_uri), db_type, sheet_name)
+    stat = os.stat(database_uri)
+    with _COLUMN_CACHE_LOCK:
+        cached = _COLUMN_CACHE.get(key)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return list(cached[2])
+
+    if db_type == DatabaseType.EXCEL:
+        columns = reader(database_uri, sheet_name=sheet_name)
+    else:
+        columns = reader(database_uri)
+    with _COLUMN_CACHE_LOCK:
+        _COLUMN_CACHE[key] = (stat.st_mtime_ns, stat.st_size, columns)
+    return list(columns)
+
+
+def _select_column_reader(database_type: str) -> callable | None:
     """
-    df = load_data(database_uri, db_type, query, sheet_name)
-    return df.columns.tolist()
+    Select the function that reads only the column names of a database.
+
+    Parameters
+    ----------
+    database_type : str
+        The database type to select the reader for.
+
+    Returns
+    -------
+    callable | None
+        The reader for the specified database type. None if the column names
+        of the database type cannot be read without loading the data.
+    """
+    if database_type == "csv":
+        return read_csv_columns
+    elif database_type == "excel":
+        return read_excel_columns
+    elif database_type == "parquet":
+        return read_parquet_columns
+    elif database_type in ("sql", "omop"):
+        return read_sql_columns
+    else:
+        return None
+
+
+def read_csv_columns(database_uri: str) -> list[str]:
+    """
+    Read the column names from the header of a csv file.
+
+    Parameters
+    ----------
+    database_uri : str
+        URI of the csv file, supplied by the node
+
+    Returns
+    -------
+    list[str]
+        The column names
+    """
+    return pd.read_csv(database_uri, nrows=0).columns.tolist()
+
+
+def read_excel_columns(database_uri: str, sheet_name: str = None) \
+        -> list[str]:
+    """
+    Read the column names from the header row of an excel sheet.
+
+    Parameters
+    ----------
+    database_uri : str
+        URI of the excel file, supplied by the node
+    sheet_name : str | None
+        Sheet name to be read from the excel file. If None, the first sheet
+        is read.
+
+    Returns
+    -------
+    list[str]
+        The column names
+    """
+    return pd.read_excel(
+        database_uri, sheet_name=sheet_name or 0, nrows=0
+    ).columns.tolist()
+
+
+def read_parquet_columns(database_uri: str) -> list[str]:
+    """
+    Read the column names from the metadata in the footer of a parquet file.
+
+    Columns that pandas stores as the index of the dataframe are left out,
+    as they are not columns of the dataframe that is loaded. If `pyarrow` is
+    not installed, the entire file is loaded instead.
+
+    Parameters
+    ----------
+    database_uri : str
+        URI of the parquet file, supplied by the node
+
+    Returns
+    -------
+    list[str]
+        The column names
+    """
+    if pq is None:
+        # without pyarrow, the metadata cannot be read separately
+        return load_parquet_data(database_uri).columns.tolist()
+    schema = pq.read_schema(database_uri)
+    index_columns = (schema.pandas_metadata or {}).get('index_columns', [])
+    return [name for name in schema.names if name not in index_columns]
+
+
+def read_sql_columns(database_uri: str, query: str) -> list[str]:
+    """
+    Read the column names of the result of a query, without retrieving any
+    rows.
+
+    Parameters
+    ----------
+    database_uri : str
+        URI of the sql database, supplied by the node
+    query: str
+        Query to retrieve the data from the database
+
+    Returns
+    -------
+    list[str]
+        The column names
+    """
+    query = query.strip().rstrip(';')
+    return pd.read_sql(
+        f"SELECT * FROM ({query}) AS columns_query LIMIT 0", database_uri
+    ).columns.tolist()
 
 
 def _select_loader(database_type: str) -> callable | None:
@@ -165,7 +425,8 @@ def _select_loader(database_type: str) -> callable | None:
 
 
 
-def load_csv_data(database_uri: str) -> pd.DataFrame:
+def load_csv_data(database_uri: str, columns: list[str] = None) \
+        -> pd.DataFrame:
     """
     Load the local privacy-sensitive data from the database.
 
@@ -173,16 +434,20 @@ def load_csv_data(database_uri: str) -> pd.DataFrame:
     ----------
     database_uri : str
         URI of the csv file, supplied by te node
+    columns : list[str] | None
+        Columns to read. If None, all columns are read. Other columns are
+        skipped while parsing, so that their values are not converted.
 
     Returns
     -------
     pd.DataFrame
         The data from the csv file
     """
-    return pd.read_csv(database_uri)
+    return pd.read_csv(database_uri, usecols=columns)
 
 
-def load_excel_data(database_uri: str, sheet_name: str = None) -> pd.DataFrame:
+def load_excel_data(database_uri: str, sheet_name: str = None,
+                    columns: list[str] = None) -> pd.DataFrame:
     """
     Load the local privacy-sensitive data from the database.
 
@@ -193,6 +458,8 @@ def load_excel_data(database_uri: str, sheet_name: str = None) -> pd.DataFrame:
     sheet_name : str | None
         Sheet name to be read from the excel file. If None, the first sheet
         will be read.
+    columns : list[str] | None
+        Columns to read. If None, all columns are read.
 
     Returns
     -------
@@ -205,10 +472,11 @@ def load_excel_data(database_uri: str, sheet_name: str = None) -> pd.DataFrame:
         # The default sheet_name is 0, which is the first sheet
         sheet_name = 0
     # TODO add try/except to check if sheet_name exists
-    return pd.read_excel(database_uri, sheet_name=sheet_name)
+    return pd.read_excel(database_uri, sheet_name=sheet_name, usecols=columns)
 
 
-def load_sparql_data(database_uri: str, query: str) -> pd.DataFrame:
+def load_sparql_data(database_uri: str, query: str,
+                     columns: list[str] = None) -> pd.DataFrame:
     """
     Load the local privacy-sensitive data from the database.
 
@@ -218,6 +486,8 @@ def load_sparql_data(database_uri: str, query: str) -> pd.DataFrame:
         URI of the triplestore, supplied by te node
     query: str
         Query to retrieve the data from the triplestore
+    columns : list[str] | None
+        Columns to keep from the result. If None, all columns are kept.
 
     Returns
     -------
@@ -229,28 +499,43 @@ def load_sparql_data(database_uri: str, query: str) -> pd.DataFrame:
 
     result = sparql.query().convert().decode()
 
-    return pd.read_csv(io.StringIO(result))
+    return pd.read_csv(io.StringIO(result), usecols=columns)
 
 
-def load_parquet_data(database_uri: str) -> pd.DataFrame:
+def load_parquet_data(database_uri: str, columns: list[str] = None,
+                      filters: list[tuple] = None) -> pd.DataFrame:
     """
     Load the local privacy-sensitive data from the database.
 
+    If `pyarrow` is installed, the file is memory-mapped, only the requested
+    columns are read and row groups that do not satisfy the filters, according
+    to their statistics, are skipped.
+
     Parameters
     ----------
     database_uri : str
         URI of the parquet file, supplied by te node
+    columns : list[str] | None
+        Columns to read. If None, all columns are read.
+    filters : list[tuple] | None
+        Filters as ``(column, operator, value)`` that the rows to read must
+        all satisfy. Only used if `pyarrow` is installed.
 
     Returns
     -------
     pd.DataFrame
         The data from the parquet file
     """
-    return pd.read_parquet(database_uri)
+    if pq is None:
+        return pd.read_parquet(database_uri, columns=columns)
+    return pd.read_parquet(
+        database_uri, engine='pyarrow', columns=columns,
+        filters=filters or None, memory_map=True
+    )
 
 
-
-def load_sql_data(database_uri: str, query: str) -> pd.DataFrame:
+def load_sql_data(database_uri: str, query: str,
+                  columns: list[str] = None) -> pd.DataFrame:
     """
     Load the local privacy-sensitive data from the database.
 
@@ -260,17 +545,102 @@ def load_sql_data(database_uri: str, query: str) -> pd.DataFrame:
         URI of the sql database, supplied by te node
     query: str
         Query to retrieve the data from the database
+    columns : list[str] | None
+        Columns to select from the result of the query. If None, all columns
+        are selected.
 
     Returns
     -------
     pd.DataFrame
         The data from the database
     """
-    return pd.read_sql(database_uri, query)
+    return _read_sql_columns(query, database_uri, columns)
+
+
+def _read_sql_columns(query: str, database_uri: str,
+                      columns: list[str] | None) -> pd.DataFrame:
+    """
+    Run a query, and only return some of the columns of its result.
 
+    The columns are selected by the database if the column names can be
+    quoted for it. Otherwise, they are selected after the query has run.
+
+    Parameters
+    ----------
+    query: str
+        Query to retrieve the data from the database
+    database_uri : str
+        URI of the sql database, or a connection to it
+    columns : list[str] | None
+        Columns to select from the result of the query. If None, all columns
+        are selected.
+
+    Returns
+    -------
+    pd.DataFrame
+        The data from the database
+    """
+    if not columns:
+        return pd.read_sql(query, database_uri)
+    dialect = _sql_dialect(database_uri)
+    if dialect is None:
+        return pd.read_sql(query, database_uri)[columns]
+    return pd.read_sql(_select_columns(query, columns, dialect), database_uri)
+
+
+def _sql_dialect(database_uri) -> Dialect | None:
+    """
+    Get the SQLAlchemy dialect of a database.
+
+    Parameters
+    ----------
+    database_uri : str
+        URI of the sql database, or a connection to it
+
+    Returns
+    -------
+    Dialect | None
+        The dialect, or None if it cannot be determined
+    """
+    if sqlalchemy is None:
+        return None
+    if isinstance(database_uri, str):
+        # creating an engine does not connect to the database
+        return sqlalchemy.create_engine(database_uri).dialect
+    if isinstance(database_uri, sqlite3.Connection):
+        return sqlalchemy.create_engine('sqlite://').dialect
+    return getattr(database_uri, 'dialect', None)
+
+
+def _select_columns(query: str, columns: list[str], dialect: Dialect) -> str:
+    """
+    Wrap a query so that the database only returns some of its columns.
+
+    Parameters
+    ----------
+    query: str
+        Query to retrieve the data from the database
+    columns : list[str]
+        Columns to select
+    dialect : Dialect
+        SQLAlchemy dialect of the database
+
+    Returns
+    -------
+    str
+        The query that selects the columns
+    """
+    # quote the column names as identifiers of this database, e.g. with
+    # backticks for MySQL, where double quotes denote strings by default
+    quote = dialect.identifier_preparer.quote
+    selection = ', '.join(quote(column) for column in columns)
+    query = query.strip().rstrip(';')
+    # Oracle does not accept 'AS' before the alias of a subquery
+    return f"SELECT {selection} FROM ({query}) selected_columns"
 
 
-def load_omop_data(database_uri: str, query: str) -> pd.DataFrame:
+def load_omop_data(database_uri: str, query: str,
+                   columns: list[str] = None) -> pd.DataFrame:
     """
     Load the local privacy-sensitive data from the database.
 
@@ -280,6 +650,9 @@ def load_omop_data(database_uri: str, query: str) -> pd.DataFrame:
         URI of the OMOP database, supplied by te node
     query: str
         Query to retrieve the data from the database
+    columns : list[str] | None
+        Columns to select from the result of the query. If None, all columns
+        are selected.
 
     Returns
     -------
@@ -287,4 +660,4 @@ def load_omop_data(database_uri: str, query: str) -> pd.DataFrame:
         The data from the database
     """
     # TODO: replace query by OMOP json and convert to SQL
-    return pd.read_sql(database_uri, query)
+    return _read_sql_columns(query, database_uri, columns)
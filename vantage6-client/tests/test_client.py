@@ -5,6 +5,7 @@ from unittest import TestCase
 from unittest.mock import patch, MagicMock
 
 from vantage6.client import UserClient
+from vantage6.common.encryption import DummyCryptor
 from vantage6.common.globals import STRING_ENCODING
 
 # Mock server
@@ -38,6 +39,48 @@ class TestClient(TestCase):
 
         assert results == [{'result': {'some_key': 'some_value'}}]
 
+    def test_post_task_without_shared_input_support(self):
+        client = UserClient(HOST, PORT)
+        client.cryptor = DummyCryptor()
+        rejected = {'msg': 'Request body is incorrect',
+                    'errors': {'shared_input': ['Unknown field.']}}
+        created = {'id': FAKE_ID}
+
+        with patch.object(client, 'request',
+                          side_effect=[rejected, created]) as request, \
+                patch.object(client, 'get_public_keys',
+                             return_value={org: None
+                                           for org in ORGANIZATION_IDS}):
+            task = client.task.create(
+                name=TASK_NAME, image=TASK_IMAGE,
+                collaboration=COLLABORATION_ID,
+                organizations=ORGANIZATION_IDS, description='',
+                input_=SAMPLE_INPUT
+            )
+
+        self.assertEqual(task, created)
+        # the task is sent again with the input for each organization
+        post_content = request.call_args[1]['json']
+        self.assertNotIn('shared_input', post_content)
+        post_input = post_content['organizations'][0]['input']
+        self.assertEqual(base64.b64decode(post_input),
+                         b'{"method": "test-task"}')
+
+    def test_multi_page_request_fails_on_missing_page(self):
+        client = UserClient(HOST, PORT)
+        first_page = {'data': [{'id': 2}, {'id': 1}],
+                      'links': {'next': '/api/run?cursor=1'}}
+        failed_page = {'msg': 'Internal server error'}
+
+        with patch.object(client, 'request',
+                          side_effect=[first_page, failed_page]) as request:
+            with self.assertRaises(Exception) as context:
+                client._multi_page_request('run')
+
+        self.assertIn('Internal server error', str(context.exception))
+        # the second page is requested with the cursor of the next link
+        self.assertEqual(request.call_args[1]['params']['cursor'], '1')
+
     @staticmethod
     def post_task_on_mock_client(input_) -> dict[str, any]:
         mock_requests = MagicMock()
@@ -1,16 +1,24 @@
 from __future__ import annotations
 
+import io
 import logging
 import time
 import jwt
+import json as json_lib
 import pyfiglet
 import itertools
 import sys
 import traceback
 
 from pathlib import Path
-
-from vantage6.common.globals import APPNAME
+from tempfile import SpooledTemporaryFile
+
+from vantage6.common.globals import (
+    APPNAME,
+    STRING_ENCODING,
+    RESULT_SPOOL_MAX_SIZE,
+    BINARY_TRANSFER_MIN_SIZE
+)
 from vantage6.common.encryption import RSACryptor
 from vantage6.common import WhoAmI
 from vantage6.common.serialization import serialize
@@ -736,6 +744,9 @@ class UserClient(ClientBase):
             if not id_:
                 id_ = self.parent.whoami.organization_id
 
+            if public_key:
+                self.parent.public_keys.invalidate(id_)
+
             return self.parent.request(
                 f'organization/{id_}',
                 method='patch',
@@ -1220,7 +1231,9 @@ class UserClient(ClientBase):
                 Databases to be used at the node. Each dict should contain
                 at least a 'label' key. Additional keys are 'query' (if using
                 SQL/SPARQL databases), 'sheet_name' (if using Excel databases),
-                and 'preprocessing' information.
+                'preprocessing' information, 'columns' (the columns to load)
+                and 'filters' (conditions as [column, operator, value] that
+                the rows to load must satisfy).
 
             Returns
             -------
@@ -1244,26 +1257,90 @@ class UserClient(ClientBase):
             # Data will be serialized in JSON.
             serialized_input = serialize(input_)
 
-            # Encrypt the input per organization using that organization's
-            # public key.
-            organization_json_list = []
-            for org_id in organizations:
-                pub_key = self.parent.request(f"organization/{org_id}")\
-                    .get("public_key")
-                organization_json_list.append({
-                    "id": org_id,
-                    "input": self.parent.cryptor.encrypt_bytes_to_str(
-                        serialized_input, pub_key)
-                })
-
-            return self.parent.request('task', method='post', json={
+            # Encrypt the input once, and only encrypt the key it was encrypted
+            # with for each organization using that organization's public
+            # key. The server combines the shared input with the key of each
+            # organization. Large inputs are uploaded in binary format.
+            binary = len(serialized_input) >= BINARY_TRANSFER_MIN_SIZE
+            shared_input, encrypted_keys = self.parent.encrypt_envelope(
+                serialized_input, organizations,
+                collaboration_id=collaboration, binary=binary
+            )
+            organization_json_list = [
+                {"id": org_id, "input": encrypted_key}
+                for org_id, encrypted_key in zip(organizations, encrypted_keys)
+            ]
+
+            task = {
                 "name": name,
                 "image": image,
                 "collaboration_id": collaboration,
                 "description": description,
                 "organizations": organization_json_list,
                 'databases': databases
-            })
+            }
+            if binary:
+                response = self.parent.request(
+                    'task', method='post',
+                    form={'task': json_lib.dumps(task)},
+                    files={'shared_input': (
+                        'shared_input', shared_input,
+                        'application/octet-stream'
+                    )}
+                )
+            else:
+                response = self.parent.request(
+                    'task', method='post',
+                    json={**task, "shared_input": shared_input}
+                )
+            if not self._is_shared_input_rejected(response, binary):
+                return response
+
+            # Servers that do not support a shared input need the input to
+            # be encrypted for each organization separately
+            self.parent.log.warn(
+                "The server does not support a shared input. Encrypting the "
+                "input for each organization separately instead."
+            )
+            encrypted_inputs = self.parent.encrypt_per_organization(
+                [(org_id, serialized_input) for org_id in organizations],
+                collaboration_id=collaboration
+            )
+            task["organizations"] = [
+                {"id": org_id, "input": encrypted_input}
+                for org_id, encrypted_input
+                in zip(organizations, encrypted_inputs)
+            ]
+            return self.parent.request('task', method='post', json=task)
+
+        @staticmethod
+        def _is_shared_input_rejected(response: dict, binary: bool) -> bool:
+            """
+            Check if the server rejected a task because it does not support a
+            shared input.
+
+            Parameters
+            ----------
+            response : dict
+                Response of the server to the creation of the task
+            binary : bool
+                Whether the task was sent as `multipart/form-data` with the
+                shared input in binary format
+
+            Returns
+            -------
+            bool
+                True if the task should be sent again without shared input
+            """
+            if 'id' in response:
+                return False
+            # Older servers reject the unknown field in a JSON body, and
+            # cannot read a multipart body at all. In the latter case, the
+            # error is not one of the messages of the task endpoint itself.
+            errors = response.get('errors')
+            if isinstance(errors, dict) and 'shared_input' in errors:
+                return True
+            return binary and 'msg' not in response
 
         def delete(self, id_: int) -> dict:
             """Delete a task
@@ -1474,6 +1551,12 @@ class UserClient(ClientBase):
             """
             self.parent.log.info('--> Attempting to decrypt results!')
 
+            # try to download the result in binary format first, which is
+            # faster for large results
+            result = self._download_result(id_)
+            if result is not None:
+                return result
+
             result = self.parent.request(endpoint=f'result/{id_}')
             result = self._decrypt_result(
                 result_data=result, is_single_result=True
@@ -1481,6 +1564,35 @@ class UserClient(ClientBase):
 
             return result['result']
 
+        def _download_result(self, id_: int) -> str | bytes | None:
+            """
+            Download a result in binary format and decrypt it.
+
+            Parameters
+            ----------
+            id_ : int
+                id of the run of which to download the result
+
+            Returns
+            -------
+            str | bytes | None
+                The decrypted result, or None if it could not be downloaded
+                (e.g. because the run has no result yet, or because the
+                server does not support binary downloads)
+            """
+            with SpooledTemporaryFile(max_size=RESULT_SPOOL_MAX_SIZE) as data:
+                if not self.parent.download(f'run/{id_}/result', data):
+                    return None
+                data.seek(0)
+                result = io.BytesIO()
+                self.parent.cryptor.decrypt_stream(data, result, binary=True)
+            try:
+                return result.getvalue().decode(STRING_ENCODING)
+            except UnicodeDecodeError:
+                self.parent.log.error(
+                    "Failed to decode the result. Returning bytes object.")
+                return result.getvalue()
+
         def from_task(self, task_id: int):
             """
             Get all results from a specific task
@@ -1,15 +1,24 @@
 
+import io
 import logging
+import os
 import time
 import requests
 import json as json_lib
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from tempfile import SpooledTemporaryFile
+from typing import Any, BinaryIO
+from urllib.parse import parse_qs, urlparse
 
 from vantage6.common.exceptions import AuthenticationException
-from vantage6.common.encryption import RSACryptor, DummyCryptor
-from vantage6.common.globals import STRING_ENCODING
+from vantage6.common.encryption import (
+    RSACryptor, DummyCryptor, STREAM_CHUNK_SIZE
+)
+from vantage6.common.globals import STRING_ENCODING, RESULT_SPOOL_MAX_SIZE
 from vantage6.common.client.utils import print_qr_code
+from vantage6.common.client.public_key_cache import PublicKeyCache
 
 module_name = __name__.split('.')[1]
 
@@ -50,6 +59,9 @@ class ClientBase(object):
         self.cryptor = None
         self.whoami = None
 
+        # loaded public keys of organizations
+        self.public_keys = PublicKeyCache()
+
     @property
     def name(self) -> str:
         """
@@ -163,7 +175,9 @@ class ClientBase(object):
 
     def request(self, endpoint: str, json: dict = None, method: str = 'get',
                 params: dict = None, first_try: bool = True,
-                retry: bool = True, attempts_on_timeout: int = None) -> dict:
+                retry: bool = True, attempts_on_timeout: int = None,
+                body: BinaryIO = None, form: dict = None,
+                files: dict = None) -> dict:
         """Create http(s) request to the vantage6 server
 
         Parameters
@@ -183,6 +197,14 @@ class ClientBase(object):
         attempts_on_timeout: int, optional
             Number of attempts to make when a timeout occurs. Default None
             which leads to unlimited amount of attempts.
+        body : BinaryIO, optional
+            File-like object containing a JSON payload. It is streamed to the
+            server instead of being loaded in memory. Used instead of `json`
+            for large payloads. By default None
+        form : dict, optional
+            Form fields of a `multipart/form-data` request, by default None
+        files : dict, optional
+            Files of a `multipart/form-data` request, by default None
 
         Returns
         -------
@@ -203,11 +225,19 @@ class ClientBase(object):
         url = self.generate_path_to(endpoint)
         self.log.debug(f'Making request: {method.upper()} | {url} | {params}')
 
+        headers = self.headers
+        if body is not None:
+            headers = {**headers, 'Content-Type': 'application/json'}
+
         timeout_attempts = 0
         while True:
             try:
-                response = rest_method(url, json=json, headers=self.headers,
-                                       params=params)
+                if body is not None:
+                    body.seek(0)
+                response = rest_method(
+                    url, json=json, data=body if body is not None else form,
+                    files=files, headers=headers, params=params
+                )
                 break
             except requests.exceptions.ConnectionError as exc:
                 # we can safely retry as this is a connection error. And we
@@ -242,13 +272,161 @@ class ClientBase(object):
                     self.refresh_token()
                     return self.request(
                         endpoint, json, method, params, first_try=False,
-                        attempts_on_timeout=attempts_on_timeout
+                        attempts_on_timeout=attempts_on_timeout, body=body,
+                        form=form, files=files
                     )
                 else:
                     self.log.error("Nope, refreshing the token didn't fix it.")
 
         return response.json()
 
+    def _multi_page_request(self, endpoint: str,
+                            params: dict = None) -> list[dict]:
+        """
+        Make multiple requests to the central server to get all pages of a list
+        of resources.
+
+        The pages are requested with a cursor, which is faster than page
+        numbers for long lists. Servers that do not support cursors ignore it
+        and return numbered pages, which are then followed instead.
+
+        Parameters
+        ----------
+        endpoint: str
+            Endpoint to which the request should be made.
+        params: dict
+            Parameters to be passed to the request.
+
+        Returns
+        -------
+        list[dict]
+            The resources of all pages
+
+        Raises
+        ------
+        Exception
+            If one of the pages could not be obtained. The resources of the
+            other pages are not returned, as the list would be incomplete.
+        """
+        params = {**(params or {}), 'cursor': ''}
+        params.pop('page', None)
+        data = []
+        while True:
+            response = self.request(endpoint, params=params)
+            if not isinstance(response, dict) or 'data' not in response:
+                self.log.debug(f"Fail message: {response}")
+                msg = response.get('msg') if isinstance(response, dict) \
+                    else None
+                raise Exception(
+                    f"Requesting all pages of {endpoint} failed after "
+                    f"{len(data)} resources" + (f": {msg}" if msg else "")
+                )
+            data += response['data']
+
+            next_link = (response.get('links') or {}).get('next')
+            if not next_link:
+                return data
+            # continue with the cursor or the page number of the next link
+            next_args = parse_qs(urlparse(next_link).query)
+            for arg in ('cursor', 'page'):
+                if arg in next_args:
+                    params[arg] = next_args[arg][0]
+
+    def upload(self, endpoint: str, body: BinaryIO, method: str = 'put',
+               first_try: bool = True, retry: bool = True) -> bool:
+        """
+        Upload binary data to the vantage6 server.
+
+        The data is streamed to the server as `application/octet-stream`.
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint of the server
+        body : BinaryIO
+            File-like object containing the data to upload
+        method : str, optional
+            Http verb, by default 'put'
+        first_try : bool, optional
+            Whether this is the first attempt of this request. Default True.
+        retry: bool, optional
+            Try request again after refreshing the token. Default True.
+
+        Returns
+        -------
+        bool
+            Whether the upload succeeded. If not, the caller may fall back to
+            sending the data as JSON.
+        """
+        url = self.generate_path_to(endpoint)
+        self.log.debug(f'Uploading: {method.upper()} | {url}')
+        body.seek(0)
+        try:
+            response = requests.request(
+                method, url, data=body,
+                headers={**self.headers,
+                         'Content-Type': 'application/octet-stream'}
+            )
+        except requests.exceptions.ConnectionError as exc:
+            self.log.error('Connection error while uploading')
+            self.log.debug(exc)
+            return False
+
+        if response.status_code == 401 and retry and first_try:
+            self.refresh_token()
+            return self.upload(endpoint, body, method, first_try=False)
+        if response.status_code > 210:
+            self.log.error(
+                f'Upload failed with error code: {response.status_code}')
+            return False
+        return True
+
+    def download(self, endpoint: str, out_stream: BinaryIO,
+                 first_try: bool = True, retry: bool = True) -> bool:
+        """
+        Download binary data from the vantage6 server.
+
+        The data is written to `out_stream` in chunks as it is received.
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint of the server
+        out_stream : BinaryIO
+            File-like object to write the data to
+        first_try : bool, optional
+            Whether this is the first attempt of this request. Default True.
+        retry: bool, optional
+            Try request again after refreshing the token. Default True.
+
+        Returns
+        -------
+        bool
+            Whether the download succeeded. If not, the caller may fall back
+            to retrieving the data as JSON.
+        """
+        url = self.generate_path_to(endpoint)
+        self.log.debug(f'Downloading: GET | {url}')
+        try:
+            with requests.get(url, headers=self.headers,
+                              stream=True) as response:
+                if response.status_code == 401 and retry and first_try:
+                    self.refresh_token()
+                    return self.download(endpoint, out_stream,
+                                         first_try=False)
+                if response.status_code > 210:
+                    self.log.error(
+                        'Download failed with error code: '
+                        f'{response.status_code}')
+                    return False
+                for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                    out_stream.write(chunk)
+        except requests.exceptions.ConnectionError as exc:
+            self.log.error('Connection error while downloading')
+            self.log.debug(exc)
+            return False
+        return True
+
     def setup_encryption(self, private_key_file: str) -> None:
         """Enable the encryption module fot the communication
 
@@ -272,6 +450,9 @@ class ClientBase(object):
         assert self.whoami.organization_id, \
             "Organization unknown... Did you authenticate?"
 
+        # public keys that were loaded by a previous cryptor cannot be reused
+        self.public_keys.invalidate()
+
         if private_key_file is None:
             self.cryptor = DummyCryptor()
             return
@@ -315,6 +496,197 @@ class ClientBase(object):
 
         self.cryptor = cryptor
 
+    def get_public_key(self, organization_id: int) -> Any:
+        """
+        Get the public key of an organization, loaded by the cryptor so that
+        it can be used directly for encryption.
+
+        The public key is only retrieved from the server if it is not cached
+        yet (or the cached key has expired).
+
+        Parameters
+        ----------
+        organization_id : int
+            ID of the organization
+
+        Returns
+        -------
+        Any
+            The loaded public key, or None if it could not be retrieved
+
+        Raises
+        ------
+        AssertionError
+            Encryption has not been initialized
+        """
+        assert self.cryptor, "Encryption has not been initialized"
+        return self.public_keys.get(organization_id, self._load_public_key)
+
+    def _load_public_key(self, organization_id: int) -> Any:
+        """
+        Retrieve the public key of an organization from the server and load
+        it with the cryptor.
+
+        Parameters
+        ----------
+        organization_id : int
+            ID of the organization
+
+        Returns
+        -------
+        Any
+            The loaded public key, or None if it could not be retrieved
+        """
+        self.log.debug(
+            f"Retrieving public key from organization={organization_id}")
+        public_key = self.request(f"organization/{organization_id}")\
+            .get("public_key")
+        if public_key is None:
+            return None
+        return self.cryptor.load_public_key(public_key)
+
+    def get_public_keys(self, organization_ids: list[int],
+                        collaboration_id: int = None) -> dict[int, Any]:
+        """
+        Get the public keys of several organizations at once.
+
+        Public keys that are not cached are retrieved in as few requests as
+        possible: when a collaboration is given, the organizations of that
+        collaboration are retrieved with a single list request. Keys that are
+        still missing after that are retrieved one by one.
+
+        Parameters
+        ----------
+        organization_ids : list[int]
+            IDs of the organizations
+        collaboration_id : int, optional
+            ID of the collaboration the organizations are part of
+
+        Returns
+        -------
+        dict[int, Any]
+            Loaded public key per organization id. The key is None if it could
+            not be retrieved.
+        """
+        assert self.cryptor, "Encryption has not been initialized"
+        missing = self.public_keys.missing(organization_ids)
+        if collaboration_id is not None and len(missing) > 1:
+            self._load_collaboration_public_keys(collaboration_id, missing)
+        return {
+            id_: self.get_public_key(id_)
+            for id_ in dict.fromkeys(organization_ids)
+        }
+
+    def _load_collaboration_public_keys(
+        self, collaboration_id: int, organization_ids: list[int]
+    ) -> None:
+        """
+        Retrieve the public keys of all organizations in a collaboration and
+        store the keys of the requested organizations in the cache.
+
+        Parameters
+        ----------
+        collaboration_id : int
+            ID of the collaboration
+        organization_ids : list[int]
+            IDs of the organizations whose public keys should be cached
+        """
+        self.log.debug(
+            f"Retrieving public keys of {len(organization_ids)} organizations "
+            f"in collaboration={collaboration_id}")
+        wanted = set(organization_ids)
+        params = {
+            'collaboration_id': collaboration_id,
+            'page': 1,
+            'per_page': len(organization_ids)
+        }
+        while True:
+            response = self.request('organization', params=params)
+            for org in response.get('data', []):
+                if org.get('id') in wanted and org.get('public_key'):
+                    self.public_keys.set(
+                        org['id'],
+                        self.cryptor.load_public_key(org['public_key'])
+                    )
+            links = response.get('links')
+            if not links or not links.get('next'):
+                break
+            params['page'] += 1
+
+    def encrypt_envelope(
+        self, data: bytes, organization_ids: list[int],
+        collaboration_id: int = None, binary: bool = False
+    ) -> tuple[str | bytes, list[str]]:
+        """
+        Encrypt the same data for several organizations.
+
+        The data is encrypted only once. Only the key that it was encrypted
+        with is encrypted for each of the organizations.
+
+        Parameters
+        ----------
+        data : bytes
+            The data to encrypt
+        organization_ids : list[int]
+            IDs of the organizations that should be able to decrypt the data
+        collaboration_id : int, optional
+            ID of the collaboration the organizations are part of. Used to
+            retrieve the public keys in a single request.
+        binary : bool, optional
+            Return the shared data in binary format instead of base64 encoded
+
+        Returns
+        -------
+        str | bytes
+            The encrypted data that is shared by all organizations
+        list[str]
+            The encrypted key per organization, in the same order as
+            `organization_ids`
+        """
+        public_keys = self.get_public_keys(organization_ids, collaboration_id)
+        return self.cryptor.encrypt_bytes_to_envelope(
+            data, [public_keys[org_id] for org_id in organization_ids],
+            binary=binary
+        )
+
+    def encrypt_per_organization(
+        self, inputs: list[tuple[int, bytes]], collaboration_id: int = None
+    ) -> list[str]:
+        """
+        Encrypt data for several organizations, each with its own public key.
+
+        The public keys are retrieved in batch, after which the encryption is
+        done in a thread pool. The cryptographic primitives release the GIL,
+        so large inputs for many organizations are encrypted in parallel.
+
+        Parameters
+        ----------
+        inputs : list[tuple[int, bytes]]
+            Pairs of organization id and the data to encrypt for that
+            organization
+        collaboration_id : int, optional
+            ID of the collaboration the organizations are part of. Used to
+            retrieve the public keys in a single request.
+
+        Returns
+        -------
+        list[str]
+            The encrypted data, in the same order as `inputs`
+        """
+        public_keys = self.get_public_keys(
+            [org_id for org_id, _ in inputs], collaboration_id)
+
+        def encrypt(item: tuple[int, bytes]) -> str:
+            org_id, data = item
+            return self.cryptor.encrypt_bytes_to_str(data, public_keys[org_id])
+
+        if len(inputs) <= 1:
+            return [encrypt(item) for item in inputs]
+
+        max_workers = min(len(inputs), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(encrypt, inputs))
+
     def authenticate(self, credentials: dict,
                      path: str = "token/user") -> bool:
         """Authenticate to the vantage6-server
@@ -416,7 +788,7 @@ class ClientBase(object):
         self._access_token = response.json()["access_token"]
         self.__refresh_token = response.json()["refresh_token"]
 
-    def _decrypt_input(self, input_: str) -> bytes:
+    def _decrypt_input(self, input_: str | dict) -> bytes:
         """Helper to decrypt the input of an algorithm run
 
         Keys are replaced, but object reference remains intact: changes are
@@ -424,8 +796,10 @@ class ClientBase(object):
 
         Parameters
         ----------
-        input_: str
-            The encrypted algorithm input
+        input_: str | dict
+            The encrypted algorithm input, or a link to it. In lists of runs,
+            the server replaces large inputs by a link, from which they are
+            downloaded in binary format.
 
         Returns
         -------
@@ -438,6 +812,9 @@ class ClientBase(object):
             Encryption has not been initialized
         """
         assert self.cryptor, "Encryption has not been initialized"
+        if isinstance(input_, dict):
+            return self._download_input(input_['id'])
+
         cryptor = self.cryptor
         try:
             # TODO this only works when the runs belong to the
@@ -450,6 +827,32 @@ class ClientBase(object):
 
         return input_
 
+    def _download_input(self, run_id: int) -> bytes | None:
+        """
+        Download the input of an algorithm run in binary format and decrypt
+        it.
+
+        Parameters
+        ----------
+        run_id: int
+            ID of the algorithm run
+
+        Returns
+        -------
+        bytes | None
+            The decrypted algorithm run input, or None if it could not be
+            downloaded
+        """
+        with SpooledTemporaryFile(max_size=RESULT_SPOOL_MAX_SIZE) as data:
+            if not self.download(f'run/{run_id}/input', data):
+                self.log.error(
+                    f"Could not download the input of run {run_id}")
+                return None
+            data.seek(0)
+            input_ = io.BytesIO()
+            self.cryptor.decrypt_stream(data, input_, binary=True)
+        return input_.getvalue()
+
     def _decrypt_field(self, data: dict, field: str,
                        is_single_resource: bool) -> dict:
         """
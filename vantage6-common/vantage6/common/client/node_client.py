@@ -2,15 +2,23 @@
 This module provides a client interface for the node to communicate with the
 central server.
 """
+import io
 import jwt
+import json
 import datetime
 import time
 
+from tempfile import SpooledTemporaryFile
 from threading import Thread
+from typing import BinaryIO
 
 from vantage6.common import WhoAmI
 from vantage6.common.client.client_base import ClientBase
-from vantage6.common.globals import NODE_CLIENT_REFRESH_BEFORE_EXPIRES_SECONDS
+from vantage6.common.globals import (
+    NODE_CLIENT_REFRESH_BEFORE_EXPIRES_SECONDS,
+    RESULT_SPOOL_MAX_SIZE,
+    BINARY_TRANSFER_MIN_SIZE
+)
 
 
 class NodeClient(ClientBase):
@@ -138,36 +146,21 @@ class NodeClient(ClientBase):
             dict | list
                 The algorithm runs as json.
             """
+            # large inputs are replaced by a link, and downloaded in binary
+            # format below
             params = {
                 'state': state,
-                'node_id': self.parent.whoami.id_
+                'node_id': self.parent.whoami.id_,
+                'link_payloads': 'true',
             }
             if include_task:
                 params['include'] = 'task'
             if task_id:
                 params['task_id'] = task_id
-            run_data = self.parent.request(endpoint='run', params=params)
-
-            if isinstance(run_data, str):
-                self.parent.log.warn("Requesting algorithm runs failed")
-                self.parent.log.debug(f"Fail message: {run_data}")
-                return {}
-
-            # if there are multiple pages of algorithm runs, get them all
-            links = run_data.get('links')
-            page = 1
-            while links and links.get('next'):
-                page += 1
-                run_data['data'] += self.parent.request(
-                    endpoint='run',
-                    params={**params, 'page': page}
-                )['data']
-                links = run_data.get('links')
-
-            # strip pagination links
-            run_data = run_data['data']
-
-            # Multiple runs
+            # get all pages of algorithm runs
+            run_data = self.parent._multi_page_request('run', params=params)
+
+            # Multiple runs. Large inputs are downloaded in binary format.
             for run in run_data:
                 run['input'] = self.parent._decrypt_input(run['input'])
 
@@ -184,38 +177,112 @@ class NodeClient(ClientBase):
             id_: int
                 ID of the run to patch
             data: Dict
-                Dictionary of fields that are to be patched
+                Dictionary of fields that are to be patched. The `result` may
+                be given as bytes or as a file-like object. It is encrypted
+                and sent to the server in chunks, so that large results are
+                never completely loaded in memory. Large results are sent in
+                binary format rather than base64 encoded in JSON.
             init_org_id: int, optional
                 Organization id of the origin of the task. This is required
                 when the run dict includes results, because then results have
                 to be encrypted specifically for them
             """
-            if "result" in data:
-                if not init_org_id:
-                    self.parent.log.critical(
-                        "Organization id is not provided: cannot send results "
-                        "to server as they cannot be encrypted"
-                    )
-                msg = f"Retrieving public key from organization={init_org_id}"
-                self.parent.log.debug(msg)
-
-                org = self.parent.request(f"organization/{init_org_id}")
-                public_key = None
-                try:
-                    public_key = org["public_key"]
-                except KeyError:
-                    self.parent.log.critical(
-                        'Public key could not be retrieved... Does the '
-                        'initiating organization belong to your organization?'
-                    )
-
-                data["result"] = self.parent.cryptor.encrypt_bytes_to_str(
-                    data["result"],
-                    public_key
+            if "result" not in data:
+                self.parent.log.debug("Sending algorithm run update to server")
+                return self.parent.request(
+                    f"run/{id_}", json=data, method='patch')
+
+            if not init_org_id:
+                self.parent.log.critical(
+                    "Organization id is not provided: cannot send results "
+                    "to server as they cannot be encrypted"
+                )
+            public_key = self.parent.get_public_key(init_org_id)
+            if public_key is None:
+                self.parent.log.critical(
+                    'Public key could not be retrieved... Does the '
+                    'initiating organization belong to your organization?'
                 )
 
-            self.parent.log.debug("Sending algorithm run update to server")
-            return self.parent.request(f"run/{id_}", json=data, method='patch')
+            data = dict(data)
+            result = data.pop("result")
+            if isinstance(result, bytes):
+                result = io.BytesIO(result)
+
+            # large results are uploaded in binary format first, after which
+            # the other fields are patched
+            result.seek(0, io.SEEK_END)
+            size = result.tell()
+            result.seek(0)
+            if size >= BINARY_TRANSFER_MIN_SIZE and \
+                    self._upload_result(id_, result, public_key):
+                self.parent.log.debug("Sending algorithm run update to server")
+                return self.parent.request(
+                    f"run/{id_}", json=data, method='patch')
+
+            with SpooledTemporaryFile(max_size=RESULT_SPOOL_MAX_SIZE) as body:
+                self._write_json_body(body, data, result, public_key)
+                self.parent.log.debug(
+                    "Sending algorithm run update to server")
+                return self.parent.request(
+                    f"run/{id_}", method='patch', body=body)
+
+        def _upload_result(self, id_: int, result: BinaryIO,
+                           public_key) -> bool:
+            """
+            Encrypt a result in binary format and upload it to the server.
+
+            Parameters
+            ----------
+            id_: int
+                ID of the run
+            result: BinaryIO
+                File-like object containing the unencrypted result
+            public_key: Any
+                Public key of the organization the result is encrypted for
+
+            Returns
+            -------
+            bool
+                Whether the upload succeeded. If not, the result is rewound so
+                that it can be sent in another way.
+            """
+            with SpooledTemporaryFile(max_size=RESULT_SPOOL_MAX_SIZE) as body:
+                self.parent.cryptor.encrypt_stream(
+                    result, body, public_key, binary=True)
+                self.parent.log.debug(
+                    f"Uploading result of run {id_} in binary format")
+                uploaded = self.parent.upload(f"run/{id_}/result", body)
+            if not uploaded:
+                self.parent.log.warn(
+                    "Binary upload of result failed, sending it as JSON")
+                result.seek(0)
+            return uploaded
+
+        def _write_json_body(self, body: BinaryIO, data: dict,
+                             result: BinaryIO, public_key) -> None:
+            """
+            Write the JSON body of a run update that includes a result. The
+            result is encrypted and written in chunks.
+
+            Parameters
+            ----------
+            body: BinaryIO
+                File-like object to write the JSON body to
+            data: dict
+                Fields of the run to patch, other than the result
+            result: BinaryIO
+                File-like object containing the unencrypted result
+            public_key: Any
+                Public key of the organization the result is encrypted for
+            """
+            # the encrypted result is base64 encoded, so it can be put in a
+            # JSON string as-is
+            fields = json.dumps(data)[1:-1]
+            body.write(f'{{{fields}{", " if fields else ""}"result": "'
+                       .encode())
+            self.parent.cryptor.encrypt_stream(result, body, public_key)
+            body.write(b'"}')
 
     def is_encrypted_collaboration(self) -> bool:
         """
@@ -0,0 +1,130 @@
+"""
+Cache for the public keys of organizations.
+
+Clients need the public key of an organization every time they encrypt
+something for it: task input when creating a task, results when a node
+finishes a run. The public keys rarely change, so they are kept in a cache
+that is shared by everything that uses the same client (e.g. the node and
+its proxy server). The cache stores the loaded key objects, so that the key
+is only parsed once.
+
+Entries expire after a while. They can also be invalidated explicitly, for
+instance when the server announces that an organization has been updated.
+"""
+import time
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable
+
+from vantage6.common.globals import (
+    PUBLIC_KEY_CACHE_TTL_SECONDS,
+    PUBLIC_KEY_CACHE_MAX_SIZE
+)
+
+
+class PublicKeyCache:
+    """
+    Thread-safe LRU cache with expiry for organization public keys.
+
+    Parameters
+    ----------
+    ttl: float
+        Number of seconds after which a cached public key is fetched again
+    max_size: int
+        Maximum number of public keys kept. When full, the least recently
+        used key is dropped.
+    """
+
+    def __init__(self, ttl: float = PUBLIC_KEY_CACHE_TTL_SECONDS,
+                 max_size: int = PUBLIC_KEY_CACHE_MAX_SIZE) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._keys: OrderedDict[int, tuple[float, Any]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, organization_id: int,
+            loader: Callable[[int], Any]) -> Any:
+        """
+        Get the public key of an organization.
+
+        Parameters
+        ----------
+        organization_id: int
+            ID of the organization
+        loader: Callable[[int], Any]
+            Function that retrieves and loads the public key of an
+            organization. Only called if the key is not cached (anymore). If
+            it returns None, nothing is cached.
+
+        Returns
+        -------
+        Any
+            The loaded public key, or None if it could not be retrieved
+        """
+        with self._lock:
+            entry = self._keys.get(organization_id)
+            if entry and entry[0] > time.monotonic():
+                self._keys.move_to_end(organization_id)
+                return entry[1]
+
+        public_key = loader(organization_id)
+        if public_key is not None:
+            self.set(organization_id, public_key)
+        return public_key
+
+    def missing(self, organization_ids: list[int]) -> list[int]:
+        """
+        Find the organizations of which no valid public key is cached.
+
+        Parameters
+        ----------
+        organization_ids: list[int]
+            IDs of the organizations
+
+        Returns
+        -------
+        list[int]
+            IDs of the organizations whose public key is not cached (anymore),
+            without duplicates
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                id_ for id_ in dict.fromkeys(organization_ids)
+                if id_ not in self._keys or self._keys[id_][0] <= now
+            ]
+
+    def set(self, organization_id: int, public_key: Any) -> None:
+        """
+        Store the public key of an organization.
+
+        Parameters
+        ----------
+        organization_id: int
+            ID of the organization
+        public_key: Any
+            The loaded public key
+        """
+        with self._lock:
+            self._keys[organization_id] = \
+                (time.monotonic() + self.ttl, public_key)
+            self._keys.move_to_end(organization_id)
+            while len(self._keys) > self.max_size:
+                self._keys.popitem(last=False)
+
+    def invalidate(self, organization_id: int | None = None) -> None:
+        """
+        Remove a public key from the cache.
+
+        Parameters
+        ----------
+        organization_id: int | None
+            ID of the organization whose key should be removed. If None, all
+            keys are removed.
+        """
+        with self._lock:
+            if organization_id is None:
+                self._keys.clear()
+            else:
+                self._keys.pop(organization_id, None)
@@ -7,6 +7,8 @@ import base64
 import json
 import signal
 import pathlib
+import threading
+import time
 
 from dateutil.parser import parse
 from docker.client import DockerClient
@@ -14,8 +16,8 @@ from docker.models.containers import Container
 from docker.models.networks import Network
 
 from vantage6.common import logger_name
-from vantage6.common import ClickLogger
-from vantage6.common.globals import APPNAME
+from vantage6.common import ClickLogger, Singleton
+from vantage6.common.globals import APPNAME, IMAGE_CHECK_MAX_AGE_SECONDS
 
 log = logging.getLogger(logger_name(__name__))
 
@@ -234,6 +236,121 @@ def inspect_local_image_timestamp(
     return timestamp, digest
 
 
+class ImageCheckCache(metaclass=Singleton):
+    """
+    Outcome of the recent checks whether a local image is up-to-date with the
+    registry.
+
+    Checking an image requires several requests to the registry. When an
+    algorithm creates many subtasks, the same image would otherwise be
+    checked for every run. After an image has been checked (and pulled if it
+    was outdated), the local digest of the image is stored. Until the
+    freshness window has passed, the image is considered up-to-date as long
+    as the local image still has that digest.
+
+    Checks of the same image are done one at a time, so that runs that are
+    started at the same time wait for a single check.
+
+    Attributes
+    ----------
+    max_age: float
+        Number of seconds that the outcome of a check is used. A value of 0
+        disables the cache.
+    """
+
+    def __init__(self) -> None:
+        self.max_age = IMAGE_CHECK_MAX_AGE_SECONDS
+        # image name -> (time of the check, local digest after the check)
+        self._checks: dict[str, tuple[float, str | None]] = {}
+        self._image_locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, max_age: float | None) -> None:
+        """
+        Set the freshness window and forget the checks that have been done.
+
+        Parameters
+        ----------
+        max_age: float | None
+            Number of seconds that the outcome of a check is used. Defaults to
+            `IMAGE_CHECK_MAX_AGE_SECONDS`.
+        """
+        with self._lock:
+            self.max_age = IMAGE_CHECK_MAX_AGE_SECONDS if max_age is None \
+                else max_age
+            self._checks.clear()
+
+    def lock(self, image: str) -> threading.Lock:
+        """
+        Get the lock that is held while an image is checked and pulled.
+
+        Parameters
+        ----------
+        image: str
+            Image name
+
+        Returns
+        -------
+        threading.Lock
+            Lock of the image
+        """
+        with self._lock:
+            return self._image_locks.setdefault(image, threading.Lock())
+
+    def is_fresh(self, image: str, local_digest: str | None) -> bool:
+        """
+        Check whether an image has recently been found to be up-to-date.
+
+        Parameters
+        ----------
+        image: str
+            Image name
+        local_digest: str | None
+            Current digest of the local image
+
+        Returns
+        -------
+        bool
+            True if the image has been checked within the freshness window
+            and the local image has not changed since
+        """
+        with self._lock:
+            check = self._checks.get(image)
+        if check is None:
+            return False
+        checked_at, digest = check
+        return time.monotonic() - checked_at < self.max_age and \
+            digest == local_digest
+
+    def store(self, image: str, local_digest: str | None) -> None:
+        """
+        Store that an image has been checked.
+
+        Parameters
+        ----------
+        image: str
+            Image name
+        local_digest: str | None
+            Digest of the local image after the check
+        """
+        if self.max_age <= 0:
+            return
+        with self._lock:
+            self._checks[image] = (time.monotonic(), local_digest)
+
+    def forget(self, image: str) -> None:
+        """
+        Forget the check of an image, so that it is checked again next time.
+
+        Parameters
+        ----------
+        image: str
+            Image name
+        """
+        with self._lock:
+            self._checks.pop(image, None)
+
+
 def pull_if_newer(
     docker_client: DockerClient, image: str,
     log: logging.Logger | ClickLogger = ClickLogger
@@ -241,6 +358,9 @@ def pull_if_newer(
     """
     Docker pull only if the remote image is newer.
 
+    The registry is not contacted if the image has been checked recently,
+    see :class:`ImageCheckCache`.
+
     Parameters
     ----------
     docker_client: DockerClient
@@ -255,9 +375,58 @@ def pull_if_newer(
     docker.errors.APIError
         If the image cannot be pulled
     """
-    local_time, local_digest = inspect_local_image_timestamp(
-        docker_client, image, log=log
-    )
+    cache = ImageCheckCache()
+    with cache.lock(image):
+        local_time, local_digest = inspect_local_image_timestamp(
+            docker_client, image, log=log
+        )
+        if local_time and cache.is_fresh(image, local_digest):
+            log.debug(f"Local image has recently been checked: {image}")
+            return
+
+        cache.forget(image)
+        pulled = _pull_if_newer(
+            docker_client, image, local_time, local_digest, log
+        )
+        if pulled:
+            local_time, local_digest = inspect_local_image_timestamp(
+                docker_client, image, log=log
+            )
+        if local_time:
+            cache.store(image, local_digest)
+
+
+def _pull_if_newer(
+    docker_client: DockerClient, image: str, local_time: datetime | None,
+    local_digest: str | None, log: logging.Logger | ClickLogger
+) -> bool:
+    """
+    Compare the local image with the remote image, and pull the image if the
+    remote image is newer.
+
+    Parameters
+    ----------
+    docker_client: DockerClient
+        A Docker client instance
+    image: str
+        Image to be pulled
+    local_time: datetime | None
+        Creation time of the local image, None if there is no local image
+    local_digest: str | None
+        Digest of the local image
+    log: logger.Logger or ClickLogger
+        Logger class
+
+    Returns
+    -------
+    bool
+        True if the image has been pulled
+
+    Raises
+    ------
+    docker.errors.APIError
+        If the image cannot be pulled
+    """
     remote_time, remote_digest = inspect_remote_image_timestamp(
         docker_client, image, log=log
     )
@@ -291,6 +460,7 @@ def pull_if_newer(
             log.error(f"Failed to pull image! {image}")
             log.debug(e)
             raise docker.errors.APIError("Failed to pull image") from e
+    return pull
 
 
 def get_container(docker_client: DockerClient, **filters) -> Container:
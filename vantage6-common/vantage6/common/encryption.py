@@ -11,18 +11,38 @@ private key.
 In the case we are sending messages (input/results) we need to encrypt
 it using the public key of the receiving organization. (retreiving
 these public keys is outside the scope of this module).
+
+When the same message is sent to multiple organizations, it can be encrypted
+as an envelope: the message is encrypted once with a symmetric key, and only
+that key is encrypted for each of the organizations. Joining the encrypted key
+of an organization with the shared payload results in the same `key$iv$msg`
+format as encrypting the message for that organization alone.
+
+Large messages can be encrypted and decrypted as streams, so that they never
+have to be kept in memory as a whole. As AES-CTR is a stream cipher, the
+streamed and the in-memory functions produce the same format.
+
+Streams may also be encrypted to a binary format, which is used to transfer
+large inputs and results without base64 overhead. In this format, the message
+after `key$iv$` is not base64 encoded. Unencrypted data in binary format is
+the data itself.
 """
 # TODO handle no public key from other organization (should that happen here?)
 import os
+import base64
 import logging
+import itertools
 
 from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
 
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives.asymmetric import padding, rsa
-from cryptography.hazmat.primitives.asymmetric.types import PrivateKeyTypes
+from cryptography.hazmat.primitives.asymmetric.types import (
+    PrivateKeyTypes, PublicKeyTypes
+)
 from cryptography.hazmat.primitives.serialization import (
     load_pem_private_key,
     load_pem_public_key
@@ -37,6 +57,227 @@ from vantage6.common import (
 
 SEPARATOR = '$'
 
+# Number of bytes that are processed at once when encrypting a stream. This
+# must be a multiple of 3, so that base64 encoded chunks can be concatenated.
+STREAM_CHUNK_SIZE = 3 * 2**16
+
+
+def iter_chunks(stream: BinaryIO,
+                chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Read a file-like object in chunks.
+
+    Parameters
+    ----------
+    stream: BinaryIO
+        The file-like object to read
+    chunk_size: int
+        Maximum number of bytes per chunk
+
+    Returns
+    -------
+    Iterator[bytes]
+        The chunks read from the stream
+    """
+    while chunk := stream.read(chunk_size):
+        yield chunk
+
+
+def base64_encode_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Base64 encode a stream of chunks of arbitrary size.
+
+    Parameters
+    ----------
+    chunks: Iterable[bytes]
+        The chunks to encode
+
+    Returns
+    -------
+    Iterator[bytes]
+        Base64 encoded chunks. Joined, they are the base64 encoding of the
+        joined input chunks.
+    """
+    remainder = b''
+    for chunk in chunks:
+        chunk = remainder + chunk
+        cut = len(chunk) - len(chunk) % 3
+        remainder = chunk[cut:]
+        if cut:
+            yield base64.b64encode(chunk[:cut])
+    if remainder:
+        yield base64.b64encode(remainder)
+
+
+def base64_decode_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Decode a stream of base64 encoded chunks of arbitrary size.
+
+    Parameters
+    ----------
+    chunks: Iterable[bytes]
+        The base64 encoded chunks
+
+    Returns
+    -------
+    Iterator[bytes]
+        The decoded chunks
+    """
+    remainder = b''
+    for chunk in chunks:
+        chunk = remainder + chunk
+        cut = len(chunk) - len(chunk) % 4
+        remainder = chunk[cut:]
+        if cut:
+            yield base64.b64decode(chunk[:cut])
+    if remainder:
+        yield base64.b64decode(remainder)
+
+
+def split_envelope_header(
+    chunks: Iterable[bytes], n_fields: int = 2
+) -> tuple[list[bytes], Iterator[bytes]]:
+    """
+    Split the header fields (encrypted key and/or iv) from a stream of
+    encrypted data.
+
+    Parameters
+    ----------
+    chunks: Iterable[bytes]
+        Chunks of encrypted data, which start with `key$iv$` (or with `iv$`
+        for the shared payload of an envelope)
+    n_fields: int
+        Number of header fields: 2 for `key$iv$`, 1 for `iv$`
+
+    Returns
+    -------
+    list[bytes]
+        The (base64 encoded) header fields
+    Iterator[bytes]
+        The chunks of the encrypted message that follows the header
+
+    Raises
+    ------
+    ValueError
+        If the data does not start with the expected header fields
+    """
+    chunks = iter(chunks)
+    separator = SEPARATOR.encode()
+    header = b''
+    for chunk in chunks:
+        header += chunk
+        if header.count(separator) >= n_fields:
+            break
+    parts = header.split(separator, n_fields)
+    if len(parts) <= n_fields:
+        raise ValueError("Encrypted data does not start with a key and/or iv")
+    return parts[:-1], itertools.chain((parts[-1],), chunks)
+
+
+def binary_to_base64_chunks(chunks: Iterable[bytes], encrypted: bool,
+                            header_fields: int = 2) -> Iterator[bytes]:
+    """
+    Convert a stream of data in binary format to the base64 string format.
+
+    Parameters
+    ----------
+    chunks: Iterable[bytes]
+        Chunks of data in binary format
+    encrypted: bool
+        Whether the data is encrypted, i.e. starts with a header
+    header_fields: int
+        Number of header fields of encrypted data: 2 for `key$iv$`, 1 for
+        the `iv$` of the shared payload of an envelope
+
+    Returns
+    -------
+    Iterator[bytes]
+        Chunks of the data in the format of `encrypt_bytes_to_str`
+    """
+    if not encrypted:
+        yield from base64_encode_chunks(chunks)
+        return
+    header, message = split_envelope_header(chunks, header_fields)
+    yield SEPARATOR.encode().join(header + [b''])
+    yield from base64_encode_chunks(message)
+
+
+def base64_to_binary_chunks(chunks: Iterable[bytes], encrypted: bool,
+                            header_fields: int = 2) -> Iterator[bytes]:
+    """
+    Convert a stream of data in base64 string format to the binary format.
+
+    Parameters
+    ----------
+    chunks: Iterable[bytes]
+        Chunks of data in the format of `encrypt_bytes_to_str`
+    encrypted: bool
+        Whether the data is encrypted, i.e. starts with a header
+    header_fields: int
+        Number of header fields of encrypted data: 2 for `key$iv$`, 1 for
+        the `iv$` of the shared payload of an envelope
+
+    Returns
+    -------
+    Iterator[bytes]
+        Chunks of the data in binary format
+    """
+    if not encrypted:
+        yield from base64_decode_chunks(chunks)
+        return
+    header, message = split_envelope_header(chunks, header_fields)
+    yield SEPARATOR.encode().join(header + [b''])
+    yield from base64_decode_chunks(message)
+
+
+class Base64Writer:
+    """
+    Write-only file-like object that base64 encodes everything written to it
+    and passes it on to another file-like object.
+
+    Call `flush` (or `close`) when done writing, to write the final bytes.
+
+    Parameters
+    ----------
+    stream: BinaryIO
+        File-like object to write the base64 encoded data to
+    """
+
+    def __init__(self, stream: BinaryIO) -> None:
+        self.stream = stream
+        self._remainder = b''
+
+    def write(self, data: bytes) -> int:
+        """
+        Base64 encode data and write it to the underlying stream.
+
+        Parameters
+        ----------
+        data: bytes
+            The data to write
+
+        Returns
+        -------
+        int
+            Number of bytes received
+        """
+        chunk = self._remainder + data
+        cut = len(chunk) - len(chunk) % 3
+        self._remainder = chunk[cut:]
+        if cut:
+            self.stream.write(base64.b64encode(chunk[:cut]))
+        return len(data)
+
+    def flush(self) -> None:
+        """ Write the bytes that are not encoded yet. """
+        if self._remainder:
+            self.stream.write(base64.b64encode(self._remainder))
+            self._remainder = b''
+
+    def close(self) -> None:
+        """ Write the remaining bytes. The underlying stream is not closed. """
+        self.flush()
+
 
 # ------------------------------------------------------------------------------
 # CryptorBase
@@ -81,6 +322,25 @@ class CryptorBase(metaclass=Singleton):
         """
         return base64s_to_bytes(data)
 
+    def load_public_key(self, pubkey_base64: str) -> str:
+        """
+        Load a (base64 encoded) public key so it can be used for encryption.
+
+        As the public key is not used in this base class, it is returned
+        as-is.
+
+        Parameters
+        ----------
+        pubkey_base64: str
+            The public key as returned by the server
+
+        Returns
+        -------
+        str
+            The same public key
+        """
+        return pubkey_base64
+
     def encrypt_bytes_to_str(self, data: bytes, pubkey_base64: str) -> str:
         """
         Encrypt bytes in `data` using a (base64 encoded) public key.
@@ -103,6 +363,115 @@ class CryptorBase(metaclass=Singleton):
         """
         return self.bytes_to_str(data)
 
+    def encrypt_bytes_to_envelope(
+        self, data: bytes, pubkeys_base64: list[str], binary: bool = False
+    ) -> tuple[str | bytes, list[str]]:
+        """
+        Encrypt bytes in `data` once for multiple receivers.
+
+        As this base class does not encrypt, the shared payload is the base64
+        encoded data and there are no keys for the receivers.
+
+        Parameters
+        ----------
+        data: bytes
+            The data to encrypt.
+        pubkeys_base64: list[str]
+            The public keys of the receivers. These are ignored in this base
+            class.
+        binary: bool
+            Return the shared payload in binary format instead of base64
+            encoded
+
+        Returns
+        -------
+        str | bytes
+            The payload that is shared by all receivers
+        list[str]
+            The encrypted key per receiver, in the same order as
+            `pubkeys_base64`. These are empty strings in this base class.
+        """
+        shared_payload = data if binary else self.bytes_to_str(data)
+        return shared_payload, [''] * len(pubkeys_base64)
+
+    def encrypt_stream(self, in_stream: BinaryIO, out_stream: BinaryIO,
+                       pubkey_base64: str,
+                       chunk_size: int = STREAM_CHUNK_SIZE,
+                       binary: bool = False) -> None:
+        """
+        Encrypt a stream using a (base64 encoded) public key, and write it
+        base64 encoded to another stream, in chunks.
+
+        Note that the public key is ignored in this base class, so the data is
+        only base64 encoded.
+
+        Parameters
+        ----------
+        in_stream: BinaryIO
+            File-like object to read the data from
+        out_stream: BinaryIO
+            File-like object to write the encrypted data to
+        pubkey_base64: str
+            The public key to use for encryption. This is ignored in this
+            base class.
+        chunk_size: int
+            Number of bytes to read at once
+        binary: bool
+            Write the data in binary format instead of base64 encoded
+        """
+        chunks = iter_chunks(in_stream, chunk_size)
+        if not binary:
+            chunks = base64_encode_chunks(chunks)
+        for chunk in chunks:
+            out_stream.write(chunk)
+
+    def decrypt_stream(self, in_stream: BinaryIO, out_stream: BinaryIO,
+                       chunk_size: int = STREAM_CHUNK_SIZE,
+                       binary: bool = False) -> None:
+        """
+        Decrypt a stream of base64 encoded data and write the result to
+        another stream, in chunks.
+
+        Parameters
+        ----------
+        in_stream: BinaryIO
+            File-like object to read the encrypted data from
+        out_stream: BinaryIO
+            File-like object to write the decrypted data to
+        chunk_size: int
+            Number of bytes to read at once
+        binary: bool
+            The data is in binary format instead of base64 encoded
+        """
+        chunks = iter_chunks(in_stream, chunk_size)
+        if not binary:
+            chunks = base64_decode_chunks(chunks)
+        for chunk in chunks:
+            out_stream.write(chunk)
+
+    @staticmethod
+    def join_envelope(encrypted_key: str, shared_payload: str) -> str:
+        """
+        Combine the encrypted key of a receiver with the shared payload of an
+        envelope, so that it can be decrypted with `decrypt_str_to_bytes`.
+
+        Parameters
+        ----------
+        encrypted_key: str
+            The encrypted key of the receiver. Empty if the payload is not
+            encrypted.
+        shared_payload: str
+            The payload that is shared by all receivers
+
+        Returns
+        -------
+        str
+            The encrypted data of the receiver
+        """
+        if not encrypted_key:
+            return shared_payload
+        return SEPARATOR.join([encrypted_key, shared_payload])
+
     def decrypt_str_to_bytes(self, data: str) -> bytes:
         """
         Decrypt base64 encoded *string* data.
@@ -271,7 +640,27 @@ class RSACryptor(CryptorBase):
         """
         return bytes_to_base64s(self.public_key_bytes)
 
-    def encrypt_bytes_to_str(self, data: bytes, pubkey_base64s: str) -> str:
+    def load_public_key(self, pubkey_base64s: str) -> PublicKeyTypes:
+        """
+        Load a (base64 encoded) public key so it can be used for encryption.
+
+        Parameters
+        ----------
+        pubkey_base64s: str
+            The public key as returned by the server
+
+        Returns
+        -------
+        PublicKeyTypes
+            The loaded public key
+        """
+        return load_pem_public_key(
+            base64s_to_bytes(pubkey_base64s),
+            backend=default_backend()
+        )
+
+    def encrypt_bytes_to_str(self, data: bytes,
+                             pubkey_base64s: str | PublicKeyTypes) -> str:
         """
         Encrypt bytes in `data` using a (base64 encoded) public key.
 
@@ -279,15 +668,49 @@ class RSACryptor(CryptorBase):
         ----------
         data: bytes
             The data to encrypt.
-        pubkey_base64s: str
-            The public key to use for encryption.
+        pubkey_base64s: str | PublicKeyTypes
+            The public key to use for encryption. Either base64 encoded, or
+            already loaded with `load_public_key`.
 
         Returns
         -------
         str
             The encrypted data encoded as base64 string.
         """
+        shared_payload, (encrypted_key,) = self.encrypt_bytes_to_envelope(
+            data, [pubkey_base64s]
+        )
+        return self.join_envelope(encrypted_key, shared_payload)
+
+    def encrypt_bytes_to_envelope(
+        self, data: bytes, pubkeys_base64s: list[str | PublicKeyTypes],
+        binary: bool = False
+    ) -> tuple[str | bytes, list[str]]:
+        """
+        Encrypt bytes in `data` once for multiple receivers.
+
+        The data is encrypted with a new symmetric key. That key is then
+        encrypted with the public key of each of the receivers.
+
+        Parameters
+        ----------
+        data: bytes
+            The data to encrypt.
+        pubkeys_base64s: list[str | PublicKeyTypes]
+            The public keys of the receivers. Either base64 encoded, or
+            already loaded with `load_public_key`.
+        binary: bool
+            Return the shared payload in binary format, i.e. without base64
+            encoding the encrypted message
 
+        Returns
+        -------
+        str | bytes
+            The encrypted data that is shared by all receivers, as `iv$msg`
+        list[str]
+            The encrypted symmetric key per receiver, in the same order as
+            `pubkeys_base64s`
+        """
         # Use the shared key for symmetric encryption/decryption of the payload
         shared_key = os.urandom(32)
         iv_bytes = os.urandom(16)
@@ -301,22 +724,118 @@ class RSACryptor(CryptorBase):
         encryptor = cipher.encryptor()
         encrypted_msg_bytes = encryptor.update(data) + encryptor.finalize()
 
-        # Create a public key instance.
-        pubkey = load_pem_public_key(
-            base64s_to_bytes(pubkey_base64s),
+        encrypted_keys = []
+        for pubkey in pubkeys_base64s:
+            # Create a public key instance, if it was not loaded before
+            if isinstance(pubkey, str):
+                pubkey = self.load_public_key(pubkey)
+            encrypted_keys.append(self.bytes_to_str(
+                pubkey.encrypt(shared_key, padding.PKCS1v15())
+            ))
+
+        iv = self.bytes_to_str(iv_bytes)
+        if binary:
+            shared_payload = (iv + SEPARATOR).encode() + encrypted_msg_bytes
+        else:
+            shared_payload = SEPARATOR.join(
+                [iv, self.bytes_to_str(encrypted_msg_bytes)])
+
+        return shared_payload, encrypted_keys
+
+    def encrypt_stream(self, in_stream: BinaryIO, out_stream: BinaryIO,
+                       pubkey_base64s: str | PublicKeyTypes,
+                       chunk_size: int = STREAM_CHUNK_SIZE,
+                       binary: bool = False) -> None:
+        """
+        Encrypt a stream using a (base64 encoded) public key, and write it
+        base64 encoded to another stream, in chunks.
+
+        The output has the same format as `encrypt_bytes_to_str`.
+
+        Parameters
+        ----------
+        in_stream: BinaryIO
+            File-like object to read the data from
+        out_stream: BinaryIO
+            File-like object to write the encrypted data to
+        pubkey_base64s: str | PublicKeyTypes
+            The public key to use for encryption. Either base64 encoded, or
+            already loaded with `load_public_key`.
+        chunk_size: int
+            Number of bytes to read at once
+        binary: bool
+            Write the encrypted message in binary format instead of base64
+            encoded
+        """
+        shared_key = os.urandom(32)
+        iv_bytes = os.urandom(16)
+
+        if isinstance(pubkey_base64s, str):
+            pubkey_base64s = self.load_public_key(pubkey_base64s)
+        encrypted_key = self.bytes_to_str(
+            pubkey_base64s.encrypt(shared_key, padding.PKCS1v15())
+        )
+        out_stream.write(SEPARATOR.join(
+            [encrypted_key, self.bytes_to_str(iv_bytes), '']
+        ).encode())
+
+        encryptor = Cipher(
+            algorithms.AES(shared_key),
+            modes.CTR(iv_bytes),
             backend=default_backend()
+        ).encryptor()
+
+        def encrypt_chunks() -> Iterator[bytes]:
+            for chunk in iter_chunks(in_stream, chunk_size):
+                yield encryptor.update(chunk)
+            yield encryptor.finalize()
+
+        chunks = encrypt_chunks()
+        if not binary:
+            chunks = base64_encode_chunks(chunks)
+        for chunk in chunks:
+            out_stream.write(chunk)
+
+    def decrypt_stream(self, in_stream: BinaryIO, out_stream: BinaryIO,
+                       chunk_size: int = STREAM_CHUNK_SIZE,
+                       binary: bool = False) -> None:
+        """
+        Decrypt a stream of base64 encoded data and write the result to
+        another stream, in chunks.
+
+        The input should have the format of `encrypt_bytes_to_str`.
+
+        Parameters
+        ----------
+        in_stream: BinaryIO
+            File-like object to read the encrypted data from
+        out_stream: BinaryIO
+            File-like object to write the decrypted data to
+        chunk_size: int
+            Number of bytes to read at once
+        binary: bool
+            The encrypted message is in binary format instead of base64
+            encoded
+        """
+        (encrypted_key, iv), encrypted_chunks = split_envelope_header(
+            iter_chunks(in_stream, chunk_size)
         )
 
-        encrypted_key_bytes = pubkey.encrypt(
-            shared_key,
+        shared_key = self.private_key.decrypt(
+            self.str_to_bytes(encrypted_key.decode()),
             padding.PKCS1v15()
         )
+        decryptor = Cipher(
+            algorithms.AES(shared_key),
+            modes.CTR(self.str_to_bytes(iv.decode())),
+            backend=default_backend()
+        ).decryptor()
 
-        encrypted_key = self.bytes_to_str(encrypted_key_bytes)
-        iv = self.bytes_to_str(iv_bytes)
-        encrypted_msg = self.bytes_to_str(encrypted_msg_bytes)
-
-        return SEPARATOR.join([encrypted_key, iv, encrypted_msg])
+        if not binary:
+            encrypted_chunks = base64_decode_chunks(encrypted_chunks)
+        for chunk in encrypted_chunks:
+            out_stream.write(decryptor.update(chunk))
+        out_stream.write(decryptor.finalize())
 
     def decrypt_str_to_bytes(self, data: str) -> bytes:
         """
@@ -34,5 +34,23 @@ PING_INTERVAL_SECONDS = 60
 # expires.
 NODE_CLIENT_REFRESH_BEFORE_EXPIRES_SECONDS = 600
 
+# Public keys of organizations are cached by the clients. They are refreshed
+# after this many seconds, or earlier if the server notifies that the
+# organization has been updated.
+PUBLIC_KEY_CACHE_TTL_SECONDS = 600
+PUBLIC_KEY_CACHE_MAX_SIZE = 1000
+
+# Encrypted results are written to a temporary file before they are uploaded.
+# Up to this many bytes are kept in memory, larger results are written to disk.
+RESULT_SPOOL_MAX_SIZE = 2**20
+
+# Inputs and results larger than this many bytes are transferred in binary
+# format, instead of base64 encoded in a JSON body.
+BINARY_TRANSFER_MIN_SIZE = 2**20
+
+# After an image has been checked for updates in the registry, it is considered
+# up-to-date for this many seconds.
+IMAGE_CHECK_MAX_AGE_SECONDS = 60
+
 # The basics image can be used (mainly by the UI) to collect column names
 BASIC_PROCESSING_IMAGE = 'harbor2.vantage6.ai/algorithms/basics'
@@ -51,6 +51,9 @@ setup(
             'schema==0.7.5',
             'appdirs==1.4.4',
             'flask==2.2.5'
+        ],
+        'parquet': [
+            'pyarrow==12.0.1'
         ]
     },
     package_data={
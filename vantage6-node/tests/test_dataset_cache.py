@@ -0,0 +1,104 @@
+import os
+import tempfile
+
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+import pandas as pd
+
+from vantage6.node.dataset_cache import DatasetCache
+
+LABEL = 'default'
+
+
+class TestDatasetCache(TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache_dir = Path(tmp_dir.name) / 'cache'
+        self.source = Path(tmp_dir.name) / 'data.csv'
+        self.write_source('a,b,date\n1,x,2020-01-01\n2,,2020-01-02\n')
+
+    def write_source(self, contents: str) -> None:
+        with open(self.source, 'w') as f:
+            f.write(contents)
+
+    def add_and_convert(self) -> DatasetCache:
+        """ Register the database at a new cache and convert it directly """
+        cache = DatasetCache(self.cache_dir, 'volume')
+        cache.add(LABEL, self.source, 'csv')
+        cache._DatasetCache__worker()
+        return cache
+
+    def assert_same_data(self, filename: str) -> None:
+        """ Check that the converted file contains the csv data """
+        df = pd.read_parquet(self.cache_dir / filename)
+        expected = pd.read_csv(self.source)
+        # missing text is None in parquet, and NaN in csv
+        pd.testing.assert_frame_equal(df.isna(), expected.isna())
+        pd.testing.assert_frame_equal(df.fillna(0), expected.fillna(0))
+
+    def parquet_files(self) -> list[str]:
+        return sorted(
+            path.name for path in self.cache_dir.glob('*.parquet')
+        )
+
+    def test_convert_csv(self):
+        cache = self.add_and_convert()
+
+        filename = cache.filename(LABEL)
+        self.assertEqual(self.parquet_files(), [filename])
+        self.assert_same_data(filename)
+
+    def test_convert_csv_with_mixed_types(self):
+        # the column types inferred from the first batch do not match the
+        # later batches, so the file is converted at once
+        rows = ''.join(f'{i}\n' for i in range(300_000))
+        self.write_source(f'a\n{rows}text\n')
+
+        cache = self.add_and_convert()
+
+        self.assert_same_data(cache.filename(LABEL))
+
+    def test_unchanged_file_is_not_read(self):
+        filename = self.add_and_convert().filename(LABEL)
+
+        with patch('vantage6.node.dataset_cache.file_hash') as file_hash:
+            cache = DatasetCache(self.cache_dir, 'volume')
+            cache.add(LABEL, self.source, 'csv')
+
+        file_hash.assert_not_called()
+        self.assertEqual(cache.filename(LABEL), filename)
+        self.assertEqual(cache._to_convert, [])
+
+    def test_touched_file_is_not_converted_again(self):
+        filename = self.add_and_convert().filename(LABEL)
+        stat = self.source.stat()
+        os.utime(self.source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        with patch('vantage6.node.dataset_cache.write_csv_as_parquet') \
+                as convert:
+            cache = self.add_and_convert()
+
+        convert.assert_not_called()
+        self.assertEqual(cache.filename(LABEL), filename)
+        # the manifest now matches the new modification time
+        manifest = cache._read_manifest(LABEL)
+        self.assertEqual(manifest['mtime_ns'], self.source.stat().st_mtime_ns)
+
+    def test_changed_file_replaces_earlier_version(self):
+        old_filename = self.add_and_convert().filename(LABEL)
+        self.write_source('a,b,date\n3,z,2020-01-03\n')
+
+        # before the new version is converted, the old one is not used
+        cache = DatasetCache(self.cache_dir, 'volume')
+        cache.add(LABEL, self.source, 'csv')
+        self.assertIsNone(cache.filename(LABEL))
+
+        cache._DatasetCache__worker()
+
+        new_filename = cache.filename(LABEL)
+        self.assertNotEqual(new_filename, old_filename)
+        self.assertEqual(self.parquet_files(), [new_filename])
@@ -0,0 +1,112 @@
+import logging
+import queue
+import time
+
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from threading import Lock
+
+from vantage6.common.task_status import TaskStatus
+from vantage6.node.docker import docker_manager
+from vantage6.node.docker.docker_manager import DockerManager, FinishedRun
+from vantage6.node.docker.exceptions import UnknownAlgorithmStartFail
+
+RUN_ID = 1
+
+
+def create_docker_manager() -> DockerManager:
+    """ Create a docker manager without connecting to the docker daemon """
+    manager = DockerManager.__new__(DockerManager)
+    manager.log = logging.getLogger(__name__)
+    manager.active_tasks = []
+    manager.failed_tasks = []
+    manager.finished_runs = queue.Queue()
+    manager._last_reconciled = time.monotonic()
+    manager._starting_runs = set()
+    manager._early_finished_runs = {}
+    manager._starting_lock = Lock()
+    manager.algorithm_env = {}
+    for attribute in ('vpn_manager', 'node_name', '_DockerManager__tasks_dir',
+                      'isolated_network_mgr', 'databases', 'data_volume_name',
+                      'dataset_cache', 'alpine_image', 'proxy',
+                      'algorithm_device_requests'):
+        setattr(manager, attribute, None)
+    manager.is_docker_image_allowed = MagicMock(return_value=True)
+    manager.is_running = MagicMock(return_value=False)
+    return manager
+
+
+class TestDockerManager(TestCase):
+
+    def run_task(self, manager: DockerManager, task: MagicMock) -> tuple:
+        with patch.object(docker_manager, 'DockerTaskManager',
+                          return_value=task):
+            return manager.run(
+                run_id=RUN_ID, task_info={}, image='image',
+                docker_input=b'', tmp_vol_name='volume', token='token',
+                databases_to_use=[]
+            )
+
+    def test_container_exits_while_starting(self):
+        manager = create_docker_manager()
+        task = MagicMock(run_id=RUN_ID, status=TaskStatus.INITIALIZING)
+        task.is_finished.return_value = True
+
+        def start_container(**kwargs):
+            # the container exits before the node has finished starting it
+            self.assertIn(task, manager.active_tasks)
+            self.assertIsNone(manager._get_finished_task(
+                FinishedRun(run_id=RUN_ID, finished_at_ns=time.time_ns())
+            ))
+            task.status = TaskStatus.ACTIVE
+            return []
+
+        task.run.side_effect = start_container
+        status, _ = self.run_task(manager, task)
+
+        self.assertEqual(status, TaskStatus.ACTIVE)
+        self.assertIn(task, manager.active_tasks)
+        # the event has been put back, and now matches the run
+        finished_run = manager.finished_runs.get_nowait()
+        self.assertEqual(finished_run.run_id, RUN_ID)
+        self.assertIs(manager._get_finished_task(finished_run), task)
+
+    def test_failed_start_is_not_active(self):
+        manager = create_docker_manager()
+        task = MagicMock(run_id=RUN_ID, status=TaskStatus.INITIALIZING)
+
+        def fail_to_start(**kwargs):
+            task.status = TaskStatus.START_FAILED
+
+        task.run.side_effect = fail_to_start
+        status, _ = self.run_task(manager, task)
+
+        self.assertEqual(status, TaskStatus.START_FAILED)
+        self.assertEqual(manager.active_tasks, [])
+        self.assertEqual(manager.failed_tasks, [task])
+        self.assertEqual(manager._starting_runs, set())
+        finished_run = manager.finished_runs.get_nowait()
+        self.assertIs(manager._get_finished_task(finished_run), task)
+
+    def test_event_of_failed_attempt_is_dropped(self):
+        manager = create_docker_manager()
+        task = MagicMock(run_id=RUN_ID, status=TaskStatus.INITIALIZING)
+        task.is_finished.return_value = False
+
+        def start_container(**kwargs):
+            if task.run.call_count == 1:
+                # the container of the first attempt exits and fails
+                manager._get_finished_task(
+                    FinishedRun(run_id=RUN_ID, finished_at_ns=time.time_ns())
+                )
+                raise UnknownAlgorithmStartFail
+            task.status = TaskStatus.ACTIVE
+            return []
+
+        task.run.side_effect = start_container
+        with patch.object(docker_manager.time, 'sleep'):
+            status, _ = self.run_task(manager, task)
+
+        self.assertEqual(status, TaskStatus.ACTIVE)
+        self.assertEqual(task.run.call_count, 2)
+        self.assertTrue(manager.finished_runs.empty())
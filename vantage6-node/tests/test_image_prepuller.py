@@ -0,0 +1,168 @@
+import datetime
+import logging
+import threading
+import time
+
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from vantage6.common.docker import addons
+from vantage6.common.docker.addons import ImageCheckCache, pull_if_newer
+from vantage6.node.docker import image_prepuller
+from vantage6.node.docker.image_prepuller import (
+    ImagePrepuller, allowed_image_names
+)
+
+IMAGE = 'harbor2.vantage6.ai/demo/average'
+CREATED = datetime.datetime(2023, 1, 1)
+log = logging.getLogger(__name__)
+
+
+class TestPullIfNewer(TestCase):
+
+    def setUp(self):
+        ImageCheckCache().configure(60)
+        self.addCleanup(ImageCheckCache().configure, None)
+        # the local image, which is replaced when the image is pulled
+        self.local_digest = 'sha256:old'
+        self.remote_digest = 'sha256:old'
+        self.docker = MagicMock()
+        self.docker.images.pull.side_effect = self.pull
+
+        local = patch.object(
+            addons, 'inspect_local_image_timestamp',
+            side_effect=lambda *args, **kwargs: (CREATED, self.local_digest)
+        )
+        remote = patch.object(
+            addons, 'inspect_remote_image_timestamp',
+            side_effect=self.remote_image
+        )
+        local.start()
+        self.inspect_remote = remote.start()
+        self.addCleanup(patch.stopall)
+
+    def remote_image(self, *args, **kwargs):
+        return CREATED + datetime.timedelta(days=1), self.remote_digest
+
+    def pull(self, image):
+        self.local_digest = self.remote_digest
+
+    def test_check_is_reused_within_max_age(self):
+        pull_if_newer(self.docker, IMAGE, log)
+        pull_if_newer(self.docker, IMAGE, log)
+
+        self.assertEqual(self.inspect_remote.call_count, 1)
+        self.docker.images.pull.assert_not_called()
+
+        # after the freshness window, the registry is contacted again
+        now = time.monotonic()
+        with patch.object(addons.time, 'monotonic', return_value=now + 61):
+            pull_if_newer(self.docker, IMAGE, log)
+        self.assertEqual(self.inspect_remote.call_count, 2)
+
+    def test_changed_local_image_is_checked_again(self):
+        pull_if_newer(self.docker, IMAGE, log)
+
+        # e.g. the image has been pulled or built by hand
+        self.local_digest = 'sha256:other'
+        pull_if_newer(self.docker, IMAGE, log)
+
+        self.assertEqual(self.inspect_remote.call_count, 2)
+
+    def test_pulled_image_is_reused(self):
+        self.remote_digest = 'sha256:new'
+        pull_if_newer(self.docker, IMAGE, log)
+        self.docker.images.pull.assert_called_once_with(IMAGE)
+
+        # the digest of the pulled image is stored
+        pull_if_newer(self.docker, IMAGE, log)
+        self.assertEqual(self.inspect_remote.call_count, 1)
+
+    def test_concurrent_checks_contact_registry_once(self):
+        def slow_inspect_remote(*args, **kwargs):
+            time.sleep(0.1)
+            return self.remote_image()
+
+        self.inspect_remote.side_effect = slow_inspect_remote
+        threads = [
+            threading.Thread(target=pull_if_newer,
+                             args=(self.docker, IMAGE, log))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.inspect_remote.call_count, 1)
+
+    def test_disabled_cache(self):
+        ImageCheckCache().configure(0)
+        pull_if_newer(self.docker, IMAGE, log)
+        pull_if_newer(self.docker, IMAGE, log)
+
+        self.assertEqual(self.inspect_remote.call_count, 2)
+
+
+class TestImagePrepuller(TestCase):
+
+    def test_images(self):
+        prepuller = ImagePrepuller(
+            MagicMock(),
+            policies={'allowed_algorithms': [f'^{IMAGE}$', 'other/.*']},
+            config={'recent_images': 2}
+        )
+        for image in ('first', 'second', IMAGE, 'third'):
+            prepuller.note(image)
+
+        # the allowed images, followed by the most recent images first,
+        # without duplicates
+        self.assertEqual(prepuller.images(), [IMAGE, 'third'])
+
+    def test_worker_pulls_all_images(self):
+        prepuller = ImagePrepuller(
+            MagicMock(), policies={'allowed_algorithms': f'^{IMAGE}$'}
+        )
+        prepuller.note('recent')
+
+        def pull(docker, image, log):
+            if image == 'recent':
+                prepuller.stop()
+            else:
+                # a failure does not prevent that the other images are pulled
+                raise RuntimeError('registry is down')
+
+        with patch.object(image_prepuller, 'pull_if_newer',
+                          side_effect=pull) as pull_if_newer_:
+            prepuller._ImagePrepuller__worker()
+
+        self.assertEqual(
+            [call.args[1] for call in pull_if_newer_.call_args_list],
+            [IMAGE, 'recent']
+        )
+
+
+class TestAllowedImageNames(TestCase):
+
+    def test_anchored_names(self):
+        self.assertEqual(allowed_image_names([
+            r'^harbor2\.vantage6\.ai/demo/average$',
+            '^harbor2.vantage6.ai/demo/average:1.0$',
+            '^harbor2.vantage6.ai/demo/average@sha256:abc$',
+        ]), [IMAGE, f'{IMAGE}:1.0', f'{IMAGE}@sha256:abc'])
+
+    def test_patterns_are_not_names(self):
+        self.assertEqual(allowed_image_names([
+            # not anchored at both ends, so other images match as well
+            IMAGE,
+            f'^{IMAGE}',
+            f'{IMAGE}$',
+            # special characters
+            r'^harbor2\.vantage6\.ai/demo/.*$',
+            '^harbor2.vantage6.ai/demo/(average|sum)$',
+            r'^harbor2\.vantage6\.ai/demo/average:\d+$',
+        ]), [])
+
+    def test_single_expression(self):
+        self.assertEqual(allowed_image_names(f'^{IMAGE}$'), [IMAGE])
+        self.assertEqual(allowed_image_names(None), [])
@@ -0,0 +1,107 @@
+import base64
+import io
+import json
+
+from http import HTTPStatus
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from vantage6.common.encryption import DummyCryptor
+from vantage6.node import proxy_server
+
+SERVER_URL = 'http://server/api'
+
+
+def create_response(status_code: int = HTTPStatus.OK, json_: dict = None,
+                    body: bytes = b'') -> MagicMock:
+    """ Create a response of the vantage6 server """
+    response = MagicMock(status_code=status_code)
+    response.__enter__.return_value = response
+    response.headers = {'Content-Type': 'application/json' if json_ else
+                        'application/octet-stream'}
+    response.json.return_value = json_
+    response.content = body
+    response.raw = io.BytesIO(body)
+    response.iter_content.side_effect = \
+        lambda size: (body[i:i + size] for i in range(0, len(body), size))
+    return response
+
+
+class TestProxyServer(TestCase):
+
+    def setUp(self):
+        proxy_server.app.config['SERVER_IO'] = MagicMock(
+            cryptor=DummyCryptor()
+        )
+        self.addCleanup(proxy_server.app.config.update, SERVER_IO=None)
+        patcher = patch.object(proxy_server, 'server_url', SERVER_URL)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = proxy_server.app.test_client()
+
+    def test_results_are_downloaded_in_binary_format(self):
+        raw = bytes(range(256)) * 10
+        runs = {
+            'data': [{'id': 1, 'task': {'id': 5}},
+                     {'id': 2, 'task': {'id': 5}}],
+            'links': {'next': None},
+        }
+        responses = {
+            f'{SERVER_URL}/run': create_response(json_=runs),
+            f'{SERVER_URL}/run/1/result': create_response(body=raw),
+            f'{SERVER_URL}/run/2/result': create_response(
+                HTTPStatus.NOT_FOUND, json_={'msg': 'Run has no result'}
+            ),
+        }
+
+        with patch.object(proxy_server.requests, 'get',
+                          side_effect=lambda url, **kwargs: responses[url]) \
+                as get:
+            response = self.client.get('/result?task_id=5')
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(json.loads(response.data), {
+            'data': [
+                {'id': 1, 'task': {'id': 5},
+                 'result': base64.b64encode(raw).decode()},
+                {'id': 2, 'task': {'id': 5}, 'result': None},
+            ],
+            'links': {'next': None},
+        })
+        # the runs are requested without their (large) payloads
+        self.assertEqual(get.call_args_list[0].kwargs['params'],
+                         {'task_id': '5', 'link_payloads': 'true'})
+        for id_ in (1, 2):
+            responses[f'{SERVER_URL}/run/{id_}/result'].json \
+                .assert_not_called()
+
+    def test_failed_result_download(self):
+        responses = {
+            f'{SERVER_URL}/run': create_response(
+                json_={'data': [{'id': 1}], 'links': {}}
+            ),
+            f'{SERVER_URL}/run/1/result': create_response(
+                HTTPStatus.UNAUTHORIZED, json_={'msg': 'Unauthorized'}
+            ),
+        }
+        with patch.object(proxy_server.requests, 'get',
+                          side_effect=lambda url, **kwargs: responses[url]):
+            response = self.client.get('/result?task_id=5')
+
+        self.assertEqual(response.status_code,
+                         HTTPStatus.INTERNAL_SERVER_ERROR)
+
+    def test_run_is_streamed(self):
+        body = json.dumps({'id': 1, 'input': 'x' * 10**6}).encode()
+        upstream = create_response(body=body)
+        upstream.headers = {'Content-Type': 'application/json'}
+
+        with patch.object(proxy_server.requests, 'get',
+                          return_value=upstream) as get:
+            response = self.client.get('/run/1')
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.data, body)
+        self.assertEqual(response.content_type, 'application/json')
+        self.assertTrue(get.call_args.kwargs['stream'])
+        upstream.json.assert_not_called()
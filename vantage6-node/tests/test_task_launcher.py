@@ -0,0 +1,164 @@
+import threading
+
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from vantage6.node import task_launcher
+from vantage6.node.task_launcher import TaskLauncher
+
+RUN_ID = 1
+PARENT_TASK_ID = 10
+
+
+def create_run(run_id: int = RUN_ID, parent_id: int = None) -> dict:
+    """ Create a run including its task, as received from the server """
+    parent = {'id': parent_id} if parent_id else None
+    return {'id': run_id, 'task': {'id': 100 + run_id, 'parent': parent}}
+
+
+def create_docker(running: list[int] = None,
+                  started: list[int] = None) -> MagicMock:
+    """
+    Create a docker manager that runs algorithms of the tasks in `running`,
+    of which the ones in `started` have a started container
+    """
+    running = running or []
+    started = running if started is None else started
+    docker = MagicMock()
+    docker.active_task_ids.side_effect = \
+        lambda started_only=False: started if started_only else running
+    docker.is_running.return_value = False
+    return docker
+
+
+class TestTaskLauncher(TestCase):
+
+    def create_launcher(self, docker: MagicMock = None, start=None,
+                        **config) -> TaskLauncher:
+        launcher = TaskLauncher(start or MagicMock(),
+                                docker or create_docker(), config)
+        self.addCleanup(launcher.shutdown)
+        return launcher
+
+    def test_add_rejects_duplicate_runs(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def start(task_incl_run):
+            started.set()
+            release.wait(timeout=10)
+
+        launcher = self.create_launcher(start=start)
+
+        # a run that waits to be started
+        self.assertTrue(launcher.add(create_run()))
+        self.assertFalse(launcher.add(create_run()))
+
+        # a run that is being started
+        launcher.dispatch()
+        self.assertTrue(started.wait(timeout=10))
+        self.assertTrue(launcher.is_launching(RUN_ID))
+        self.assertFalse(launcher.add(create_run()))
+
+        release.set()
+        launcher.shutdown()
+        self.assertFalse(launcher.is_launching(RUN_ID))
+
+        # a run that is running
+        launcher.docker.is_running.return_value = True
+        self.assertFalse(launcher.add(create_run()))
+        launcher.docker.is_running.assert_called_with(RUN_ID)
+        self.assertFalse(launcher.is_launching(RUN_ID))
+
+        launcher.docker.is_running.return_value = False
+        self.assertTrue(launcher.add(create_run()))
+
+    def test_run_is_admitted_on_idle_node(self):
+        launcher = self.create_launcher(
+            max_running_algorithms=1, max_cpu_load=0.5,
+            min_available_memory_mb=1024
+        )
+        with patch.object(task_launcher, 'cpu_load', return_value=10), \
+                patch.object(task_launcher, 'available_memory_mb',
+                             return_value=0):
+            self.assertTrue(launcher.is_admitted(create_run()))
+
+            # a run that is being started also occupies the node
+            launcher._starting.add(2)
+            self.assertFalse(launcher.is_admitted(create_run()))
+
+    def test_subtask_of_running_task_is_admitted(self):
+        docker = create_docker(running=[PARENT_TASK_ID])
+        launcher = self.create_launcher(docker, max_running_algorithms=1)
+
+        self.assertTrue(launcher.is_admitted(
+            create_run(parent_id=PARENT_TASK_ID)
+        ))
+        self.assertFalse(launcher.is_admitted(create_run(parent_id=20)))
+        self.assertFalse(launcher.is_admitted(create_run()))
+
+    def test_max_running_algorithms(self):
+        # the algorithm of task 11 is registered, but not started yet
+        docker = create_docker(running=[10, 11], started=[10])
+
+        launcher = self.create_launcher(docker, max_running_algorithms=2)
+        self.assertTrue(launcher.is_admitted(create_run()))
+
+        # runs that are being started count as running
+        launcher._starting.add(2)
+        self.assertFalse(launcher.is_admitted(create_run()))
+
+        launcher = self.create_launcher(docker, max_running_algorithms=1)
+        self.assertFalse(launcher.is_admitted(create_run()))
+
+    def test_max_cpu_load(self):
+        launcher = self.create_launcher(create_docker(running=[10]),
+                                        max_cpu_load=0.8)
+        with patch.object(task_launcher, 'cpu_load', return_value=0.9):
+            self.assertFalse(launcher.is_admitted(create_run()))
+        with patch.object(task_launcher, 'cpu_load', return_value=0.7):
+            self.assertTrue(launcher.is_admitted(create_run()))
+
+    def test_min_available_memory(self):
+        launcher = self.create_launcher(create_docker(running=[10]),
+                                        min_available_memory_mb=1024)
+        with patch.object(task_launcher, 'available_memory_mb',
+                          return_value=512):
+            self.assertFalse(launcher.is_admitted(create_run()))
+        with patch.object(task_launcher, 'available_memory_mb',
+                          return_value=2048):
+            self.assertTrue(launcher.is_admitted(create_run()))
+        # the run is admitted if the memory cannot be determined
+        with patch.object(task_launcher, 'available_memory_mb',
+                          return_value=None):
+            self.assertTrue(launcher.is_admitted(create_run()))
+
+    def test_waiting_run_does_not_hold_up_others(self):
+        start = MagicMock()
+        launcher = self.create_launcher(
+            create_docker(running=[PARENT_TASK_ID]), start=start,
+            max_running_algorithms=1
+        )
+        launcher.add(create_run(run_id=1))
+        launcher.add(create_run(run_id=2, parent_id=PARENT_TASK_ID))
+
+        launcher.dispatch()
+        self.assertTrue(launcher.is_launching(1))
+        launcher.shutdown()
+
+        start.assert_called_once_with(
+            create_run(run_id=2, parent_id=PARENT_TASK_ID)
+        )
+
+    def test_failed_start_is_cleaned_up(self):
+        start = MagicMock(side_effect=RuntimeError('docker is gone'))
+        launcher = self.create_launcher(start=start)
+        launcher.add(create_run())
+
+        with self.assertLogs(TaskLauncher.log, 'ERROR'):
+            launcher.dispatch()
+            launcher.shutdown()
+
+        start.assert_called_once()
+        self.assertEqual(launcher._starting, set())
+        self.assertFalse(launcher.is_launching(RUN_ID))
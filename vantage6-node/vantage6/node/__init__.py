@@ -3,20 +3,27 @@ A node in its simplest would retrieve a task from the central server by
 an API call, run this task and finally return the results to the central
 server again.
 
-The node application runs four threads:
+The node application runs five threads:
 
 *Main thread*
-    Checks the task queue and run the next task if there is one available.
+    Checks the task queue and hands the tasks to the task launcher, which
+    starts them in a pool of threads when the node has the capacity to run
+    them (see :mod:`vantage6.node.task_launcher`).
 *Listening thread*
     Listens for incoming websocket messages. Among other functionality, it adds
     new tasks to the task queue.
 *Speaking thread*
     Waits for tasks to finish. When they do, return the results to the central
-    server.
+    server. The results are uploaded by a bounded pool of worker threads, so
+    that a slow upload does not hold up other results.
 *Proxy server thread*
     Algorithm containers are isolated from the internet for security reasons.
     The local proxy server provides an interface to the central server for
     algorithm containers to create subtasks and retrieve their results.
+*Image prepull thread*
+    Keeps the images that are likely to be used up-to-date, so that runs do
+    not have to wait for the image to be pulled (see
+    :mod:`vantage6.node.docker.image_prepuller`).
 
 The node connects to the server using a websocket connection. This connection
 is mainly used for sharing status updates. This avoids the need for polling to
@@ -33,15 +40,17 @@ import json
 import shutil
 import requests.exceptions
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from threading import Thread
+from threading import Thread, BoundedSemaphore
 from socketio import Client as SocketIO
 from gevent.pywsgi import WSGIServer
 from enum import Enum
 
 from vantage6.common import logger_name
 from vantage6.common.docker.addons import (
-    ContainerKillListener, check_docker_running, running_in_docker
+    ContainerKillListener, check_docker_running, running_in_docker,
+    ImageCheckCache
 )
 from vantage6.common.globals import VPN_CONFIG_FILE, PING_INTERVAL_SECONDS
 from vantage6.common.exceptions import AuthenticationException
@@ -52,16 +61,19 @@ from vantage6.cli.context import NodeContext
 from vantage6.node.context import DockerNodeContext
 from vantage6.node.globals import (
     NODE_PROXY_SERVER_HOSTNAME, SLEEP_BTWN_NODE_LOGIN_TRIES,
-    TIME_LIMIT_RETRY_CONNECT_NODE, TIME_LIMIT_INITIAL_CONNECTION_WEBSOCKET
+    TIME_LIMIT_RETRY_CONNECT_NODE, TIME_LIMIT_INITIAL_CONNECTION_WEBSOCKET,
+    DEFAULT_MAX_PARALLEL_RESULT_UPLOADS
 )
 from vantage6.common.client.node_client import NodeClient
 from vantage6.node import proxy_server
 from vantage6.node.util import get_parent_id
-from vantage6.node.docker.docker_manager import DockerManager
+from vantage6.node.docker.docker_manager import DockerManager, Result
 from vantage6.node.docker.vpn_manager import VPNManager
 from vantage6.node.socket import NodeTaskNamespace
 from vantage6.node.docker.ssh_tunnel import SSHTunnel
 from vantage6.node.docker.squid import Squid
+from vantage6.node.task_launcher import TaskLauncher
+from vantage6.node.docker.image_prepuller import ImagePrepuller
 
 
 class VPNConnectMode(Enum):
@@ -164,6 +176,24 @@ class Node:
             proxy=self.squid
         )
 
+        # images are checked for updates at most once in a while, and the
+        # images that are likely to be used are pulled in the background
+        image_pull_config = self.config.get('image_pull') or {}
+        ImageCheckCache().configure(image_pull_config.get('max_age'))
+        self.__prepuller = ImagePrepuller(
+            docker=self.__docker.docker,
+            policies=self.config.get('policies'),
+            config=image_pull_config
+        )
+        self.__prepuller.start()
+
+        # runs are started in parallel by the task launcher
+        self.__launcher = TaskLauncher(
+            start=self.__start_task,
+            docker=self.__docker,
+            config=self.config.get('task_launcher')
+        )
+
         # Create a long-lasting websocket connection.
         self.log.debug("Creating websocket connection with the server")
         self.connect_to_socket()
@@ -302,7 +332,11 @@ class Node:
         """
         for task_result in task_results:
             try:
-                if not self.__docker.is_running(task_result['id']):
+                if self.__launcher.is_launching(task_result['id']):
+                    self.log.debug(
+                        f"Run {task_result['id']} is already being started"
+                    )
+                elif not self.__docker.is_running(task_result['id']):
                     self.queue.put(task_result)
                 else:
                     self.log.info(
@@ -358,6 +392,9 @@ class Node:
             databases_to_use=task.get('databases', [])
         )
 
+        if task_status != TaskStatus.NOT_ALLOWED:
+            self.__prepuller.note(task["image"])
+
         # save task status to the server
         update = {'status': task_status}
         if task_status == TaskStatus.NOT_ALLOWED:
@@ -436,12 +473,34 @@ class Node:
 
         Routine that is in a seperate thread sending results
         to the server when they come available.
+
+        The status change of a run is announced on the socket channel by this
+        thread, in the order in which the runs finish. The results are then
+        handed to a pool of workers that encrypt and upload them in parallel.
+        The number of parallel uploads is limited by the configuration option
+        `max_parallel_result_uploads`. When all workers are busy, no new
+        results are read from disk.
         """
-        # TODO change to a single request, might need to reconsider
-        #     the flow
         self.log.debug("Waiting for results to send to the server")
 
+        max_uploads = self.config.get(
+            'max_parallel_result_uploads', DEFAULT_MAX_PARALLEL_RESULT_UPLOADS
+        )
+        if isinstance(max_uploads, bool) or \
+                not isinstance(max_uploads, int) or max_uploads < 1:
+            self.log.warning(
+                "Configuration option 'max_parallel_result_uploads' should be "
+                f"a positive integer, but is '{max_uploads}'. Using the "
+                f"default of {DEFAULT_MAX_PARALLEL_RESULT_UPLOADS} instead."
+            )
+            max_uploads = DEFAULT_MAX_PARALLEL_RESULT_UPLOADS
+        upload_pool = ThreadPoolExecutor(
+            max_workers=max_uploads, thread_name_prefix='result-upload'
+        )
+        upload_slots = BoundedSemaphore(max_uploads)
+
         while True:
+            upload_slots.acquire()
             try:
                 results = self.__docker.get_result()
 
@@ -460,46 +519,44 @@ class Node:
                     },
                     namespace='/tasks',
                 )
+            except Exception:
+                self.log.exception('Speaking thread had an exception')
+                upload_slots.release()
+                continue
 
-                self.log.info(
-                    f"Sending result (run={results.run_id}) to the server!")
-
-                # FIXME: why are we retrieving the result *again*? Shouldn't we
-                # just store the task_id when retrieving the task the first
-                # time?
-                response = self.client.request(
-                    f"run/{results.run_id}"
-                )
-                task_id = response.get("task").get("id")
+            upload = upload_pool.submit(self.__send_result, results)
+            upload.add_done_callback(lambda _: upload_slots.release())
 
-                if not task_id:
-                    self.log.error(
-                        f"task_id of run (id={results.run_id}) "
-                        f"could not be retrieved"
-                    )
-                    return
+    def __send_result(self, results: Result) -> None:
+        """
+        Encrypt the result of a finished run and send it to the server.
 
-                response = self.client.request(f"task/{task_id}")
+        Runs in one of the worker threads of the speaking worker.
 
-                init_org = response.get("init_org")
-                if not init_org:
-                    self.log.error(
-                        f"Initiator organization from task (id={task_id}) "
-                        "could not be retrieved!"
-                    )
+        Parameters
+        ----------
+        results : Result
+            Result of the finished run
+        """
+        try:
+            self.log.info(
+                f"Sending result (run={results.run_id}) to the server!")
 
-                self.client.run.patch(
-                    id_=results.run_id,
-                    data={
-                        'result': results.data,
-                        'log': results.logs,
-                        'status': results.status,
-                        'finished_at': datetime.datetime.now().isoformat(),
-                    },
-                    init_org_id=init_org.get("id"),
-                )
-            except Exception:
-                self.log.exception('Speaking thread had an exception')
+            self.client.run.patch(
+                id_=results.run_id,
+                data={
+                    'result': results.data,
+                    'log': results.logs,
+                    'status': results.status,
+                    'finished_at': datetime.datetime.now().isoformat(),
+                },
+                init_org_id=results.init_org_id,
+            )
+        except Exception:
+            self.log.exception(
+                f'Sending result (run={results.run_id}) had an exception')
+        finally:
+            results.data.close()
 
     def __print_connection_error_logs(self):
         """ Print error message when node cannot find the server """
@@ -943,36 +1000,31 @@ class Node:
             time.sleep(PING_INTERVAL_SECONDS)
 
     def run_forever(self) -> None:
-        """Keep checking queue for incoming tasks (and execute them)."""
+        """
+        Keep checking queue for incoming tasks, and hand them to the task
+        launcher, which starts them as soon as the node has the capacity.
+        """
         kill_listener = ContainerKillListener()
         try:
-            while True:
-                # blocking untill a task comes available
-                # timeout specified, else Keyboard interupts are ignored
-                self.log.info("Waiting for new tasks....")
-
-                while not kill_listener.kill_now:
-                    try:
-                        taskresult = self.queue.get(timeout=1)
-                        # if no item is returned, the Empty exception is
-                        # triggered, thus break statement is not reached
-                        break
-
-                    except queue.Empty:
-                        pass
-
-                    except Exception as e:
-                        self.log.debug(e)
-
-                if kill_listener.kill_now:
-                    raise InterruptedError
+            self.log.info("Waiting for new tasks....")
+            while not kill_listener.kill_now:
+                try:
+                    # timeout specified, else Keyboard interupts are ignored.
+                    # The timeout also makes sure that waiting runs are
+                    # started when capacity becomes available.
+                    self.__launcher.add(self.queue.get(timeout=1))
+                except queue.Empty:
+                    pass
+                except Exception as e:
+                    self.log.debug(e)
 
-                # if task comes available, attempt to execute it
                 try:
-                    self.__start_task(taskresult)
+                    self.__launcher.dispatch()
                 except Exception as e:
                     self.log.exception(e)
 
+            raise InterruptedError
+
         except (KeyboardInterrupt, InterruptedError):
             self.log.info("Node is interrupted, shutting down...")
             self.cleanup()
@@ -1081,6 +1133,10 @@ class Node:
         if hasattr(self, 'ssh_tunnels') and self.ssh_tunnels:
             for tunnel in self.ssh_tunnels:
                 tunnel.stop()
+        if hasattr(self, '_Node__prepuller') and self.__prepuller:
+            self.__prepuller.stop()
+        if hasattr(self, '_Node__launcher') and self.__launcher:
+            self.__launcher.shutdown()
         if hasattr(self, '_Node__docker') and self.__docker:
             self.__docker.cleanup()
 
@@ -0,0 +1,320 @@
+"""
+Cache of file databases converted to parquet.
+
+Algorithms read csv and excel databases with pandas, which parses the entire
+file every time. An iterative algorithm may start many runs that each parse
+the same large file. The node therefore converts these databases to parquet
+once, in the background after it has started. Algorithm containers get the
+converted file in a read-only mount, and the algorithm tools read it instead
+of the original file (see
+:func:`vantage6.algorithm.tools.decorators._get_data_from_label`).
+
+A converted file is only used as long as it matches the original file. For
+every database, a manifest records the path, modification time, size and
+SHA-256 hash of the original file. If the path, modification time or size
+have changed, the hash is computed again, and the database is only converted
+again if its contents have changed.
+
+CSV databases are converted in batches, so that large files do not have to
+fit in memory. The column types are inferred from the first batch; if a later
+batch does not match them, the file is converted with pandas instead. Excel
+databases are converted from their first sheet, so the converted file is only
+used when the task does not specify another sheet. Converting requires
+`pyarrow`. The cache is configured in the `dataset_cache` section of
+the node configuration.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+from pathlib import Path
+
+import pandas as pd
+
+from vantage6.common import logger_name
+
+try:
+    import pyarrow
+    import pyarrow.csv
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# types of file databases that are converted
+CONVERTIBLE_DATABASE_TYPES = ('csv', 'excel')
+
+
+class DatasetCache:
+    """
+    Converts file databases to parquet and keeps track of the converted
+    files that are up-to-date.
+
+    Parameters
+    ----------
+    cache_dir: Path
+        Directory in which the converted files are stored
+    mount_source: str | Path
+        Docker volume name or host directory that contains `cache_dir`, to
+        mount in algorithm containers
+    config: dict | None
+        The `dataset_cache` section of the node configuration
+    """
+    log = logging.getLogger(logger_name(__name__))
+
+    def __init__(self, cache_dir: Path, mount_source: str | Path,
+                 config: dict | None = None) -> None:
+        config = config or {}
+        self.cache_dir = Path(cache_dir)
+        self.mount_source = mount_source
+        self.enabled = config.get('enabled', True)
+        if self.enabled and pyarrow is None:
+            self.log.info("Databases are not converted to parquet, as "
+                          "pyarrow is not installed")
+            self.enabled = False
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+        # converted files that are up-to-date, by database label
+        self._files: dict[str, str] = {}
+        self._to_convert: list[tuple[str, Path, str]] = []
+        self._lock = threading.Lock()
+
+    def add(self, label: str, source: str | Path, db_type: str) -> None:
+        """
+        Register a file database. If the converted file is not up-to-date, it
+        is converted when :meth:`start` is called.
+
+        Parameters
+        ----------
+        label: str
+            Label of the database
+        source: str | Path
+            Path to the original file
+        db_type: str
+            Type of the database
+        """
+        if not self.enabled or db_type not in CONVERTIBLE_DATABASE_TYPES:
+            return
+        source = Path(source)
+        manifest = self._read_manifest(label)
+        if manifest and self._matches(manifest, source):
+            self.log.debug(f"Converted database '{label}' is up-to-date")
+            with self._lock:
+                self._files[label] = manifest['file']
+            return
+        self._to_convert.append((label, source, db_type))
+
+    def start(self) -> None:
+        """ Convert the databases that are not up-to-date, in a thread. """
+        if not self._to_convert:
+            return
+        t = threading.Thread(target=self.__worker, daemon=True)
+        t.start()
+
+    def filename(self, label: str) -> str | None:
+        """
+        Get the name of the converted file of a database.
+
+        Parameters
+        ----------
+        label: str
+            Label of the database
+
+        Returns
+        -------
+        str | None
+            Name of the converted file in the cache directory, or None if
+            there is no up-to-date converted file
+        """
+        with self._lock:
+            return self._files.get(label)
+
+    def __worker(self) -> None:
+        """ Convert the databases one at a time. """
+        to_convert, self._to_convert = self._to_convert, []
+        for label, source, db_type in to_convert:
+            try:
+                self._convert(label, source, db_type)
+            except Exception as e:
+                self.log.warning(f"Could not convert database '{label}' to "
+                                 f"parquet: {e}")
+
+    def _convert(self, label: str, source: Path, db_type: str) -> None:
+        """
+        Convert a database to parquet, unless only the modification time or
+        path of the original file has changed.
+
+        Parameters
+        ----------
+        label: str
+            Label of the database
+        source: Path
+            Path to the original file
+        db_type: str
+            Type of the database
+        """
+        digest = file_hash(source)
+        manifest = self._read_manifest(label)
+        if manifest and manifest['sha256'] == digest and \
+                (self.cache_dir / manifest['file']).exists():
+            self.log.debug(f"Contents of database '{label}' have not changed")
+            self._write_manifest(label, source, digest, manifest['file'])
+            return
+
+        self.log.info(f"Converting database '{label}' to parquet")
+        filename = f"{label}-{digest[:16]}.parquet"
+        tmp_path = self.cache_dir / f"{filename}.tmp"
+        if db_type == 'excel':
+            pd.read_excel(source).to_parquet(tmp_path, index=False)
+        else:
+            try:
+                write_csv_as_parquet(source, tmp_path)
+            except pyarrow.ArrowInvalid as e:
+                self.log.debug(f"Could not convert database '{label}' in "
+                               f"batches, converting it at once: {e}")
+                pd.read_csv(source).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self.cache_dir / filename)
+        self._write_manifest(label, source, digest, filename)
+
+        # remove the files of earlier versions of the database
+        earlier_version = re.compile(rf"{re.escape(label)}-[0-9a-f]{{16}}"
+                                     r"\.parquet")
+        for path in self.cache_dir.iterdir():
+            if path.name != filename and earlier_version.fullmatch(path.name):
+                path.unlink(missing_ok=True)
+        self.log.info(f"Converted database '{label}' to parquet")
+
+    def _matches(self, manifest: dict, source: Path) -> bool:
+        """
+        Check whether a manifest describes the current original file, without
+        reading the file.
+
+        Parameters
+        ----------
+        manifest: dict
+            Manifest of the converted file
+        source: Path
+            Path to the original file
+
+        Returns
+        -------
+        bool
+            True if the path, modification time and size of the file are
+            unchanged, and the converted file exists
+        """
+        stat = source.stat()
+        return manifest['source'] == str(source) and \
+            manifest['mtime_ns'] == stat.st_mtime_ns and \
+            manifest['size'] == stat.st_size and \
+            (self.cache_dir / manifest['file']).exists()
+
+    def _read_manifest(self, label: str) -> dict | None:
+        """
+        Read the manifest of the converted file of a database.
+
+        Parameters
+        ----------
+        label: str
+            Label of the database
+
+        Returns
+        -------
+        dict | None
+            The manifest, or None if there is no (valid) manifest
+        """
+        try:
+            with open(self.cache_dir / f"{label}.json") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, label: str, source: Path, digest: str,
+                        filename: str) -> None:
+        """
+        Write the manifest of the converted file of a database, and mark the
+        converted file as up-to-date.
+
+        Parameters
+        ----------
+        label: str
+            Label of the database
+        source: Path
+            Path to the original file
+        digest: str
+            SHA-256 hash of the original file
+        filename: str
+            Name of the converted file
+        """
+        stat = source.stat()
+        manifest = {
+            'source': str(source),
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': digest,
+            'file': filename,
+        }
+        with open(self.cache_dir / f"{label}.json", 'w') as f:
+            json.dump(manifest, f)
+        with self._lock:
+            self._files[label] = filename
+
+
+def write_csv_as_parquet(source: Path, destination: Path) -> None:
+    """
+    Convert a csv file to parquet batch by batch, without reading the entire
+    file in memory.
+
+    Parameters
+    ----------
+    source: Path
+        Path to the csv file
+    destination: Path
+        Path to write the parquet file to
+
+    Raises
+    ------
+    pyarrow.ArrowInvalid
+        If the file cannot be parsed, or a batch does not match the column
+        types inferred from the first batch
+    """
+    # give algorithms the same data as when they read the csv file with
+    # pandas, which reads empty text as missing, and does not parse dates
+    convert_options = pyarrow.csv.ConvertOptions(strings_can_be_null=True)
+    reader = pyarrow.csv.open_csv(source, convert_options=convert_options)
+    temporal_columns = {
+        field.name: pyarrow.string() for field in reader.schema
+        if pyarrow.types.is_temporal(field.type)
+    }
+    if temporal_columns:
+        reader.close()
+        convert_options.column_types = temporal_columns
+        reader = pyarrow.csv.open_csv(source, convert_options=convert_options)
+    with pyarrow.parquet.ParquetWriter(destination, reader.schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+
+
+def file_hash(path: Path) -> str:
+    """
+    Compute the SHA-256 hash of a file.
+
+    Parameters
+    ----------
+    path: Path
+        Path to the file
+
+    Returns
+    -------
+    str
+        Hexadecimal hash of the file
+    """
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(2**20), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
@@ -6,15 +6,18 @@ is a wrapper around the docker module. It has methods
 for creating docker networks, docker volumes, start containers and retrieve
 results from finished containers.
 """
+import io
 import os
 import time
 import logging
 import docker
+import queue
 import re
 import shutil
 
-from typing import NamedTuple
+from typing import NamedTuple, BinaryIO
 from pathlib import Path
+from threading import Lock, Thread
 
 from vantage6.common import logger_name
 from vantage6.common import get_database_config
@@ -25,6 +28,11 @@ from vantage6.common.docker.network_manager import NetworkManager
 from vantage6.algorithm.tools.wrappers import get_column_names
 from vantage6.cli.context import NodeContext
 from vantage6.node.context import DockerNodeContext
+from vantage6.node.globals import (
+    CONTAINER_RECONCILE_INTERVAL, SLEEP_BTWN_DOCKER_EVENT_RECONNECT,
+    DATASET_CACHE_FOLDER
+)
+from vantage6.node.dataset_cache import DatasetCache
 from vantage6.node.docker.docker_base import DockerBaseManager
 from vantage6.node.docker.vpn_manager import VPNManager
 from vantage6.node.docker.task_manager import DockerTaskManager
@@ -49,17 +57,22 @@ class Result(NamedTuple):
         ID of the current algorithm run
     logs: str
         Logs attached to current algorithm run
-    data: str
-        Output data of the algorithm
+    data: BinaryIO
+        Opened output file of the algorithm. It is read in chunks when the
+        result is sent to the server, and should be closed afterwards.
     status_code: int
         Status code of the algorithm run
+    init_org_id: int
+        ID of the organization that created the task, for which the results
+        are encrypted
     """
     run_id: int
     task_id: int
     logs: str
-    data: str
+    data: BinaryIO
     status: str
     parent_id: int | None
+    init_org_id: int
 
 
 class ToBeKilled(NamedTuple):
@@ -76,6 +89,22 @@ class KilledRun(NamedTuple):
     parent_id: int
 
 
+class FinishedRun(NamedTuple):
+    """
+    Data class to store which runs are ready to be handed off
+
+    Attributes
+    ----------
+    run_id: int
+        ID of the algorithm run
+    finished_at_ns: int | None
+        Time (in ns since epoch) at which docker reported that the container
+        stopped. None if the run was not found through a docker event.
+    """
+    run_id: int
+    finished_at_ns: int | None
+
+
 class DockerManager(DockerBaseManager):
     """
     Wrapper for the docker-py module.
@@ -121,12 +150,26 @@ class DockerManager(DockerBaseManager):
         self.alpine_image = config.get('alpine')
         self.proxy = proxy
 
-        # keep track of the running containers
+        # keep track of the running containers. Runs are added before their
+        # container is started, so that a docker event of a container that
+        # exits immediately can be matched to its run
         self.active_tasks: list[DockerTaskManager] = []
 
+        # ids of the active runs whose container is being started, and the
+        # events of those runs that reported the container to be finished
+        # before starting was completed
+        self._starting_runs: set[int] = set()
+        self._early_finished_runs: dict[int, FinishedRun] = {}
+        self._starting_lock = Lock()
+
         # keep track of the containers that have failed to start
         self.failed_tasks: list[DockerTaskManager] = []
 
+        # runs that have finished (or failed to start) and whose results can
+        # be retrieved by `get_result()`
+        self.finished_runs: queue.Queue[FinishedRun] = queue.Queue()
+        self._last_reconciled = time.monotonic()
+
         # before a task is executed it gets exposed to these policies
         self._policies = config.get("policies", {})
 
@@ -145,8 +188,13 @@ class DockerManager(DockerBaseManager):
         docker_registries = ctx.config.get("docker_registries", [])
         self.login_to_registries(docker_registries)
 
+        # csv and excel databases are converted to parquet, so that algorithms
+        # do not have to parse them every time
+        self.dataset_cache = self._create_dataset_cache(ctx)
+
         # set database uri and whether or not it is a file
         self._set_database(ctx.databases)
+        self.dataset_cache.start()
 
         # keep track of linked docker services
         self.linked_services: list[str] = []
@@ -158,6 +206,38 @@ class DockerManager(DockerBaseManager):
                 config['algorithm_device_requests']
             )
 
+        # watch the docker events for algorithm containers that finish
+        t = Thread(target=self.__container_event_worker, daemon=True)
+        t.start()
+
+    def __container_event_worker(self) -> None:
+        """
+        Listen to the docker event stream for algorithm containers of this
+        node that stop, and add their runs to the queue of finished runs.
+
+        Runs in a separate thread. If the connection to the docker daemon is
+        lost, the event stream is reopened.
+        """
+        filters = {
+            "type": "container",
+            "event": ["die", "stop"],
+            "label": [f"{APPNAME}-type=algorithm", f"node={self.node_name}"],
+        }
+        while True:
+            try:
+                for event in self.docker.events(decode=True, filters=filters):
+                    run_id = event.get('Actor', {}).get('Attributes', {})\
+                        .get('run_id')
+                    if run_id is None:
+                        continue
+                    self.finished_runs.put(FinishedRun(
+                        run_id=int(run_id),
+                        finished_at_ns=event.get('timeNano')
+                    ))
+            except Exception:
+                self.log.exception('Docker event stream had an exception')
+            time.sleep(SLEEP_BTWN_DOCKER_EVENT_RECONNECT)
+
     def _set_database(self, databases: dict | list) -> None:
         """
         Set database location and whether or not it is a file
@@ -191,6 +271,7 @@ class DockerManager(DockerBaseManager):
                 db_is_file = Path(uri).exists()
 
             if db_is_file:
+                self.dataset_cache.add(label, uri, db_config['type'])
                 # We'll copy the file to the folder `data` in our task_dir.
                 self.log.info(f'Copying {uri} to {self.__tasks_dir}')
                 shutil.copy(uri, self.__tasks_dir)
@@ -201,6 +282,38 @@ class DockerManager(DockerBaseManager):
                                      'env': db_config.get('env', {})}
         self.log.debug(f"Databases: {self.databases}")
 
+    def _create_dataset_cache(self, ctx: DockerNodeContext | NodeContext) \
+            -> DatasetCache:
+        """
+        Create the cache of databases converted to parquet.
+
+        If the node runs in docker, the cache is stored in a separate volume
+        that the node CLI creates. Outside docker, it is stored in the data
+        directory of the node.
+
+        Parameters
+        ----------
+        ctx: DockerNodeContext | NodeContext
+            Context object from which the settings are obtained
+
+        Returns
+        -------
+        DatasetCache
+            The dataset cache
+        """
+        config = ctx.config.get('dataset_cache') or {}
+        if running_in_docker():
+            if 'DATASET_CACHE_VOLUME_NAME' not in os.environ:
+                self.log.info("No volume for converted databases has been "
+                              "mounted, databases are not converted")
+                config = {**config, 'enabled': False}
+            return DatasetCache(
+                DATASET_CACHE_FOLDER, ctx.docker_dataset_cache_volume_name,
+                config
+            )
+        cache_dir = ctx.data_dir / 'dataset-cache'
+        return DatasetCache(cache_dir, str(cache_dir), config)
+
     def _set_algorithm_device_requests(self, device_requests_config: dict) \
             -> None:
         """
@@ -332,6 +445,25 @@ class DockerManager(DockerBaseManager):
         })
         return bool(running_containers)
 
+    def active_task_ids(self, started_only: bool = False) -> set[int]:
+        """
+        Get the ids of the tasks of which an algorithm container is running.
+
+        Parameters
+        ----------
+        started_only: bool
+            Whether to leave out the runs whose container is still being
+            started
+
+        Returns
+        -------
+        set[int]
+            Ids of the tasks
+        """
+        tasks = self._started_tasks() if started_only \
+            else list(self.active_tasks)
+        return {task.task_id for task in tasks}
+
     def cleanup_tasks(self) -> list[KilledRun]:
         """
         Stop all active tasks
@@ -342,10 +474,11 @@ class DockerManager(DockerBaseManager):
             List of information on tasks that have been killed
         """
         run_ids_killed = []
-        if self.active_tasks:
-            self.log.debug(f'Killing {len(self.active_tasks)} active task(s)')
-        while self.active_tasks:
-            task = self.active_tasks.pop()
+        tasks = self._started_tasks()
+        if tasks:
+            self.log.debug(f'Killing {len(tasks)} active task(s)')
+        for task in tasks:
+            self.active_tasks.remove(task)
             task.cleanup()
             run_ids_killed.append(KilledRun(
                 run_id=task.run_id,
@@ -429,40 +562,71 @@ class DockerManager(DockerBaseManager):
             isolated_network_mgr=self.isolated_network_mgr,
             databases=self.databases,
             docker_volume_name=self.data_volume_name,
+            dataset_cache=self.dataset_cache,
             alpine_image=self.alpine_image,
             proxy=self.proxy,
             device_requests=self.algorithm_device_requests
         )
 
+        # register the run before its container is started, so that it is
+        # known when the docker event of its container arrives
+        with self._starting_lock:
+            self._starting_runs.add(run_id)
+            self.active_tasks.append(task)
+
         # attempt to kick of the task. If it fails do to unknown reasons we try
         # again. If it fails permanently we add it to the failed tasks to be
         # handled by the speaking worker of the node
+        vpn_ports = None
         attempts = 1
-        while not (task.status == TaskStatus.ACTIVE) and attempts < 3:
-            try:
-                vpn_ports = task.run(
-                    docker_input=docker_input, tmp_vol_name=tmp_vol_name,
-                    token=token, algorithm_env=self.algorithm_env,
-                    databases_to_use=databases_to_use
-                )
-
-            except UnknownAlgorithmStartFail:
-                self.log.exception(f'Failed to start run {run_id} for an '
-                                   'unknown reason. Retrying...')
-                time.sleep(1)  # add some time before retrying the next attempt
+        try:
+            while not (task.status == TaskStatus.ACTIVE) and attempts < 3:
+                try:
+                    vpn_ports = task.run(
+                        docker_input=docker_input, tmp_vol_name=tmp_vol_name,
+                        token=token, algorithm_env=self.algorithm_env,
+                        databases_to_use=databases_to_use
+                    )
+
+                except UnknownAlgorithmStartFail:
+                    self.log.exception(f'Failed to start run {run_id} for an '
+                                       'unknown reason. Retrying...')
+                    # add some time before retrying the next attempt
+                    time.sleep(1)
+                    # an event received so far belongs to the container of
+                    # the failed attempt
+                    with self._starting_lock:
+                        self._early_finished_runs.pop(run_id, None)
+
+                except PermanentAlgorithmStartFail:
+                    break
 
-            except PermanentAlgorithmStartFail:
-                break
+                attempts += 1
+        except Exception:
+            with self._starting_lock:
+                self._starting_runs.discard(run_id)
+                self._early_finished_runs.pop(run_id, None)
+                self.active_tasks.remove(task)
+            raise
 
-            attempts += 1
+        with self._starting_lock:
+            self._starting_runs.discard(run_id)
+            early_finished_run = self._early_finished_runs.pop(run_id, None)
+            if has_task_failed(task.status):
+                self.active_tasks.remove(task)
+                self.failed_tasks.append(task)
 
-        # keep track of the active container
         if has_task_failed(task.status):
-            self.failed_tasks.append(task)
+            self.finished_runs.put(
+                FinishedRun(run_id=run_id, finished_at_ns=None)
+            )
             return task.status, None
-        else:
-            self.active_tasks.append(task)
-            return task.status, vpn_ports
+
+        if early_finished_run:
+            # the container exited before starting was completed, check it
+            # again now that it is known
+            self.finished_runs.put(early_finished_run)
+        return task.status, vpn_ports
 
     def get_result(self) -> Result:
         """
@@ -477,53 +641,63 @@ class DockerManager(DockerBaseManager):
         Result
             result of the docker image
         """
+        finished_task = None
+        while not finished_task:
+            # periodically check all active containers in case a docker event
+            # was missed
+            time_to_reconcile = \
+                self._last_reconciled + CONTAINER_RECONCILE_INTERVAL \
+                - time.monotonic()
+            if time_to_reconcile <= 0:
+                self._reconcile_active_tasks()
+                continue
+
+            # block until a run is reported finished by the docker event
+            # stream
+            try:
+                finished_run = self.finished_runs.get(
+                    timeout=time_to_reconcile
+                )
+            except queue.Empty:
+                continue
+
+            finished_task = self._get_finished_task(finished_run)
+
+        if finished_task in self.failed_tasks:
+            # the task failed to start
+            self.failed_tasks.remove(finished_task)
+            return Result(
+                run_id=finished_task.run_id,
+                task_id=finished_task.task_id,
+                logs='Container failed',
+                data=io.BytesIO(),
+                status=finished_task.status,
+                parent_id=finished_task.parent_id,
+                init_org_id=finished_task.init_org_id,
+            )
 
-        # get finished results and get the first one, if no result is available
-        # this is blocking
-        finished_tasks = []
-        while (not finished_tasks) and (not self.failed_tasks):
-            for task in self.active_tasks:
-
-                try:
-                    if task.is_finished():
-                        finished_tasks.append(task)
-                        self.active_tasks.remove(task)
-                        break
-                except AlgorithmContainerNotFound:
-                    self.log.exception(f'Failed to find container for '
-                                       f'result {task.result_id}')
-                    self.failed_tasks.append(task)
-                    self.active_tasks.remove(task)
-                    break
-
-            # sleep for a second before checking again
-            time.sleep(1)
-
-        if finished_tasks:
-            # at least one task is finished
-
-            finished_task = finished_tasks.pop()
+        self.active_tasks.remove(finished_task)
+        if finished_run.finished_at_ns:
+            latency = (time.time_ns() - finished_run.finished_at_ns) / 1e6
+            self.log.debug(f"Run id={finished_task.run_id} is finished, "
+                           f"handed off {latency:.1f} ms after container exit")
+        else:
             self.log.debug(f"Run id={finished_task.run_id} is finished")
 
-            # Check exit status and report
-            logs = finished_task.report_status()
+        # Check exit status and report
+        logs = finished_task.report_status()
 
-            # Cleanup containers
-            finished_task.cleanup()
+        # Cleanup containers
+        finished_task.cleanup()
 
-            # Retrieve results from file
-            results = finished_task.get_results()
+        # Open the results file, it is read when the results are sent
+        results = finished_task.get_results()
 
-            # remove the VPN ports of this run from the database
-            self.client.request(
-                'port', params={'run_id': finished_task.run_id},
-                method="DELETE"
-            )
-        else:
-            # at least one task failed to start
-            finished_task = self.failed_tasks.pop()
-            logs = 'Container failed'
-            results = b''
+        # remove the VPN ports of this run from the database
+        self.client.request(
+            'port', params={'run_id': finished_task.run_id},
+            method="DELETE"
+        )
 
         return Result(
             run_id=finished_task.run_id,
@@ -532,8 +706,92 @@ class DockerManager(DockerBaseManager):
             data=results,
             status=finished_task.status,
             parent_id=finished_task.parent_id,
+            init_org_id=finished_task.init_org_id,
         )
 
+    def _get_finished_task(
+        self, finished_run: FinishedRun
+    ) -> DockerTaskManager | None:
+        """
+        Get the task manager of a run that is reported to be finished.
+
+        Parameters
+        ----------
+        finished_run: FinishedRun
+            The run that is reported to be finished
+
+        Returns
+        -------
+        DockerTaskManager | None
+            Task manager of the run, or None if the run is not (or no longer)
+            tracked, is still being started or its container has not exited
+            yet
+        """
+        run_id = finished_run.run_id
+        with self._starting_lock:
+            if run_id in self._starting_runs:
+                # the report is checked again once the run has been started
+                self._early_finished_runs[run_id] = finished_run
+                return None
+
+        task = next(
+            (t for t in self.failed_tasks if t.run_id == run_id), None
+        )
+        if task:
+            return task
+
+        task = next(
+            (t for t in self.active_tasks if t.run_id == run_id), None
+        )
+        if not task:
+            # e.g. the run was killed, or both a 'stop' and 'die' event were
+            # received for the same container
+            return None
+
+        try:
+            if task.is_finished():
+                return task
+        except AlgorithmContainerNotFound:
+            self.log.exception(f'Failed to find container for run {run_id}')
+            self.active_tasks.remove(task)
+            self.failed_tasks.append(task)
+            return task
+        return None
+
+    def _reconcile_active_tasks(self) -> None:
+        """
+        Check the state of all active containers, and add the runs whose
+        container has exited to the queue of finished runs. This catches
+        containers of which the docker event was missed.
+        """
+        self._last_reconciled = time.monotonic()
+        for task in self._started_tasks():
+            try:
+                is_finished = task.is_finished()
+            except AlgorithmContainerNotFound:
+                is_finished = True
+            if is_finished:
+                self.log.debug(f"Run id={task.run_id} found finished while "
+                               "reconciling active containers")
+                self.finished_runs.put(
+                    FinishedRun(run_id=task.run_id, finished_at_ns=None)
+                )
+
+    def _started_tasks(self) -> list[DockerTaskManager]:
+        """
+        Get the active tasks of which the container has been started.
+
+        Returns
+        -------
+        list[DockerTaskManager]
+            Active tasks that are not being started
+        """
+        with self._starting_lock:
+            return [
+                task for task in self.active_tasks
+                if task.run_id not in self._starting_runs
+            ]
+
     def login_to_registries(self, registries: list = []) -> None:
         """
         Login to the docker registries
@@ -607,7 +865,7 @@ class DockerManager(DockerBaseManager):
                 continue  # this run is on another node
             # find the task
             task = next((
-                t for t in self.active_tasks
+                t for t in self._started_tasks()
                 if t.run_id == container_to_kill['run_id']
             ), None)
             if task:
@@ -693,8 +951,8 @@ class DockerManager(DockerBaseManager):
             self.log.error("Cannot determine columns for excel database "
                            " without a worksheet")
             return []
-        if type_ not in ('csv', 'sparql'):
+        if type_ not in ('csv', 'parquet', 'sparql'):
             self.log.error("Cannot determine columns for database of type %s."
-                           "Only csv and sparql are supported", type_)
+                           "Only csv, parquet and sparql are supported", type_)
             return []
         return get_column_names(db['uri'], type_)
@@ -0,0 +1,165 @@
+"""
+Pulling of algorithm images before they are needed.
+
+Before an algorithm run is started, the node checks whether a newer version
+of the image is available in the registry, and pulls it if so. The image
+prepuller does this in the background for the images that are likely to be
+used, so that runs usually find an up-to-date image that has been checked
+recently (see :class:`vantage6.common.docker.addons.ImageCheckCache`). These
+images are:
+
+* the images in the `allowed_algorithms` policy of the node that are exactly
+  one image name, i.e. expressions that are anchored at both ends such as
+  `^harbor2\\.vantage6\\.ai/demo/average$`
+* the images of the tasks that have recently been started on this node
+
+The prepuller is configured in the `image_pull` section of the node
+configuration:
+
+*prepull*
+    Whether the images are pulled in the background. Default true
+*prepull_interval*
+    Number of seconds between two rounds of pulling the images
+*recent_images*
+    Number of images of recent tasks that are kept up-to-date
+"""
+from __future__ import annotations
+
+import collections
+import logging
+import re
+import threading
+
+from docker.client import DockerClient
+
+from vantage6.common import logger_name
+from vantage6.common.docker.addons import pull_if_newer
+from vantage6.node.globals import (
+    DEFAULT_IMAGE_PREPULL_INTERVAL, DEFAULT_RECENT_IMAGES_TO_PREPULL
+)
+
+# regular expressions in `allowed_algorithms` that are anchored at both ends
+# and only consist of these characters are considered to be image names. An
+# expression without anchors is a pattern, as it also allows images that start
+# or end with other characters
+IMAGE_NAME_PATTERN = re.compile(r'\^((?:[\w\-/:@.]|\\\.)+)\$')
+
+
+class ImagePrepuller:
+    """
+    Keeps the images that are likely to be used up-to-date, in a background
+    thread.
+
+    Parameters
+    ----------
+    docker: DockerClient
+        Docker client
+    policies: dict | None
+        The `policies` section of the node configuration
+    config: dict | None
+        The `image_pull` section of the node configuration
+    """
+    log = logging.getLogger(logger_name(__name__))
+
+    def __init__(self, docker: DockerClient, policies: dict | None = None,
+                 config: dict | None = None) -> None:
+        config = config or {}
+        self.docker = docker
+        self.enabled = config.get('prepull', True)
+        self.interval = config.get(
+            'prepull_interval', DEFAULT_IMAGE_PREPULL_INTERVAL
+        )
+        self.allowed_images = allowed_image_names(
+            (policies or {}).get('allowed_algorithms')
+        )
+        self._recent: collections.OrderedDict[str, None] = \
+            collections.OrderedDict()
+        self._max_recent = config.get(
+            'recent_images', DEFAULT_RECENT_IMAGES_TO_PREPULL
+        )
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def note(self, image: str) -> None:
+        """
+        Register that a task with an image has been started, so that the
+        image is kept up-to-date.
+
+        Parameters
+        ----------
+        image: str
+            Image name
+        """
+        if self._max_recent <= 0:
+            return
+        with self._lock:
+            self._recent[image] = None
+            self._recent.move_to_end(image)
+            while len(self._recent) > self._max_recent:
+                self._recent.popitem(last=False)
+
+    def images(self) -> list[str]:
+        """
+        Get the images that are kept up-to-date.
+
+        Returns
+        -------
+        list[str]
+            The image names of the `allowed_algorithms` policy, followed by
+            the images of recent tasks, without duplicates
+        """
+        with self._lock:
+            recent = list(reversed(self._recent))
+        return list(dict.fromkeys(self.allowed_images + recent))
+
+    def start(self) -> None:
+        """ Start pulling the images in a background thread. """
+        if not self.enabled:
+            self.log.debug("Pulling images in the background is disabled")
+            return
+        t = threading.Thread(target=self.__worker, daemon=True)
+        t.start()
+
+    def stop(self) -> None:
+        """ Stop pulling the images, after the current image. """
+        self._stop.set()
+
+    def __worker(self) -> None:
+        """ Pull the images periodically, until stopped. """
+        while not self._stop.is_set():
+            for image in self.images():
+                if self._stop.is_set():
+                    return
+                try:
+                    pull_if_newer(self.docker, image, self.log)
+                except Exception as e:
+                    self.log.debug(f"Could not pull image {image}: {e}")
+            self._stop.wait(self.interval)
+
+
+def allowed_image_names(allowed_algorithms: list[str] | str | None) -> \
+        list[str]:
+    """
+    Get the image names from the `allowed_algorithms` policy.
+
+    Parameters
+    ----------
+    allowed_algorithms: list[str] | str | None
+        Regular expressions of the allowed images
+
+    Returns
+    -------
+    list[str]
+        The image names of the expressions that match exactly one image name,
+        without anchors and escapes
+    """
+    if not allowed_algorithms:
+        return []
+    if isinstance(allowed_algorithms, str):
+        allowed_algorithms = [allowed_algorithms]
+    names = []
+    for expr in allowed_algorithms:
+        match = IMAGE_NAME_PATTERN.fullmatch(expr)
+        if match:
+            names.append(match.group(1).replace('\\.', '.'))
+    return names
@@ -6,6 +6,7 @@ import docker.errors
 import json
 
 from pathlib import Path
+from typing import BinaryIO
 
 from vantage6.common.globals import APPNAME
 from vantage6.common.docker.addons import (
@@ -15,7 +16,8 @@ from vantage6.common.docker.addons import (
 from vantage6.common.docker.network_manager import NetworkManager
 from vantage6.common.task_status import TaskStatus
 from vantage6.node.util import get_parent_id
-from vantage6.node.globals import ALPINE_IMAGE
+from vantage6.node.globals import ALPINE_IMAGE, DATASET_CACHE_FOLDER
+from vantage6.node.dataset_cache import DatasetCache
 from vantage6.node.docker.vpn_manager import VPNManager
 from vantage6.node.docker.squid import Squid
 from vantage6.node.docker.docker_base import DockerBaseManager
@@ -41,7 +43,8 @@ class DockerTaskManager(DockerBaseManager):
                  isolated_network_mgr: NetworkManager,
                  databases: dict, docker_volume_name: str,
                  alpine_image: str | None = None, proxy: Squid | None = None,
-                 device_requests: list | None = None):
+                 device_requests: list | None = None,
+                 dataset_cache: DatasetCache | None = None):
         """
         Initialization creates DockerTaskManager instance
 
@@ -70,6 +73,9 @@ class DockerTaskManager(DockerBaseManager):
         device_requests: list | None
             List of DeviceRequest objects to be passed to the algorithm
             container
+        dataset_cache: DatasetCache | None
+            Cache of databases converted to parquet, which is mounted
+            read-only in the algorithm container
         """
         self.task_id = task_info['id']
         self.log = logging.getLogger(f"task ({self.task_id})")
@@ -80,9 +86,13 @@ class DockerTaskManager(DockerBaseManager):
         self.run_id = run_id
         self.task_id = task_info['id']
         self.parent_id = get_parent_id(task_info)
+        # the initiating organization is needed to encrypt the results for.
+        # Keep it here so it does not have to be retrieved again later.
+        self.init_org_id = task_info['init_org']['id']
         self.__tasks_dir = tasks_dir
         self.databases = databases
         self.data_volume_name = docker_volume_name
+        self.dataset_cache = dataset_cache
         self.node_name = node_name
         self.alpine_image = ALPINE_IMAGE if alpine_image is None \
             else alpine_image
@@ -156,18 +166,20 @@ class DockerTaskManager(DockerBaseManager):
             self.status = TaskStatus.COMPLETED
         return logs
 
-    def get_results(self) -> bytes:
+    def get_results(self) -> BinaryIO:
         """
-        Read results output file of the algorithm container
+        Open the results output file of the algorithm container
+
+        The file is not read here: results can be large, so they are read in
+        chunks when they are encrypted and sent to the server.
 
         Returns
         -------
-        bytes:
-            Results of the algorithm container
+        BinaryIO:
+            Results file of the algorithm container, opened for reading. The
+            caller should close it.
         """
-        with open(self.output_file, "rb") as fp:
-            results = fp.read()
-        return results
+        return open(self.output_file, "rb")
 
     def pull(self):
         """ Pull the latest docker image. """
@@ -409,6 +421,10 @@ class DockerTaskManager(DockerBaseManager):
         else:
             volumes[self.__tasks_dir] = \
                 {"bind": self.data_folder, "mode": "rw"}
+
+        if self.dataset_cache and self.dataset_cache.enabled:
+            volumes[self.dataset_cache.mount_source] = \
+                {"bind": DATASET_CACHE_FOLDER, "mode": "ro"}
         return volumes
 
     def _setup_environment_vars(self, algorithm_env: dict,
@@ -488,13 +504,14 @@ class DockerTaskManager(DockerBaseManager):
                                  "result in an algorithm crash.")
                 self.log.debug(f"User specified database: {database}")
             # define env vars for the preprocessing and extra parameters such
-            # as query and sheet_name
+            # as query, sheet_name and the columns and filters to load
             extra_params = json.loads(database.get("parameters")) \
                 if database.get("parameters") else {}
-            for optional_key in ['query', 'sheet_name', 'preprocessing']:
+            for optional_key in ['query', 'sheet_name', 'preprocessing',
+                                 'columns', 'filters']:
                 if optional_key in extra_params:
                     env_var_value = extra_params[optional_key] \
-                        if optional_key != 'preprocessing' \
+                        if optional_key in ('query', 'sheet_name') \
                         else json.dumps(extra_params[optional_key])
                     environment_variables[f"{database['label'].upper()}_"
                                           f"{optional_key.upper()}"] = \
@@ -518,6 +535,13 @@ class DockerTaskManager(DockerBaseManager):
             type_var_name = f'{label.upper()}_DATABASE_TYPE'
             environment_variables[type_var_name] = db['type']
 
+            # the database converted to parquet, if it is up-to-date
+            cached_file = self.dataset_cache.filename(label) \
+                if self.dataset_cache else None
+            if cached_file:
+                environment_variables[f'{label.upper()}_DATABASE_CACHE_URI'] \
+                    = f"{DATASET_CACHE_FOLDER}/{cached_file}"
+
             # Add optional database parameter settings, these can be used by
             # the algorithm (wrapper). Note that all env keys are prefixed
             # with DB_PARAM_ to avoid collisions with other environment
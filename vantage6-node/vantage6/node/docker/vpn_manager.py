@@ -3,6 +3,7 @@ import logging
 import json
 import time
 import ipaddress
+import threading
 
 from json.decoder import JSONDecodeError
 from docker.models.containers import Container
@@ -74,6 +75,9 @@ class VPNManager(DockerBaseManager):
         self.log.debug(f'  Config: {self.network_config_image}')
 
         self.has_vpn = False
+        # algorithms may be started in parallel, this makes sure that they
+        # are not assigned the same port on the VPN client
+        self._port_lock = threading.Lock()
 
     def _update_images(self) -> None:
         """ Pulls the latest version of the VPN images """
@@ -352,52 +356,54 @@ class VPNManager(DockerBaseManager):
         self.log.debug("Finding exposed ports of algorithm container")
         ports = self._find_exposed_ports(algo_image_name)
 
-        # Find ports on VPN container that are already occupied
-        cmd = (
-            'sh -c '
-            '"iptables -t nat -L PREROUTING -n | '
-            'awk \'{print $7}\' | cut -c 5-"'
-        )
-        occupied_ports = self.vpn_client_container.exec_run(cmd=cmd)
-
-        occupied_ports = occupied_ports.output.decode('utf-8')
-        occupied_ports = occupied_ports.split('\n')
-        occupied_ports = \
-            [int(port) for port in occupied_ports if port != '']
-        self.log.debug(f"Occupied ports: {occupied_ports}")
-
-        # take first available port
-        vpn_client_port_options = set(FREE_PORT_RANGE) - set(occupied_ports)
-        for port in ports:
-            port_ = vpn_client_port_options.pop()
-            self.log.debug(f"Assigning port {port_} to algorithm port")
-            port['port'] = port_
-
-        vpn_ip = self.get_vpn_ip()
-        self.log.debug(f"VPN IP: {vpn_ip}")
-
-        # Set up forwarding VPN traffic to algorithm container
-        command = 'sh -c "'
-        for port in ports:
-            # Rule for directing external vpn traffic to algorithms
-            command += (
-                'iptables -t nat -A PREROUTING -i tun0 -p tcp '
-                f'--dport {port["port"]} -j DNAT '
-                f'--to {algo_ip}:{port["algo_port"]};'
+        with self._port_lock:
+            # Find ports on VPN container that are already occupied
+            cmd = (
+                'sh -c '
+                '"iptables -t nat -L PREROUTING -n | '
+                'awk \'{print $7}\' | cut -c 5-"'
             )
+            occupied_ports = self.vpn_client_container.exec_run(cmd=cmd)
+
+            occupied_ports = occupied_ports.output.decode('utf-8')
+            occupied_ports = occupied_ports.split('\n')
+            occupied_ports = \
+                [int(port) for port in occupied_ports if port != '']
+            self.log.debug(f"Occupied ports: {occupied_ports}")
+
+            # take first available port
+            vpn_client_port_options = \
+                set(FREE_PORT_RANGE) - set(occupied_ports)
+            for port in ports:
+                port_ = vpn_client_port_options.pop()
+                self.log.debug(f"Assigning port {port_} to algorithm port")
+                port['port'] = port_
+
+            vpn_ip = self.get_vpn_ip()
+            self.log.debug(f"VPN IP: {vpn_ip}")
+
+            # Set up forwarding VPN traffic to algorithm container
+            command = 'sh -c "'
+            for port in ports:
+                # Rule for directing external vpn traffic to algorithms
+                command += (
+                    'iptables -t nat -A PREROUTING -i tun0 -p tcp '
+                    f'--dport {port["port"]} -j DNAT '
+                    f'--to {algo_ip}:{port["algo_port"]};'
+                )
 
-            # Rule for directing internal vpn traffic to algorithms
-            command += (
-                f'iptables -t nat -A PREROUTING -d {vpn_ip}/32 -p tcp '
-                f'--dport {port["port"]} -j DNAT '
-                f'--to {algo_ip}:{port["algo_port"]};'
-            )
+                # Rule for directing internal vpn traffic to algorithms
+                command += (
+                    f'iptables -t nat -A PREROUTING -d {vpn_ip}/32 -p tcp '
+                    f'--dport {port["port"]} -j DNAT '
+                    f'--to {algo_ip}:{port["algo_port"]};'
+                )
 
-            # remove the algorithm ports from the dictionaries as these are no
-            # longer necessary
-            del port['algo_port']
-        command += '"'
-        self.vpn_client_container.exec_run(command)
+                # remove the algorithm ports from the dictionaries as these
+                # are no longer necessary
+                del port['algo_port']
+            command += '"'
+            self.vpn_client_container.exec_run(command)
 
         return ports
 
@@ -26,6 +26,26 @@ TIME_LIMIT_RETRY_CONNECT_NODE = 60 * 60 * 24 * 7  # i.e. 1 week
 # constant for waiting for the initial websocket connection
 TIME_LIMIT_INITIAL_CONNECTION_WEBSOCKET = 60
 
+# algorithm containers that finish are picked up from the docker event stream.
+# In case an event is missed, all active containers are checked periodically.
+CONTAINER_RECONCILE_INTERVAL = 30  # seconds
+SLEEP_BTWN_DOCKER_EVENT_RECONNECT = 5  # seconds
+
+# default number of results that are encrypted and uploaded in parallel
+DEFAULT_MAX_PARALLEL_RESULT_UPLOADS = 4
+
+# default number of runs that are started in parallel
+DEFAULT_MAX_PARALLEL_TASK_STARTS = 4
+
+# images that are likely to be used are pulled in the background every 10
+# minutes. These include the images of the 10 most recently started tasks.
+DEFAULT_IMAGE_PREPULL_INTERVAL = 600  # seconds
+DEFAULT_RECENT_IMAGES_TO_PREPULL = 10
+
+# directory in which databases converted to parquet are mounted in algorithm
+# containers, and in the node container if the node runs in docker
+DATASET_CACHE_FOLDER = '/mnt/dataset-cache'
+
 #
 #    VPN CONFIGURATION RELATED CONSTANTS
 #
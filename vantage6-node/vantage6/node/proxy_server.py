@@ -8,14 +8,21 @@ to access other places in the network.
 """
 import requests
 import logging
+import json as json_lib
 
 from http import HTTPStatus
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Iterator
 from requests import Response
 
 from flask import Flask, request, jsonify
 
-from vantage6.common import bytes_to_base64s, base64s_to_bytes, logger_name
+from vantage6.common import base64s_to_bytes, logger_name
 from vantage6.common.client.node_client import NodeClient
+from vantage6.common.encryption import (
+    STREAM_CHUNK_SIZE, Base64Writer, iter_chunks
+)
+from vantage6.common.globals import RESULT_SPOOL_MAX_SIZE
 
 # Initialize FLASK
 app = Flask(__name__)
@@ -56,7 +63,7 @@ def get_method(method: str) -> callable:
     return loopup.get(method_name, requests.get)
 
 
-def make_proxied_request(endpoint: str) -> Response:
+def make_proxied_request(endpoint: str, stream: bool = False) -> Response:
     """
     Helper to create proxies requests to the central server.
 
@@ -64,6 +71,8 @@ def make_proxied_request(endpoint: str) -> Response:
     ----------
     endpoint: str
         endpoint to be reached at the vantage6 server
+    stream: bool, optional
+        Whether to read the body of the response only when it is accessed
 
     Returns
     -------
@@ -75,11 +84,13 @@ def make_proxied_request(endpoint: str) -> Response:
         else None
 
     json = request.get_json() if request.is_json else None
-    return make_request(request.method, endpoint, json, request.args, headers)
+    return make_request(request.method, endpoint, json, request.args, headers,
+                        stream=stream)
 
 
 def make_request(method: str, endpoint: str, json: dict = None,
-                 params: dict = None, headers: dict = None) -> Response:
+                 params: dict = None, headers: dict = None,
+                 stream: bool = False) -> Response:
     """
     Make request to the central server
 
@@ -95,6 +106,8 @@ def make_request(method: str, endpoint: str, json: dict = None,
         HTTP parameters
     headers: dict, optional
         HTTP headers
+    stream: bool, optional
+        Whether to read the body of the response only when it is accessed
 
     Returns
     -------
@@ -112,7 +125,8 @@ def make_request(method: str, endpoint: str, json: dict = None,
         try:
             response: Response = method(url, json=json,
                                         params=params,
-                                        headers=headers)
+                                        headers=headers,
+                                        stream=stream)
             # verify that the server gave us a valid response, else we
             # would want to try again
             if response.status_code > 210:
@@ -136,35 +150,68 @@ def make_request(method: str, endpoint: str, json: dict = None,
     raise Exception("Proxy request failed")
 
 
-def decrypt_result(run: dict) -> dict:
+def download_decrypted_result(id_: int, headers: dict | None,
+                              out_stream: BinaryIO) -> Response:
     """
-    Decrypt the `result` from a run dictonary
+    Download the result of a run from the vantage6 server in binary format,
+    and write it decrypted to a file-like object. The result is downloaded
+    and decrypted in chunks.
 
     Parameters
     ----------
-    run: dict
-        Run dict
+    id_: int
+        Id of the run of which the result should be obtained
+    headers: dict | None
+        HTTP headers, including the authorization of the algorithm
+    out_stream: BinaryIO
+        File-like object to write the decrypted result to. Nothing is written
+        if the server returns an error.
 
     Returns
     -------
-    dict
-        Run dict with the `result` decrypted
+    requests.Response
+        Response of the vantage6 server. Its content is only available if
+        it is an error.
     """
     client: NodeClient = app.config.get('SERVER_IO')
+    with requests.get(f"{server_url}/run/{id_}/result", headers=headers,
+                      stream=True) as response:
+        if response.status_code > 210:
+            # read the error message before the connection is released
+            response.content
+            return response
+        response.raw.decode_content = True
+        client.cryptor.decrypt_stream(response.raw, out_stream, binary=True)
+    return response
+
+
+def stream_run_json(run: dict) -> Iterator[bytes]:
+    """
+    Serialize a run dictionary to JSON in chunks. A result that is an opened
+    file with the base64 encoded result is read from that file and closed.
 
-    # if the result is a None, there is no need to decrypt that..
-    try:
-        if run['result']:
-            run["result"] = bytes_to_base64s(
-                client.cryptor.decrypt_str_to_bytes(
-                    run["result"]
-                )
-            )
-    except Exception:
-        log.exception("Unable to decrypt and/or decode results, sending them "
-                      "to the algorithm...")
+    Parameters
+    ----------
+    run: dict
+        Run dict
+
+    Returns
+    -------
+    Iterator[bytes]
+        Chunks of the JSON serialized run
+    """
+    result = run.pop("result", None)
+    if not hasattr(result, "read"):
+        yield json_lib.dumps({**run, "result": result}).encode()
+        return
 
-    return run
+    # the result is base64 encoded, so it can be put in a JSON string as-is
+    fields = json_lib.dumps(run)[1:-1]
+    yield f'{{{fields}{", " if fields else ""}"result": "'.encode()
+    with result:
+        result.seek(0)
+        yield from iter_chunks(result)
+    yield b'"}'
 
 
 def get_response_json_and_handle_exceptions(
@@ -222,50 +269,36 @@ def proxy_task():
 
     log.debug(f"{len(organizations)} organizations")
 
-    # For every organization we need to encrypt the input field. This is done
-    # in parallel as the client (algorithm) is waiting for a timely response.
-    # For every organizationn the public key is retrieved an the input is
-    # encrypted specifically for them.
-    def encrypt_input(organization: dict) -> dict:
-        """
-        Encrypt the input for a specific organization by using its private key.
-        This method is run as background
-
-        Parameters
-        ----------
-        organization : dict
-            Input as specified by the client (algorithm in this case)
-
-        Returns
-        -------
-        dict
-            Modified organization dictionary in which the `input` key is
-            contains encrypted input
-        """
-        input_ = organization.get("input", {})
-        organization_id = organization.get("id")
-
-        # retrieve public key of the organization
-        log.debug(f"Retrieving public key of org: {organization_id}")
-        response = make_request('get', f'organization/{organization_id}',
-                                headers=headers)
-        public_key = response.json().get("public_key")
-
-        # Encrypt the input field
-        client: NodeClient = app.config.get("SERVER_IO")
-        organization["input"] = client.cryptor.encrypt_bytes_to_str(
-            base64s_to_bytes(input_),
-            public_key
-        )
-
-        log.debug("Input succesfully encrypted for organization "
-                  f"{organization_id}!")
-        return organization
-
+    # For every organization we need to encrypt the input field. The public
+    # keys of the organizations are retrieved in batch (and cached by the node
+    # client). Usually all organizations receive the same input: then it is
+    # encrypted only once and the server combines it with the key of each
+    # organization. Otherwise, the input is encrypted for each organization in
+    # parallel, as the client (algorithm) is waiting for a timely response.
     if client.is_encrypted_collaboration():
 
         log.debug("Applying end-to-end encryption")
-        data["organizations"] = [encrypt_input(o) for o in organizations]
+        inputs = [org.get("input", {}) for org in organizations]
+        if all(input_ == inputs[0] for input_ in inputs):
+            data["shared_input"], encrypted_inputs = client.encrypt_envelope(
+                base64s_to_bytes(inputs[0]),
+                [org.get("id") for org in organizations],
+                collaboration_id=client.collaboration_id
+            )
+        else:
+            encrypted_inputs = client.encrypt_per_organization(
+                [
+                    (org.get("id"), base64s_to_bytes(input_))
+                    for org, input_ in zip(organizations, inputs)
+                ],
+                collaboration_id=client.collaboration_id
+            )
+        for organization, encrypted_input in zip(organizations,
+                                                 encrypted_inputs):
+            organization["input"] = encrypted_input
+        log.debug(f"Input succesfully encrypted for {len(organizations)} "
+                  "organizations!")
+        data["organizations"] = organizations
 
     # Attempt to send the task to the central server
     try:
@@ -278,20 +311,22 @@ def proxy_task():
     return response.json(), HTTPStatus.OK
 
 
-@app.route('/result?task_id=<int:id_>', methods=["GET"])
-def proxy_result(id_: int) -> Response:
+@app.route('/result', methods=["GET"])
+def proxy_result() -> Response:
     """
-    Obtain and decrypt all results to belong to a certain task
+    Obtain and decrypt the results of algorithm runs, e.g. of the runs of
+    the task in the `task_id` parameter.
 
-    Parameters
-    ----------
-    id : int
-        Task id from which the results need to be obtained
+    The runs are obtained from the vantage6 server without their results.
+    The result of each run is then downloaded in binary format and decrypted
+    in chunks to a temporary file, from which it is streamed to the
+    algorithm. Therefore, neither the response of the server nor the
+    results are held in memory as a whole.
 
     Returns
     -------
     requests.Response
-        Reponse from the vantage6 server
+        Page of decrypted results, or error message
     """
     # We need the server io for the decryption of the results
     client = app.config.get("SERVER_IO")
@@ -299,30 +334,70 @@ def proxy_result(id_: int) -> Response:
         return jsonify({'msg': 'Proxy server not initialized properly'}),\
             HTTPStatus.INTERNAL_SERVER_ERROR
 
-    # Forward the request
+    present = 'Authorization' in request.headers
+    headers = {'Authorization': request.headers['Authorization']} if present \
+        else None
+
+    # the inputs are not needed, so ask for links instead of large inputs
+    params = {**request.args.to_dict(), 'link_payloads': 'true'}
     try:
-        response: Response = make_proxied_request(f"result?task_id={id_}")
+        response: Response = make_request('get', 'run', params=params,
+                                          headers=headers)
     except Exception:
-        log.exception(f'Error on "result?task_id={id_}"')
+        log.exception('Error on "result"')
+        return {'msg': 'Request failed, see node logs'},\
+            HTTPStatus.INTERNAL_SERVER_ERROR
+    page = get_response_json_and_handle_exceptions(response)
+    if not isinstance(page, dict) or 'data' not in page:
         return {'msg': 'Request failed, see node logs'},\
             HTTPStatus.INTERNAL_SERVER_ERROR
 
-    # Attempt to decrypt the results. The enpoint should have returned
-    # a list of results
-    unencrypted = []
-    runs = get_response_json_and_handle_exceptions(response)
-    for run in runs:
-        run = decrypt_result(run)
-        unencrypted.append(run)
+    results = []
+    try:
+        for run in page['data']:
+            decrypted = SpooledTemporaryFile(max_size=RESULT_SPOOL_MAX_SIZE)
+            results.append({
+                'id': run['id'], 'task': run.get('task'), 'result': decrypted
+            })
+            encoder = Base64Writer(decrypted)
+            response = download_decrypted_result(run['id'], headers, encoder)
+            if response.status_code == HTTPStatus.NOT_FOUND:
+                # the run has no result (yet)
+                decrypted.close()
+                results[-1]['result'] = None
+            elif response.status_code > 210:
+                raise Exception(f"Status code {response.status_code}")
+            else:
+                encoder.flush()
+    except Exception:
+        for result in results:
+            if result['result'] is not None:
+                result['result'].close()
+        log.exception('Error on "result"')
+        return {'msg': 'Request failed, see node logs'},\
+            HTTPStatus.INTERNAL_SERVER_ERROR
 
-    return jsonify(unencrypted), HTTPStatus.OK
+    def generate() -> Iterator[bytes]:
+        yield b'{"data": ['
+        for i, result in enumerate(results):
+            if i:
+                yield b', '
+            yield from stream_run_json(result)
+        yield f'], "links": {json_lib.dumps(page.get("links"))}}}'.encode()
 
+    return app.response_class(
+        generate(), status=HTTPStatus.OK, mimetype='application/json')
 
-@app.route('/run/<int:id>', methods=["GET"])
+
+@app.route('/run/<int:id_>', methods=["GET"])
 def proxy_runs(id_: int) -> Response:
     """
-    Obtain and decrypt the algorithm run from the vantage6 server to be used by
-    an algorithm container.
+    Obtain the algorithm run from the vantage6 server to be used by an
+    algorithm container.
+
+    The run does not contain its result, which is obtained and decrypted by
+    :func:`proxy_run_result`. The response of the server is streamed to the
+    algorithm as it is received.
 
     Parameters
     ----------
@@ -334,25 +409,70 @@ def proxy_runs(id_: int) -> Response:
     requests.Response
         Response of the vantage6 server
     """
-    # We need the server io for the decryption of the results
+    try:
+        response: Response = make_proxied_request(f"run/{id_}", stream=True)
+    except Exception:
+        log.exception('Error on /run/<int:id>')
+        return {'msg': 'Request failed, see node logs...'},\
+            HTTPStatus.INTERNAL_SERVER_ERROR
+
+    def generate() -> Iterator[bytes]:
+        with response:
+            yield from response.iter_content(STREAM_CHUNK_SIZE)
+
+    return app.response_class(
+        generate(), status=response.status_code,
+        content_type=response.headers.get('Content-Type'))
+
+
+@app.route('/run/<int:id_>/result', methods=["GET"])
+def proxy_run_result(id_: int) -> Response:
+    """
+    Obtain the result of an algorithm run from the vantage6 server in binary
+    format, and decrypt it for the algorithm container.
+
+    The result is downloaded and decrypted in chunks, and sent to the
+    algorithm as `application/octet-stream`.
+
+    Parameters
+    ----------
+    id_ : int
+        Id of the run of which the result should be obtained
+
+    Returns
+    -------
+    requests.Response
+        Decrypted result, or error message
+    """
     client: NodeClient = app.config.get("SERVER_IO")
     if not client:
         return {'msg': 'Proxy server not initialized properly'},\
             HTTPStatus.INTERNAL_SERVER_ERROR
 
-    # Make the proxied request
+    present = 'Authorization' in request.headers
+    headers = {'Authorization': request.headers['Authorization']} if present \
+        else None
+
+    decrypted = SpooledTemporaryFile(max_size=RESULT_SPOOL_MAX_SIZE)
     try:
-        response: Response = make_proxied_request(f"run/{id_}")
+        response = download_decrypted_result(id_, headers, decrypted)
     except Exception:
-        log.exception('Error on /run/<int:id>')
+        decrypted.close()
+        log.exception(f'Error on /run/{id_}/result')
         return {'msg': 'Request failed, see node logs...'},\
             HTTPStatus.INTERNAL_SERVER_ERROR
-
-    # Try to decrypt the results
-    run = get_response_json_and_handle_exceptions(response)
-    run = decrypt_result(run)
-
-    return run, HTTPStatus.OK
+    if response.status_code > 210:
+        decrypted.close()
+        return response.content, response.status_code, \
+            {'Content-Type': response.headers.get('Content-Type')}
+
+    def generate() -> Iterator[bytes]:
+        with decrypted:
+            decrypted.seek(0)
+            yield from iter_chunks(decrypted)
+
+    return app.response_class(
+        generate(), status=HTTPStatus.OK, mimetype='application/octet-stream')
 
 
 @app.route('/<path:central_server_path>', methods=["GET", "POST", "PATCH",
@@ -101,6 +101,20 @@ class NodeTaskNamespace(ClientNamespace):
         # else: no need to do anything when a task has started/finished/... on
         # another node
 
+    def on_organization_updated(self, data: dict):
+        """
+        Actions to be taken when an organization in the collaboration has been
+        updated. Its public key may have changed, so the cached public key is
+        dropped.
+
+        Parameters
+        ----------
+        data: dict
+            Dictionary with the `id` of the organization that was updated
+        """
+        self.log.debug(f"Organization {data.get('id')} was updated")
+        self.node_worker_ref.client.public_keys.invalidate(data.get('id'))
+
     def on_expired_token(self):
         """
         Action to be taken when node is notified by server that its token
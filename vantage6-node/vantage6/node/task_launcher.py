@@ -0,0 +1,251 @@
+"""
+Starting of algorithm runs in parallel.
+
+Starting a run takes several requests to the server and to the docker daemon:
+a container token is requested, a volume is created, the image is pulled and
+the VPN is configured. When an algorithm creates many subtasks at once, the
+node would otherwise start them strictly one after another. The task launcher
+starts them in a pool of threads instead.
+
+The launcher admits a run only when the node has the capacity to run it,
+which is configured in the `task_launcher` section of the node configuration:
+
+*max_parallel_starts*
+    Maximum number of runs that are being started at the same time
+*max_running_algorithms*
+    Maximum number of algorithm containers that run at the same time
+*max_cpu_load*
+    Maximum load average (over the last minute) per CPU core
+*min_available_memory_mb*
+    Minimum memory that must be available
+
+To prevent that an algorithm waits forever for its subtasks, runs of subtasks
+of algorithms that run on this node are always admitted. Also, a run is always
+admitted if no algorithm is running or being started at all, as waiting
+would not free any resources.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from vantage6.common import logger_name
+from vantage6.node.docker.docker_manager import DockerManager
+from vantage6.node.globals import DEFAULT_MAX_PARALLEL_TASK_STARTS
+from vantage6.node.util import get_parent_id
+
+
+class TaskLauncher:
+    """
+    Starts algorithm runs in a pool of threads, as long as the node has the
+    capacity to run them. A run is never started twice at the same time.
+
+    Parameters
+    ----------
+    start: Callable[[dict], None]
+        Function that starts a run, given the run including its task
+    docker: DockerManager
+        Docker manager that keeps track of the running algorithms
+    config: dict | None
+        The `task_launcher` section of the node configuration
+    """
+    log = logging.getLogger(logger_name(__name__))
+
+    def __init__(self, start: Callable[[dict], None], docker: DockerManager,
+                 config: dict | None = None) -> None:
+        config = config or {}
+        self.start = start
+        self.docker = docker
+        self.max_parallel_starts = config.get(
+            'max_parallel_starts', DEFAULT_MAX_PARALLEL_TASK_STARTS
+        )
+        self.max_running_algorithms = config.get('max_running_algorithms')
+        self.max_cpu_load = config.get('max_cpu_load')
+        self.min_available_memory_mb = config.get('min_available_memory_mb')
+
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_parallel_starts,
+            thread_name_prefix='task-start'
+        )
+        # runs that wait to be admitted, by run id, in order of arrival
+        self._pending: dict[int, dict] = {}
+        # ids of the runs that are being started
+        self._starting: set[int] = set()
+        # ids of the pending runs for which it is logged that they wait
+        self._reported: set[int] = set()
+        self._lock = threading.Lock()
+
+    def is_launching(self, run_id: int) -> bool:
+        """
+        Check whether a run waits to be started or is being started.
+
+        Parameters
+        ----------
+        run_id: int
+            Id of the run
+
+        Returns
+        -------
+        bool
+            True if the run waits to be started or is being started
+        """
+        with self._lock:
+            return run_id in self._pending or run_id in self._starting
+
+    def add(self, task_incl_run: dict) -> bool:
+        """
+        Add a run to the runs that wait to be started. They are started by
+        :meth:`dispatch`.
+
+        Parameters
+        ----------
+        task_incl_run: dict
+            The run including its task
+
+        Returns
+        -------
+        bool
+            False if the run already waits to be started, is being started
+            or runs, True otherwise
+        """
+        run_id = task_incl_run['id']
+        # the run may have been queued again between its start and this
+        # check, e.g. when the node reconnected to the server
+        if self.docker.is_running(run_id):
+            self.log.info(f"Run {run_id} is already running")
+            return False
+        with self._lock:
+            if run_id in self._pending or run_id in self._starting:
+                self.log.info(f"Run {run_id} is already being started")
+                return False
+            self._pending[run_id] = task_incl_run
+        return True
+
+    def dispatch(self) -> None:
+        """
+        Start the waiting runs that are admitted, in order of arrival, as
+        long as fewer than `max_parallel_starts` runs are being started.
+
+        Runs that are not admitted keep waiting, but do not hold up the runs
+        behind them. These may, for instance, be subtasks that a running
+        algorithm waits for.
+        """
+        with self._lock:
+            pending = list(self._pending.values())
+        for task_incl_run in pending:
+            run_id = task_incl_run['id']
+            with self._lock:
+                if len(self._starting) >= self.max_parallel_starts:
+                    return
+            if not self.is_admitted(task_incl_run):
+                if run_id not in self._reported:
+                    self.log.info(f"Waiting for capacity to start run "
+                                  f"{run_id}")
+                    self._reported.add(run_id)
+                continue
+            with self._lock:
+                del self._pending[run_id]
+                self._reported.discard(run_id)
+                self._starting.add(run_id)
+            self._pool.submit(self._start, task_incl_run)
+
+    def is_admitted(self, task_incl_run: dict) -> bool:
+        """
+        Check whether the node has the capacity to run an algorithm.
+
+        Parameters
+        ----------
+        task_incl_run: dict
+            The run including its task
+
+        Returns
+        -------
+        bool
+            True if the run may be started
+        """
+        with self._lock:
+            starting = len(self._starting)
+        running_task_ids = self.docker.active_task_ids()
+        if not running_task_ids and not starting:
+            return True
+        if get_parent_id(task_incl_run['task']) in running_task_ids:
+            return True
+
+        # runs are registered at the docker manager before their container
+        # is started, so leave those out to count them only once
+        if self.max_running_algorithms and \
+                len(self.docker.active_task_ids(started_only=True)) + \
+                starting >= self.max_running_algorithms:
+            return False
+        if self.max_cpu_load and cpu_load() > self.max_cpu_load:
+            return False
+        if self.min_available_memory_mb:
+            available = available_memory_mb()
+            if available is not None and \
+                    available < self.min_available_memory_mb:
+                return False
+        return True
+
+    def shutdown(self) -> None:
+        """
+        Forget the runs that wait to be started, and wait for the runs that
+        are being started.
+        """
+        with self._lock:
+            self._pending.clear()
+        self._pool.shutdown(wait=True)
+
+    def _start(self, task_incl_run: dict) -> None:
+        """
+        Start a run in a thread of the pool.
+
+        Parameters
+        ----------
+        task_incl_run: dict
+            The run including its task
+        """
+        try:
+            self.start(task_incl_run)
+        except Exception:
+            self.log.exception(f"Failed to start run {task_incl_run['id']}")
+        finally:
+            # the run is now known to the docker manager, which prevents that
+            # it is started again
+            with self._lock:
+                self._starting.discard(task_incl_run['id'])
+
+
+def cpu_load() -> float:
+    """
+    Get the load average over the last minute per CPU core.
+
+    Returns
+    -------
+    float
+        Load per CPU core
+    """
+    return os.getloadavg()[0] / (os.cpu_count() or 1)
+
+
+def available_memory_mb() -> float | None:
+    """
+    Get the memory that is available for starting new processes.
+
+    Returns
+    -------
+    float | None
+        Available memory in MB, or None if it cannot be determined on this
+        platform
+    """
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
@@ -62,6 +62,12 @@ setup(
     extras_require={
         'dev': [
             'coverage==6.4.4'
+        ],
+        's3': [
+            'boto3==1.28.57'
+        ],
+        'orjson': [
+            'orjson==3.8.3'
         ]
     },
     package_data={
@@ -0,0 +1,152 @@
+"""
+Microbenchmark of the JSON encoding of a large page of runs, as returned by
+`/api/run?include=task&per_page=1000`.
+
+The page is requested with the encoders that are available: the `json` module
+of the standard library, and `orjson` if it is installed. For comparison, the
+page is also encoded in one go, as it was before the page was encoded in
+chunks. The response cache is disabled, so that every request is handled in
+full.
+
+Run it from the `vantage6-server` directory with:
+
+    python tests_server/benchmark_encoding.py
+"""
+import argparse
+import json
+import statistics
+import time
+import yaml
+
+from unittest.mock import patch
+from flask_socketio import SocketIO
+
+from vantage6.common.globals import APPNAME
+from vantage6.common.task_status import TaskStatus
+from vantage6.server import ServerApp, context, encoding
+from vantage6.server.globals import PACKAGE_FOLDER
+from vantage6.server.model.base import Base, Database
+from vantage6.server.controller.fixture import load
+from vantage6.server.resource import ServicesResources
+from vantage6.server.response_cache import ResponseCache
+
+URL = '/api/run?include=task&per_page=1000'
+
+
+def seed(n_runs: int, payload_size: int) -> None:
+    """
+    Add a collaboration with a node, tasks and runs to the database.
+
+    Parameters
+    ----------
+    n_runs : int
+        Number of runs to add
+    payload_size : int
+        Number of characters of the input, result and log of each run
+    """
+    tables = Base.metadata.tables
+    payload = 'x' * payload_size
+    with Database().engine.begin() as connection:
+        org_id = connection.execute(
+            tables['organization'].insert(), {'name': 'benchmark'}
+        ).inserted_primary_key[0]
+        col_id = connection.execute(
+            tables['collaboration'].insert(), {'name': 'benchmark'}
+        ).inserted_primary_key[0]
+        connection.execute(tables['Member'].insert(), {
+            'collaboration_id': col_id, 'organization_id': org_id
+        })
+        node_id = connection.execute(
+            tables['authenticatable'].insert(), {'type': 'node'}
+        ).inserted_primary_key[0]
+        connection.execute(tables['node'].insert(), {
+            'id': node_id, 'name': 'benchmark', 'collaboration_id': col_id,
+            'organization_id': org_id
+        })
+        for i in range(0, n_runs, 10):
+            task_id = connection.execute(tables['task'].insert(), {
+                'name': f'benchmark-{i}', 'image': 'some-image',
+                'collaboration_id': col_id, 'job_id': i,
+                'init_org_id': org_id, 'status': TaskStatus.COMPLETED.value,
+                'runs_completed': 10,
+            }).inserted_primary_key[0]
+            connection.execute(tables['run'].insert(), [
+                {'task_id': task_id, 'organization_id': org_id,
+                 'status': TaskStatus.COMPLETED.value, 'input': payload,
+                 'result': payload, 'log': payload}
+                for _ in range(10)
+            ])
+
+
+def encode_at_once(self, page, schema):
+    """Encode the page in one go, as :meth:`ServicesResources.response` did
+    before the pages were encoded in chunks."""
+    return self.api.make_response(
+        schema.meta_dump(page), 200, headers=page.headers
+    )
+
+
+def measure(client, headers: dict, repeat: int) -> list[float]:
+    """
+    Request the page several times.
+
+    Returns
+    -------
+    list[float]
+        Duration of each request in seconds
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(URL, headers=headers)
+        durations.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.data
+    assert len(json.loads(response.data)['data']) == 1000
+    return durations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--payload-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    Database().connect("sqlite://", allow_drop_all=True)
+    ctx = context.TestContext.from_external_config_file()
+    with patch.object(SocketIO, 'start_background_task'):
+        server = ServerApp(ctx)
+    file_ = str(PACKAGE_FOLDER / APPNAME / "server" / "_data" /
+                "unittest_fixtures.yaml")
+    with open(file_) as f:
+        load(yaml.safe_load(f.read()))
+    seed(1000, args.payload_size)
+    ResponseCache().configure({'max_size': 0})
+
+    client = server.app.test_client()
+    tokens = client.post(
+        '/api/token/user', json={'username': 'root', 'password': 'root'}
+    ).json
+    headers = {'Authorization': f"Bearer {tokens['access_token']}"}
+
+    cases = {'json, at once': (None, encode_at_once),
+             'json, in chunks': (None, ServicesResources.response)}
+    if encoding.orjson:
+        cases['orjson, at once'] = (encoding.orjson, encode_at_once)
+        cases['orjson, in chunks'] = (encoding.orjson,
+                                      ServicesResources.response)
+    else:
+        print("orjson is not installed, only json is measured")
+
+    # warm up
+    measure(client, headers, 1)
+    print(f"GET {URL}, {args.repeat} times")
+    for name, (orjson, response) in cases.items():
+        with patch.object(encoding, 'orjson', orjson), \
+                patch.object(ServicesResources, 'response', response):
+            durations = measure(client, headers, args.repeat)
+        print(f"{name:>20}: median {statistics.median(durations)*1000:7.1f}"
+              f" ms, min {min(durations)*1000:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark of the lookup of a node by its API key, as done when a node logs in,
+against the number of nodes in the database.
+
+The lookup is measured for the node that was added last, which is the worst
+case when all hashes are checked:
+
+*keyed*
+    The node has an API key fingerprint, so a single hash is checked
+*full scan*
+    The hash of every node is checked, as was done before API keys got a
+    fingerprint
+*legacy, first*
+    No node has a fingerprint yet, e.g. right after an upgrade. The nodes
+    without fingerprint are checked, and the fingerprint is stored
+*legacy, next*
+    The same node logs in again, now with its fingerprint
+*unknown, first*
+    An unknown key is checked against the nodes without fingerprint
+*unknown, next*
+    The same unknown key is rejected without checking any hash
+
+Run it from the `vantage6-server` directory with:
+
+    python tests_server/benchmark_node_login.py --nodes 1 10 50
+"""
+import argparse
+import logging
+import time
+
+from vantage6.server.model import Node
+from vantage6.server.model.base import Database, DatabaseSessionManager
+
+
+def measure(lookup) -> float:
+    """
+    Measure the duration of a lookup.
+
+    Returns
+    -------
+    float
+        Duration in milliseconds
+    """
+    start = time.perf_counter()
+    lookup()
+    return (time.perf_counter() - start) * 1000
+
+
+def full_scan(api_key: str) -> Node | None:
+    """ Check the hash of every node, as before fingerprints were added """
+    for node in Node.get():
+        if node.check_key(api_key):
+            return node
+    return None
+
+
+def benchmark(n_nodes: int) -> dict[str, float]:
+    """
+    Add nodes to an empty database, and measure the lookups.
+
+    Parameters
+    ----------
+    n_nodes : int
+        Number of nodes
+
+    Returns
+    -------
+    dict[str, float]
+        Duration of each lookup in milliseconds
+    """
+    Database().clear_data()
+    for i in range(n_nodes):
+        Node(name=f"benchmark-node-{i}", api_key=f"benchmark-key-{i}").save()
+    api_key = f"benchmark-key-{n_nodes - 1}"
+
+    durations = {
+        'keyed': measure(lambda: Node.get_by_api_key(api_key)),
+        'full scan': measure(lambda: full_scan(api_key)),
+    }
+
+    # remove the fingerprints, as if the nodes were created by an older
+    # version of the server
+    session = DatabaseSessionManager.get_session()
+    session.query(Node).update({Node.api_key_fingerprint: None})
+    session.commit()
+    Node._rejected_fingerprints.clear()
+
+    durations['legacy, first'] = measure(lambda: Node.get_by_api_key(api_key))
+    durations['legacy, next'] = measure(lambda: Node.get_by_api_key(api_key))
+    durations['unknown, first'] = measure(
+        lambda: Node.get_by_api_key('unknown-key')
+    )
+    durations['unknown, next'] = measure(
+        lambda: Node.get_by_api_key('unknown-key')
+    )
+    assert Node.get_by_api_key(api_key).name == f"benchmark-node-{n_nodes-1}"
+    return durations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--nodes', type=int, nargs='+', default=[1, 10, 50])
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    Database().connect("sqlite://", allow_drop_all=True)
+
+    results = {n_nodes: benchmark(n_nodes) for n_nodes in args.nodes}
+    cases = list(next(iter(results.values())))
+    print(f"{'nodes':>6}" + ''.join(f"{case:>16}" for case in cases))
+    for n_nodes, durations in results.items():
+        print(f"{n_nodes:>6}" + ''.join(
+            f"{durations[case]:>13.0f} ms" for case in cases
+        ))
+
+
+if __name__ == '__main__':
+    main()
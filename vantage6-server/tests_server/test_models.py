@@ -1,10 +1,19 @@
 import logging
 import unittest
+import bcrypt
 import yaml
 import datetime
+import io
+import os
+import tempfile
+import threading
 
+from pathlib import Path
+from unittest.mock import patch
 from sqlalchemy.exc import IntegrityError
 
+from vantage6.common.task_status import TaskStatus
+
 from vantage6.server.controller.fixture import load
 from vantage6.server.model.base import Database, DatabaseSessionManager
 from vantage6.server.globals import PACKAGE_FOLDER, APPNAME
@@ -17,10 +26,17 @@ from vantage6.server.model import (
     Task,
     Run,
     Node,
+    Counter,
     Rule,
     Role
 )
 from vantage6.server.model.rule import Scope, Operation
+from vantage6.server.last_seen import LastSeenBuffer
+from vantage6.server.storage import (
+    BlobStorage,
+    BlobStorageError,
+    S3StorageBackend
+)
 
 
 log = logging.getLogger(__name__.split(".")[-1])
@@ -28,6 +44,27 @@ log.level = logging.CRITICAL
 logging.basicConfig(level=logging.CRITICAL)
 
 
+class FakeS3Client:
+    """In-memory stand-in for the client of an S3-compatible storage."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[(Bucket, Key)] = Body
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise KeyError(Key)
+        return {'Body': io.BytesIO(self.objects[(Bucket, Key)])}
+
+    def upload_fileobj(self, Fileobj, Bucket, Key):
+        self.objects[(Bucket, Key)] = Fileobj.read()
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+
 class TestBaseModel(unittest.TestCase):
 
     @classmethod
@@ -167,6 +204,87 @@ class TestNodeModel(TestBaseModel):
         node.save()
         self.assertIsInstance(Node.get_by_api_key("some-secret-monkeys"), Node)
 
+    def test_get_by_api_key_checks_single_hash(self):
+        for i in range(5):
+            Node(name=f"fingerprint-node-{i}", api_key=f"key-{i}").save()
+
+        with patch("bcrypt.checkpw", wraps=bcrypt.checkpw) as checkpw:
+            node = Node.get_by_api_key("key-3")
+        self.assertEqual(node.name, "fingerprint-node-3")
+        self.assertEqual(checkpw.call_count, 1)
+
+    def test_get_by_api_key_legacy_node(self):
+        node = Node(name="legacy-node", api_key="legacy-key")
+        node.api_key_fingerprint = None
+        node.save()
+
+        self.assertIn(node, Node.get_without_api_key_fingerprint())
+
+        # the fingerprint is stored on the first login
+        self.assertEqual(Node.get_by_api_key("legacy-key"), node)
+        self.assertEqual(node.api_key_fingerprint,
+                         Node.fingerprint("legacy-key"))
+        self.assertNotIn(node, Node.get_without_api_key_fingerprint())
+        with patch("bcrypt.checkpw", wraps=bcrypt.checkpw) as checkpw:
+            self.assertEqual(Node.get_by_api_key("legacy-key"), node)
+        self.assertEqual(checkpw.call_count, 1)
+
+    def test_get_by_api_key_rejected_key(self):
+        node = Node(name="legacy-node-2", api_key="legacy-key-2")
+        node.api_key_fingerprint = None
+        node.save()
+
+        # an unknown key is checked against the nodes without fingerprint
+        # only once
+        with patch("bcrypt.checkpw", wraps=bcrypt.checkpw) as checkpw:
+            self.assertIsNone(Node.get_by_api_key("not-a-key"))
+            n_checks = checkpw.call_count
+            self.assertIsNone(Node.get_by_api_key("not-a-key"))
+        self.assertGreaterEqual(n_checks, 1)
+        self.assertEqual(checkpw.call_count, n_checks)
+
+        self.assertEqual(Node.get_by_api_key("legacy-key-2"), node)
+
+    def test_last_seen_buffer(self):
+        nodes = [Node(name=f"last-seen-node-{i}", api_key=f"last-seen-{i}")
+                 for i in range(3)]
+        for node in nodes:
+            node.save()
+        buffer = LastSeenBuffer()
+        buffer.flush()
+        seen = datetime.datetime(2023, 1, 1)
+
+        # nothing is written until the buffer is flushed
+        with patch.object(buffer, 'interval', 3600):
+            for i, node in enumerate(nodes[:2]):
+                buffer.touch(node.id, seen + datetime.timedelta(minutes=i))
+            # older times do not overwrite newer ones
+            buffer.touch(nodes[0].id, seen - datetime.timedelta(minutes=1))
+        self.assertEqual(buffer.get(nodes[0].id), seen)
+        self.assertIsNone(Node.get(nodes[0].id).last_seen)
+
+        buffer.flush()
+        self.assertIsNone(buffer.get(nodes[0].id))
+        self.assertEqual(Node.get(nodes[0].id).last_seen, seen)
+        self.assertEqual(Node.get(nodes[1].id).last_seen,
+                         seen + datetime.timedelta(minutes=1))
+        self.assertIsNone(Node.get(nodes[2].id).last_seen)
+
+    def test_set_offline_if_not_seen_since(self):
+        now = datetime.datetime.utcnow()
+        last_seen = [now, now - datetime.timedelta(minutes=5), None]
+        nodes = [
+            Node(name=f"stale-node-{i}", api_key=f"stale-{i}",
+                 status='online', last_seen=time)
+            for i, time in enumerate(last_seen)
+        ]
+        for node in nodes:
+            node.save()
+
+        Node.set_offline_if_not_seen_since(now - datetime.timedelta(minutes=1))
+        self.assertEqual([Node.get(node.id).status for node in nodes],
+                         ['online', 'offline', 'offline'])
+
     def test_relations(self):
         node = Node.get()[0]
         self.assertIsNotNone(node)
@@ -253,6 +371,176 @@ class TestRunModel(TestBaseModel):
     #     for result in Result.get():
     #         self.assertFalse(result.complete)
 
+    def test_blob_storage_local(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(BlobStorage().configure, None)
+        BlobStorage().configure(
+            {'type': 'local', 'path': tmp_dir.name, 'min_size': 10}
+        )
+
+        task = Task(name="unit_task")
+        run = Run(task=task, organization=Organization.get()[0],
+                  input="small", result="a large result")
+        run.save()
+
+        # small payloads stay in the database
+        self.assertEqual(run._input, "small")
+        self.assertIsNone(run.input_ref)
+
+        # large payloads are replaced by a reference
+        self.assertIsNone(run._result)
+        self.assertEqual(run.result_size, len("a large result"))
+        blob = Path(tmp_dir.name) / run.result_ref
+        self.assertEqual(blob.read_bytes(), b"a large result")
+
+        # the payload is loaded when it is read
+        DatabaseSessionManager.clear_session()
+        run = Run.get(run.id)
+        self.assertEqual(run.result, "a large result")
+
+        # overwriting a payload removes the old blob
+        run.result = "another large result"
+        run.save()
+        self.assertFalse(blob.exists())
+        self.assertEqual(run.result, "another large result")
+
+        # a corrupted blob is detected
+        (Path(tmp_dir.name) / run.result_ref).write_bytes(b"corrupted")
+        run.__dict__.pop('_blob_cache')
+        with self.assertRaises(BlobStorageError):
+            run.result
+
+        # blobs are removed together with the run
+        blob = Path(tmp_dir.name) / run.result_ref
+        run.delete()
+        self.assertFalse(blob.exists())
+
+    def test_blob_storage_transaction(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(BlobStorage().configure, None)
+        BlobStorage().configure(
+            {'type': 'local', 'path': tmp_dir.name, 'min_size': 10}
+        )
+        session = DatabaseSessionManager.get_session()
+
+        run = Run(task=Task(name="unit_task"), result="a large result")
+        run.save()
+        old_blob = Path(tmp_dir.name) / run.result_ref
+
+        # the old blob is kept until the new one is committed, and the new
+        # blob is removed when the transaction is rolled back
+        run.result = "another large result"
+        new_blob = Path(tmp_dir.name) / run.result_ref
+        self.assertTrue(old_blob.exists())
+        self.assertTrue(new_blob.exists())
+        session.rollback()
+        self.assertTrue(old_blob.exists())
+        self.assertFalse(new_blob.exists())
+        self.assertEqual(run.result, "a large result")
+
+        # blobs of a run that is deleted are kept if the deletion is rolled
+        # back
+        session.delete(run)
+        session.flush()
+        session.rollback()
+        self.assertTrue(old_blob.exists())
+
+        # blobs of objects that are not in a session yet are tracked once
+        # they are added to one
+        other = Run(result="a large result")
+        other_blob = Path(tmp_dir.name) / other.result_ref
+        session.add(other)
+        session.rollback()
+        self.assertFalse(other_blob.exists())
+
+        run.delete()
+        self.assertFalse(old_blob.exists())
+
+    def test_shared_input_in_blob_storage(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(BlobStorage().configure, None)
+        BlobStorage().configure(
+            {'type': 'local', 'path': tmp_dir.name, 'min_size': 10}
+        )
+
+        task = Task(name="unit_task", shared_input="a large input")
+        task.save()
+        self.assertIsNone(task._shared_input)
+        blob = Path(tmp_dir.name) / task.shared_input_ref
+        self.assertEqual(blob.read_bytes(), b"a large input")
+
+        DatabaseSessionManager.clear_session()
+        task = Task.get(task.id)
+        self.assertEqual(task.shared_input, "a large input")
+
+        task.delete()
+        self.assertFalse(blob.exists())
+
+    def test_blob_storage_from_file(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(BlobStorage().configure, None)
+        BlobStorage().configure(
+            {'type': 'local', 'path': tmp_dir.name, 'min_size': 10}
+        )
+
+        # a large file is copied to the blob storage without reading it as a
+        # whole
+        run = Run(task=Task(name="unit_task"))
+        with patch.object(BlobStorage, 'store') as store:
+            run.result = io.BytesIO(b"a large result")
+        store.assert_not_called()
+        run.save()
+        self.assertIsNone(run._result)
+        self.assertEqual(run.result_size, len("a large result"))
+        self.assertEqual(run.result_checksum,
+                         BlobStorage.checksum(b"a large result"))
+        blob = Path(tmp_dir.name) / run.result_ref
+        self.assertEqual(blob.read_bytes(), b"a large result")
+
+        # a small file is stored in the database
+        run.input = io.BytesIO(b"small")
+        run.save()
+        self.assertEqual(run._input, "small")
+        self.assertIsNone(run.input_ref)
+
+        DatabaseSessionManager.clear_session()
+        run = Run.get(run.id)
+        self.assertEqual(run.result, "a large result")
+        run.delete()
+        self.assertFalse(blob.exists())
+
+    def test_blob_storage_s3(self):
+        self.addCleanup(BlobStorage().configure, None)
+        client = FakeS3Client()
+        storage = BlobStorage()
+        storage.backend = S3StorageBackend('bucket', prefix='v6', client=client)
+        storage.min_size = 0
+
+        run = Run(task=Task(name="unit_task"), log="the log")
+        run.save()
+        self.assertIsNone(run._log)
+        self.assertEqual(
+            client.objects[('bucket', f'v6/{run.log_ref}')], b"the log"
+        )
+
+        DatabaseSessionManager.clear_session()
+        run = Run.get(run.id)
+        self.assertEqual(run.log, "the log")
+
+        # files are uploaded as such
+        run.log = io.BytesIO(b"another log")
+        self.assertEqual(
+            client.objects[('bucket', f'v6/{run.log_ref}')], b"another log"
+        )
+        run.save()
+
+        run.delete()
+        self.assertEqual(client.objects, {})
+
     def test_relations(self):
         run = Run.get()[0]
         self.assertIsInstance(run.organization, Organization)
@@ -297,6 +585,76 @@ class TestTaskModel(TestBaseModel):
             if task.id > highest_id:
                 highest_id = task.id
 
+    def test_run_aggregates(self):
+        org = Organization.get()[0]
+        task = Task(name="unit_task_aggregates", image="some-image", job_id=1,
+                    collaboration=Collaboration.get()[0])
+        task.save()
+        self.assertEqual(task.status, TaskStatus.COMPLETED.value)
+
+        runs = [
+            Run(task=task, organization=org, status=TaskStatus.PENDING)
+            for _ in range(3)
+        ]
+        for run in runs:
+            run.save()
+        self.assertEqual(task.status, TaskStatus.PENDING.value)
+        self.assertEqual(task.runs_pending, 3)
+        self.assertIsNone(task.finished_at)
+
+        runs[0].status = TaskStatus.ACTIVE
+        runs[0].save()
+        self.assertEqual(task.status, TaskStatus.ACTIVE.value)
+        self.assertEqual((task.runs_pending, task.runs_active), (2, 1))
+
+        # the status may be changed without reading the old status first
+        finished_at = datetime.datetime(2023, 1, 1)
+        for run in runs:
+            session = DatabaseSessionManager.get_session()
+            session.expire(run)
+            run.status = TaskStatus.COMPLETED
+            run.finished_at = finished_at
+            run.save()
+        self.assertEqual(task.status, TaskStatus.COMPLETED.value)
+        self.assertEqual(task.runs_completed, 3)
+        self.assertEqual(
+            (task.runs_pending, task.runs_active, task.runs_failed), (0, 0, 0)
+        )
+        self.assertEqual(task.finished_at, finished_at)
+
+        runs[1].status = TaskStatus.CRASHED
+        runs[1].save()
+        self.assertEqual(task.status, TaskStatus.FAILED.value)
+        self.assertEqual(task.runs_failed, 1)
+
+        runs[1].delete()
+        self.assertEqual(task.status, TaskStatus.COMPLETED.value)
+        self.assertEqual((task.runs_completed, task.runs_failed), (2, 0))
+
+    def test_fill_run_aggregates(self):
+        task = Task(name="unit_task_fill", image="some-image", job_id=1,
+                    collaboration=Collaboration.get()[0])
+        for status in (TaskStatus.COMPLETED, TaskStatus.KILLED):
+            Run(task=task, organization=Organization.get()[0], status=status,
+                finished_at=datetime.datetime(2023, 1, 1))
+        task.save()
+
+        # clear the aggregates as if the columns had just been added
+        session = DatabaseSessionManager.get_session()
+        session.execute(Task.__table__.update().values(
+            status=None, finished_at=None, runs_completed=None,
+            runs_failed=None
+        ))
+        session.commit()
+        with Database().engine.begin() as connection:
+            Task.fill_new_columns(connection, ['status', 'runs_failed'])
+        session.expire_all()
+
+        self.assertEqual(task.status, TaskStatus.FAILED.value)
+        self.assertEqual((task.runs_completed, task.runs_failed), (1, 1))
+        self.assertEqual(task.runs_pending, 0)
+        self.assertEqual(task.finished_at, datetime.datetime(2023, 1, 1))
+
     def test_relations(self):
         db_task = Task.get()
         for task in db_task:
@@ -308,6 +666,92 @@ class TestTaskModel(TestBaseModel):
                 self.assertIsInstance(user, User)
 
 
+class TestJobIdAllocation(unittest.TestCase):
+    """
+    Create tasks concurrently in a database that can be shared between
+    threads. Set VANTAGE6_TEST_POSTGRES_URI to run against PostgreSQL too.
+    """
+
+    database_uri = None
+
+    @classmethod
+    def setUpClass(cls):
+        if cls.database_uri is None:
+            cls.tmp_dir = tempfile.TemporaryDirectory()
+            cls.database_uri = f"sqlite:///{cls.tmp_dir.name}/jobs.db"
+        Database().connect(cls.database_uri, allow_drop_all=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        Database().clear_data()
+
+    def test_next_job_id_existing_tasks(self):
+        # databases of older versions do not have the counter yet
+        session = DatabaseSessionManager.get_session()
+        session.query(Counter).delete()
+        session.commit()
+        Task(name="unit_task_existing", job_id=1000).save()
+
+        self.assertEqual(Task.next_job_id(), 1001)
+        self.assertEqual(Task.next_job_id(), 1002)
+        DatabaseSessionManager.clear_session()
+
+    def test_next_job_id_leaves_session_alone(self):
+        # allocating a job id must not commit what the caller has pending
+        session = DatabaseSessionManager.get_session()
+        task = Task(name="unit_task_pending")
+        session.add(task)
+
+        Task.next_job_id()
+        self.assertIn(task, session.new)
+        session.rollback()
+
+        self.assertIsNone(
+            session.query(Task).filter_by(name="unit_task_pending").first()
+        )
+        DatabaseSessionManager.clear_session()
+
+    def test_concurrent_task_creation(self):
+        n_threads, n_tasks = 8, 20
+        job_ids = []
+        errors = []
+
+        def create_tasks():
+            try:
+                session = DatabaseSessionManager.get_session()
+                for _ in range(n_tasks):
+                    # like in a request, the task is already in the session
+                    # when its job id is allocated
+                    task = Task(name="unit_task_concurrent")
+                    session.add(task)
+                    task.job_id = task.next_job_id()
+                    session.commit()
+                    job_ids.append(task.job_id)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                Database().session_b.remove()
+
+        threads = [
+            threading.Thread(target=create_tasks) for _ in range(n_threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(job_ids), n_threads * n_tasks)
+        self.assertEqual(len(set(job_ids)), len(job_ids))
+
+
+@unittest.skipUnless(os.environ.get('VANTAGE6_TEST_POSTGRES_URI'),
+                     'VANTAGE6_TEST_POSTGRES_URI is not set')
+class TestJobIdAllocationPostgres(TestJobIdAllocation):
+
+    database_uri = os.environ.get('VANTAGE6_TEST_POSTGRES_URI')
+
+
 class TestRuleModel(TestBaseModel):
 
     def test_read(self):
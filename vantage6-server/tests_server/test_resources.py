@@ -5,9 +5,17 @@ import unittest
 import logging
 import json
 import uuid
+import io
+import time
+import base64
+import tempfile
 
+from contextlib import contextmanager
 from http import HTTPStatus
+from pathlib import Path
 from unittest.mock import patch
+from sqlalchemy import event
+from sqlalchemy.orm import Session as SASession
 from flask import Response as BaseResponse
 from flask.testing import FlaskClient
 from flask_socketio import SocketIO
@@ -17,7 +25,7 @@ from vantage6.common import logger_name
 from vantage6.common.globals import APPNAME
 from vantage6.common.task_status import TaskStatus
 from vantage6.server.globals import PACKAGE_FOLDER
-from vantage6.server import ServerApp, session
+from vantage6.server import ServerApp, session, encoding
 from vantage6.server.model import (Rule, Role, Organization, User, Node,
                                    Collaboration, Task, Run)
 from vantage6.server.model.rule import Scope, Operation
@@ -25,6 +33,9 @@ from vantage6.server import context
 from vantage6.server._version import __version__
 from vantage6.server.model.base import Database, DatabaseSessionManager
 from vantage6.server.controller.fixture import load
+from vantage6.server.storage import BlobStorage
+from vantage6.server.resource.common import output_schema
+from vantage6.server.response_cache import CachedResponse, ResponseCache
 
 
 logger = logger_name(__name__)
@@ -250,6 +261,28 @@ class TestResources(unittest.TestCase):
             links = new_response.json.get('links')
         return result, json_data
 
+    @contextmanager
+    def count_queries(self):
+        """
+        Record the SQL statements that are executed within the context.
+
+        Yields
+        ------
+        list[str]
+            The statements that have been executed
+        """
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = Database().engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+
     def create_node_and_login(self, *args, **kwargs):
         node, api_key = self.create_node(*args, **kwargs)
         return self.login_node(api_key)
@@ -429,6 +462,137 @@ class TestResources(unittest.TestCase):
         result3 = self.app.get("/api/run?task_id=1", headers=headers)
         self.assertEqual(result3.status_code, 200)
 
+    def test_list_endpoints_query_count(self):
+        # make sure that there are several resources of each type, with
+        # relationships that are used in the output
+        org = Organization()
+        org2 = Organization()
+        col = Collaboration(organizations=[org, org2])
+        nodes = [
+            Node(organization=org, collaboration=col),
+            Node(organization=org2, collaboration=col),
+        ]
+        for node in nodes:
+            node.save()
+        tasks = []
+        for _ in range(3):
+            task = Task(collaboration=col, init_org=org, runs=[
+                Run(organization=org, status=TaskStatus.PENDING),
+                Run(organization=org2, status=TaskStatus.PENDING),
+            ])
+            task.save()
+            tasks.append(task)
+
+        # the number of queries should not depend on the number of resources
+        # on a page. The first request loads the permissions into the cache.
+        headers = self.login('root')
+        self.app.get('/api/task', headers=headers)
+        for url in ['/api/task?', '/api/task?include=runs,results&',
+                    '/api/run?', '/api/run?include=task&', '/api/result?',
+                    '/api/node?', '/api/user?', '/api/organization?',
+                    '/api/collaboration?', '/api/role?', '/api/rule?']:
+            with self.subTest(url=url):
+                with self.count_queries() as single:
+                    response = self.app.get(f'{url}per_page=1',
+                                            headers=headers)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(len(response.json['data']), 1)
+
+                with self.count_queries() as multiple:
+                    response = self.app.get(f'{url}per_page=5',
+                                            headers=headers)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertGreater(len(response.json['data']), 1)
+                self.assertEqual(len(multiple), len(single))
+
+        # cleanup
+        for task in tasks:
+            for run in task.runs:
+                run.delete()
+            task.delete()
+        for node in nodes:
+            node.delete()
+
+    def test_cursor_pagination(self):
+        col = Collaboration()
+        col.save()
+        tasks = [Task(collaboration=col) for _ in range(5)]
+        for task in tasks:
+            task.save()
+        expected_ids = sorted([task.id for task in tasks], reverse=True)
+
+        # walk through all pages by following the 'next' links
+        headers = self.login('root')
+        url = f'/api/task?collaboration_id={col.id}&per_page=2&cursor='
+        ids = []
+        while url:
+            result = self.app.get(url, headers=headers)
+            self.assertEqual(result.status_code, HTTPStatus.OK)
+            self.assertNotIn('total-count', result.headers)
+            self.assertLessEqual(len(result.json['data']), 2)
+            ids += [task['id'] for task in result.json['data']]
+            url = result.json['links'].get('next')
+        self.assertEqual(ids, expected_ids)
+
+        # the total is only counted on request
+        result = self.app.get(
+            f'/api/task?collaboration_id={col.id}&cursor=&include_total=true',
+            headers=headers
+        )
+        self.assertEqual(result.headers['total-count'], '5')
+
+        # invalid cursors and sorting are not accepted
+        result = self.app.get('/api/task?cursor=invalid', headers=headers)
+        self.assertEqual(result.status_code, HTTPStatus.BAD_REQUEST)
+        result = self.app.get('/api/run?cursor=&sort=id', headers=headers)
+        self.assertEqual(result.status_code, HTTPStatus.BAD_REQUEST)
+
+        # cleanup
+        for task in tasks:
+            task.delete()
+
+    def test_task_status_filter(self):
+        col = Collaboration()
+        col.save()
+        org = Organization()
+        org.save()
+        statuses = [
+            [TaskStatus.COMPLETED, TaskStatus.ACTIVE],
+            [TaskStatus.COMPLETED, TaskStatus.CRASHED],
+            [TaskStatus.COMPLETED, TaskStatus.COMPLETED],
+        ]
+        tasks = []
+        for run_statuses in statuses:
+            task = Task(collaboration=col)
+            for status in run_statuses:
+                Run(task=task, organization=org, status=status)
+            task.save()
+            tasks.append(task)
+
+        headers = self.login('root')
+        for status, task in zip(['active', 'failed', 'completed'], tasks):
+            result = self.app.get(
+                f'/api/task?collaboration_id={col.id}&status={status}',
+                headers=headers
+            )
+            self.assertEqual(result.status_code, HTTPStatus.OK)
+            self.assertEqual([t['id'] for t in result.json['data']],
+                             [task.id])
+            self.assertEqual(result.json['data'][0]['status'], status)
+
+        result = self.app.get(
+            f'/api/task?collaboration_id={col.id}&sort=status',
+            headers=headers
+        )
+        self.assertEqual([t['status'] for t in result.json['data']],
+                         ['active', 'completed', 'failed'])
+
+        # cleanup
+        for task in tasks:
+            for run in task.runs:
+                run.delete()
+            task.delete()
+
     def test_stats(self):
         headers = self.login("root")
         result = self.app.get("/api/run", headers=headers)
@@ -1109,6 +1273,139 @@ class TestResources(unittest.TestCase):
         org3.delete()
         col.delete()
 
+    def test_permission_cache(self):
+        org = Organization()
+        org.save()
+        rule = Rule.get_by_("organization", Scope.GLOBAL, Operation.VIEW)
+        role = Role(name="cached-role", organization=org, rules=[rule])
+        role.save()
+        user = self.create_user(org, rules=[rule])
+        user.roles = [role]
+        user.save()
+        headers = self.login(user.username)
+
+        # the rules are only loaded for the first request
+        result = self.app.get('/api/organization', headers=headers)
+        self.assertEqual(result.status_code, HTTPStatus.OK)
+        with self.count_queries() as statements:
+            result = self.app.get('/api/organization', headers=headers)
+        self.assertEqual(result.status_code, HTTPStatus.OK)
+        self.assertFalse([s for s in statements if 'FROM rule' in s])
+
+        # removing the 'extra' rule of the user through /user still leaves
+        # the rule of the role
+        root_headers = self.login('root')
+        result = self.app.patch(f'/api/user/{user.id}', headers=root_headers,
+                                json={'rules': []})
+        self.assertEqual(result.status_code, HTTPStatus.OK)
+        result = self.app.get('/api/organization', headers=headers)
+        self.assertEqual(result.status_code, HTTPStatus.OK)
+
+        # removing the rule from the role through /role takes effect at once
+        result = self.app.delete(f'/api/role/{role.id}/rule/{rule.id}',
+                                 headers=root_headers)
+        self.assertEqual(result.status_code, HTTPStatus.OK)
+        result = self.app.get('/api/organization', headers=headers)
+        self.assertEqual(result.status_code, HTTPStatus.UNAUTHORIZED)
+
+    def test_response_cache(self):
+        org = Organization()
+        col = Collaboration(organizations=[org])
+        task = Task(collaboration=col, init_org=org, runs=[
+            Run(organization=org, status=TaskStatus.PENDING)
+        ])
+        task.save()
+        url = f'/api/task?collaboration_id={col.id}'
+        headers = self.login('root')
+
+        # a repeated request is answered from the cache
+        result = self.app.get(url, headers=headers)
+        self.assertEqual(result.status_code, HTTPStatus.OK)
+        etag = result.headers['ETag']
+        with self.count_queries() as statements:
+            cached = self.app.get(url, headers=headers)
+        self.assertEqual(cached.status_code, HTTPStatus.OK)
+        self.assertEqual(cached.json, result.json)
+        self.assertEqual(cached.headers['ETag'], etag)
+        self.assertFalse([s for s in statements if 'FROM task' in s])
+
+        # a client that already has the response gets an empty response
+        result = self.app.get(url, headers={**headers, 'If-None-Match': etag})
+        self.assertEqual(result.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertFalse(result.data)
+
+        # other identities do not get the cached response
+        other_headers = self.create_user_and_login()
+        result = self.app.get(url, headers=other_headers)
+        self.assertEqual(result.status_code, HTTPStatus.UNAUTHORIZED)
+
+        # a change of the run changes the status of the task
+        run = task.runs[0]
+        run.status = TaskStatus.COMPLETED
+        run.save()
+        result = self.app.get(url, headers={**headers, 'If-None-Match': etag})
+        self.assertEqual(result.status_code, HTTPStatus.OK)
+        self.assertNotEqual(result.headers['ETag'], etag)
+        self.assertEqual(result.json['data'][0]['status'],
+                         TaskStatus.COMPLETED.value)
+
+    def test_response_cache_eviction(self):
+        cache = ResponseCache()
+        self.addCleanup(cache.configure, None)
+        cache.configure({'max_size': 1 / 2**10})
+
+        def put(key):
+            versions = cache.versions(['task'])
+            cache.put(key, ['task'], CachedResponse(
+                b'x' * 400, [], key, versions, time.monotonic() + 60
+            ))
+
+        def get(key):
+            return cache.get(key, cache.versions(['task']))
+
+        # the least recently used response is removed to make room
+        put('a')
+        put('b')
+        self.assertIsNotNone(get('a'))
+        put('c')
+        self.assertIsNotNone(get('a'))
+        self.assertIsNone(get('b'))
+        self.assertIsNotNone(get('c'))
+
+        # a change of the table invalidates all responses
+        cache.bump(['task'])
+        self.assertIsNone(get('a'))
+        self.assertIsNone(get('c'))
+
+    def test_json_encoding(self):
+        cache = ResponseCache()
+        self.addCleanup(cache.configure, None)
+        cache.configure({'max_size': 0})
+
+        org = Organization()
+        col = Collaboration(organizations=[org])
+        Node(organization=org, collaboration=col).save()
+        task = Task(collaboration=col, init_org=org, runs=[
+            Run(organization=org, status=TaskStatus.PENDING)
+            for _ in range(3)
+        ])
+        task.save()
+        url = f'/api/run?task_id={task.id}&include=task'
+        headers = self.login('root')
+
+        # a page that is encoded in several chunks, with and without orjson
+        with patch.object(output_schema, 'PAGE_ENCODING_CHUNK_SIZE', 2):
+            result = self.app.get(url, headers=headers)
+            with patch.object(encoding, 'orjson', None):
+                fallback = self.app.get(url, headers=headers)
+        self.assertEqual(result.status_code, HTTPStatus.OK)
+        self.assertEqual(len(result.json['data']), 3)
+        self.assertEqual(result.json, fallback.json)
+
+        # data that orjson cannot encode is encoded with json
+        self.assertEqual(json.loads(encoding.dumps({'id': 2**70})),
+                         {'id': 2**70})
+
     def test_remove_rule_from_role_permissions(self):
         org = Organization()
         org.save()
@@ -3188,6 +3485,378 @@ class TestResources(unittest.TestCase):
         # cleanup
         node2.delete()
 
+    def test_create_task_with_shared_input(self):
+        org = Organization()
+        org2 = Organization()
+        col = Collaboration(organizations=[org, org2])
+        col.save()
+        node = Node(organization=org, collaboration=col)
+        node.save()
+        node2 = Node(organization=org2, collaboration=col)
+        node2.save()
+
+        rule = Rule.get_by_("task", Scope.COLLABORATION, Operation.CREATE)
+        headers = self.create_user_and_login(org, rules=[rule])
+        results = self.app.post('/api/task', headers=headers, json={
+            "organizations": [
+                {'id': org.id, 'input': 'key1'},
+                {'id': org2.id, 'input': 'key2'}
+            ],
+            "shared_input": "iv$msg",
+            'collaboration_id': col.id,
+            'image': 'some-image'
+        })
+        self.assertEqual(results.status_code, HTTPStatus.CREATED)
+        self.assertNotIn('shared_input', results.json)
+
+        # the shared input is stored once, and combined with the key of each
+        # organization when the runs are retrieved
+        task = Task.get(results.json['id'])
+        self.assertEqual(task.shared_input, 'iv$msg')
+        self.assertEqual(
+            sorted(run.input for run in task.runs), ['key1', 'key2'])
+        self.assertEqual(
+            sorted(run.full_input for run in task.runs),
+            ['key1$iv$msg', 'key2$iv$msg']
+        )
+
+        # cleanup
+        node.delete()
+        node2.delete()
+
+    def test_create_task_with_binary_shared_input(self):
+        org = Organization()
+        col = Collaboration(organizations=[org], encrypted=True)
+        col.save()
+        node = Node(organization=org, collaboration=col)
+        node.save()
+
+        raw = bytes(range(256)) * 10
+        rule = Rule.get_by_("task", Scope.COLLABORATION, Operation.CREATE)
+        headers = self.create_user_and_login(org, rules=[rule])
+        task_json = json.dumps({
+            "organizations": [{'id': org.id, 'input': 'key1'}],
+            'collaboration_id': col.id,
+            'image': 'some-image'
+        })
+        results = self.app.post('/api/task', headers=headers, data={
+            'task': task_json,
+            'shared_input': (io.BytesIO(b'iv$' + raw), 'shared_input'),
+        }, content_type='multipart/form-data')
+        self.assertEqual(results.status_code, HTTPStatus.CREATED)
+
+        # the binary message is stored base64 encoded
+        task = Task.get(results.json['id'])
+        self.assertEqual(
+            task.shared_input, 'iv$' + base64.b64encode(raw).decode())
+
+        # invalid task description
+        for invalid_task in ('not-json', '[]', '1'):
+            results = self.app.post('/api/task', headers=headers, data={
+                'task': invalid_task,
+                'shared_input': (io.BytesIO(b'iv$' + raw), 'shared_input'),
+            }, content_type='multipart/form-data')
+            self.assertEqual(results.status_code, HTTPStatus.BAD_REQUEST)
+
+        # cleanup
+        node.delete()
+
+    def test_create_task_in_single_transaction(self):
+        orgs = [Organization() for _ in range(5)]
+        col = Collaboration(organizations=orgs, encrypted=False)
+        col.save()
+        nodes = [Node(organization=org, collaboration=col) for org in orgs]
+        for node in nodes:
+            node.save()
+        rule = Rule.get_by_("task", Scope.COLLABORATION, Operation.CREATE)
+        headers = self.create_user_and_login(orgs[0], rules=[rule])
+
+        # the task should be committed when the events are emitted
+        emitted = []
+
+        def emit(event, data, *args, **kwargs):
+            task_id = data['task_id'] if isinstance(data, dict) else data
+            with Database().engine.connect() as connection:
+                count = connection.execute(
+                    'SELECT COUNT(*) FROM run WHERE task_id = ?', task_id
+                ).scalar()
+            emitted.append((event, count))
+
+        def post_task(organizations, databases=({'label': 'default'},)):
+            # record the objects that are written by each commit of a session
+            commits, written = [], []
+
+            def after_flush(session, flush_context):
+                written.extend((type(obj), obj.id) for obj in session.new)
+
+            def after_commit(session):
+                if written:
+                    commits.append(list(written))
+                written.clear()
+
+            listeners = [('after_flush', after_flush),
+                         ('after_commit', after_commit)]
+            for name, listener in listeners:
+                event.listen(SASession, name, listener)
+            try:
+                result = self.app.post('/api/task', headers=headers, json={
+                    'organizations': [
+                        {'id': org.id, 'input': 'input'}
+                        for org in organizations
+                    ],
+                    'collaboration_id': col.id,
+                    'image': 'some-image',
+                    'databases': list(databases),
+                })
+            finally:
+                for name, listener in listeners:
+                    event.remove(SASession, name, listener)
+            return result, commits
+
+        def count_tasks():
+            with Database().engine.connect() as connection:
+                return connection.execute('SELECT COUNT(*) FROM task')\
+                    .scalar()
+
+        with patch.object(self.server.socketio, 'emit', emit):
+            result, commits = post_task(orgs)
+        self.assertEqual(result.status_code, HTTPStatus.CREATED)
+        self.assertEqual(emitted, [('task_created', 5), ('new_task', 5)])
+
+        task = Task.get(result.json['id'])
+        self.assertEqual(len(task.runs), 5)
+        self.assertEqual([d.database for d in task.databases], ['default'])
+        self.assertEqual(task.runs_pending, 5)
+
+        # the task, its runs and its databases are written in one commit
+        self.assertEqual(len(commits), 1)
+        self.assertIn((Task, task.id), commits[0])
+        for obj in task.runs + task.databases:
+            self.assertIn((type(obj), obj.id), commits[0])
+
+        # a rejected request does not leave a task behind
+        n_tasks = count_tasks()
+        result, commits = post_task(
+            orgs, databases=[{'label': 'default'}, {'type': 'csv'}]
+        )
+        self.assertEqual(result.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(commits, [])
+        self.assertEqual(count_tasks(), n_tasks)
+
+        # cleanup
+        for node in nodes:
+            node.delete()
+
+    def test_binary_run_result(self):
+        org = Organization()
+        col = Collaboration(organizations=[org], encrypted=True)
+        col.save()
+        node, api_key = self.create_node(org, col)
+        task = Task(collaboration=col, init_org=org)
+        run = Run(task=task, organization=org, status=TaskStatus.ACTIVE)
+        run.save()
+        headers = self.login_node(api_key)
+
+        raw = bytes(range(256)) * 10
+        body = b'key$iv$' + raw
+
+        # only binary data is accepted
+        result = self.app.put(
+            f'/api/run/{run.id}/result', headers=headers, data=body,
+            content_type='application/json'
+        )
+        self.assertEqual(result.status_code, HTTPStatus.BAD_REQUEST)
+
+        # encrypted results should start with the encrypted key and iv
+        result = self.app.put(
+            f'/api/run/{run.id}/result', headers=headers, data=raw[:10],
+            content_type='application/octet-stream'
+        )
+        self.assertEqual(result.status_code, HTTPStatus.BAD_REQUEST)
+
+        # non-existing run
+        result = self.app.put(
+            '/api/run/9999/result', headers=headers, data=body,
+            content_type='application/octet-stream'
+        )
+        self.assertEqual(result.status_code, HTTPStatus.NOT_FOUND)
+
+        # upload result; it is stored base64 encoded
+        result = self.app.put(
+            f'/api/run/{run.id}/result', headers=headers, data=body,
+            content_type='application/octet-stream'
+        )
+        self.assertEqual(result.status_code, HTTPStatus.OK)
+        run = Run.get(run.id)
+        self.assertEqual(
+            run.result, 'key$iv$' + base64.b64encode(raw).decode())
+
+        # node of another organization cannot upload the result
+        other_headers = self.create_node_and_login(collaboration=col)
+        result = self.app.put(
+            f'/api/run/{run.id}/result', headers=other_headers, data=body,
+            content_type='application/octet-stream'
+        )
+        self.assertEqual(result.status_code, HTTPStatus.UNAUTHORIZED)
+
+        # download the result in binary format
+        result = self.app.get(
+            f'/api/run/{run.id}/result', headers=self.login('root')
+        )
+        self.assertEqual(result.status_code, HTTPStatus.OK)
+        self.assertEqual(result.mimetype, 'application/octet-stream')
+        self.assertEqual(result.data, body)
+
+        # cleanup
+        node.delete()
+        run.delete()
+        task.delete()
+
+    def test_large_run_input_linked_in_lists(self):
+        org = Organization()
+        col = Collaboration(organizations=[org], encrypted=False)
+        col.save()
+        node, api_key = self.create_node(org, col)
+        task = Task(collaboration=col, init_org=org)
+        raw = b'a' * 2**20
+        large_input = base64.b64encode(raw).decode()
+        large = Run(task=task, organization=org, input=large_input)
+        small = Run(task=task, organization=org, input='small')
+        large.save()
+        small.save()
+        headers = self.login_node(api_key)
+
+        # by default, lists contain the inputs themselves
+        result = self.app.get(f'/api/run?task_id={task.id}', headers=headers)
+        inputs = {run['id']: run['input'] for run in result.json['data']}
+        self.assertEqual(inputs, {small.id: 'small', large.id: large_input})
+        result = self.app.get(f'/api/task/{task.id}?include=runs',
+                              headers=headers)
+        inputs = {run['id']: run['input'] for run in result.json['runs']}
+        self.assertEqual(inputs[large.id], large_input)
+
+        # large inputs are replaced by a link if requested
+        result = self.app.get(f'/api/task/{task.id}?include=runs&'
+                              'link_payloads=true', headers=headers)
+        inputs = {run['id']: run['input'] for run in result.json['runs']}
+        self.assertEqual(inputs[large.id]['id'], large.id)
+        result = self.app.get(f'/api/run?task_id={task.id}&link_payloads=true',
+                              headers=headers)
+        inputs = {run['id']: run['input'] for run in result.json['data']}
+        self.assertEqual(inputs[small.id], 'small')
+        self.assertEqual(inputs[large.id]['id'], large.id)
+        link = inputs[large.id]['link']
+        self.assertEqual(link, f'/api/run/{large.id}/input')
+
+        # the linked input can be downloaded in binary format
+        result = self.app.get(link, headers=headers)
+        self.assertEqual(result.status_code, HTTPStatus.OK)
+        self.assertEqual(result.data, raw)
+
+        # a single run always contains its input
+        result = self.app.get(f'/api/run/{large.id}', headers=headers)
+        self.assertEqual(result.json['input'], large_input)
+
+        # cleanup
+        node.delete()
+        large.delete()
+        small.delete()
+        task.delete()
+
+    def test_binary_run_result_in_blob_storage(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(BlobStorage().configure, None)
+        BlobStorage().configure(
+            {'type': 'local', 'path': tmp_dir.name, 'min_size': 10}
+        )
+
+        org = Organization()
+        col = Collaboration(organizations=[org], encrypted=False)
+        node, api_key = self.create_node(org, col)
+        task = Task(collaboration=col, init_org=org)
+        run = Run(task=task, organization=org, status=TaskStatus.ACTIVE)
+        run.save()
+
+        # the uploaded result is written to the blob storage as it is
+        # converted, and not kept in the database
+        raw = bytes(range(256)) * 10
+        result = self.app.put(
+            f'/api/run/{run.id}/result', headers=self.login_node(api_key),
+            data=raw, content_type='application/octet-stream'
+        )
+        self.assertEqual(result.status_code, HTTPStatus.OK)
+        run = Run.get(run.id)
+        self.assertIsNone(run._result)
+        blob = Path(tmp_dir.name) / run.result_ref
+        self.assertEqual(blob.read_bytes(), base64.b64encode(raw))
+        self.assertEqual(run.result, base64.b64encode(raw).decode())
+
+        # cleanup
+        node.delete()
+        run.delete()
+        task.delete()
+
+    def test_run_result_in_blob_storage(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(BlobStorage().configure, None)
+        BlobStorage().configure(
+            {'type': 'local', 'path': tmp_dir.name, 'min_size': 10}
+        )
+
+        org = Organization()
+        col = Collaboration(organizations=[org])
+        node, api_key = self.create_node(org, col)
+        task = Task(collaboration=col, init_org=org)
+        run = Run(task=task, organization=org, status=TaskStatus.ACTIVE,
+                  input='a large input')
+        run.save()
+
+        headers = self.login_node(api_key)
+        result = self.app.patch(f'/api/run/{run.id}', headers=headers, json={
+            'result': 'a large result',
+            'log': 'a large log',
+        })
+        self.assertEqual(result.status_code, HTTPStatus.OK)
+        self.assertEqual(result.json['log'], 'a large log')
+
+        # only a reference to the payloads is kept in the database
+        run = Run.get(run.id)
+        self.assertIsNone(run._result)
+        self.assertIsNotNone(run.result_ref)
+        self.assertIsNone(run._log)
+
+        # the payloads are not part of the output, except for the results
+        headers = self.login('root')
+        result = self.app.get(f'/api/run/{run.id}', headers=headers)
+        self.assertNotIn('result', result.json)
+        self.assertNotIn('result_ref', result.json)
+        result = self.app.get(f'/api/result/{run.id}', headers=headers)
+        self.assertEqual(result.json['result'], 'a large result')
+        result = self.app.get(f'/api/result?task_id={task.id}',
+                              headers=headers)
+        self.assertEqual(result.json['data'][0]['result'], 'a large result')
+
+        # payloads in the blob storage are only left out of lists of runs if
+        # links are requested
+        result = self.app.get(f'/api/run?task_id={task.id}', headers=headers)
+        self.assertEqual(result.json['data'][0]['log'], 'a large log')
+        self.assertEqual(result.json['data'][0]['input'], 'a large input')
+        result = self.app.get(f'/api/run?task_id={task.id}&link_payloads=true',
+                              headers=headers)
+        self.assertEqual(result.json['data'][0]['log']['link'],
+                         f'/api/run/{run.id}')
+        self.assertEqual(result.json['data'][0]['input']['link'],
+                         f'/api/run/{run.id}/input')
+        result = self.app.get(f'/api/run/{run.id}', headers=headers)
+        self.assertEqual(result.json['log'], 'a large log')
+
+        # cleanup
+        node.delete()
+        run.delete()
+        task.delete()
+
     def test_delete_task_permissions(self):
 
         # test non-existing task
@@ -17,7 +17,6 @@ if not os.environ.get('READTHEDOCS'):
 import importlib
 import logging
 import uuid
-import json
 import time
 import datetime as dt
 import traceback
@@ -44,8 +43,12 @@ from vantage6.common.globals import PING_INTERVAL_SECONDS
 from vantage6.server import db
 from vantage6.cli.context import ServerContext
 from vantage6.server.model.base import DatabaseSessionManager, Database
+from vantage6.server.storage import BlobStorage
 from vantage6.server.resource.common.output_schema import HATEOASModelSchema
-from vantage6.server.permission import RuleNeed, PermissionManager
+from vantage6.server.permission import PermissionCache, PermissionManager
+from vantage6.server.last_seen import LastSeenBuffer
+from vantage6.server.response_cache import ResponseCache
+from vantage6.server.encoding import dumps
 from vantage6.server.globals import (
     APPNAME,
     ACCESS_TOKEN_EXPIRES_HOURS,
@@ -402,7 +405,7 @@ class ServerApp:
                     isinstance(data[0], db.Base):
                 data = db.jsonable(data)
 
-            resp = make_response(json.dumps(data), code)
+            resp = make_response(dumps(data), code)
             resp.headers.extend(headers or {})
             return resp
 
@@ -496,47 +499,27 @@ class ServerApp:
             """
             identity = jwt_headers['sub']
             auth_identity = Identity(identity)
+            cache = PermissionCache()
 
             # in case of a user or node an auth id is shared as identity
             if isinstance(identity, int):
 
-                # auth_identity = Identity(identity)
-
                 auth = db.Authenticatable.get(identity)
 
                 if isinstance(auth, db.Node):
-
-                    for rule in db.Role.get_by_name(DefaultRole.NODE).rules:
-                        auth_identity.provides.add(
-                                RuleNeed(
-                                    name=rule.name,
-                                    scope=rule.scope,
-                                    operation=rule.operation
-                                )
-                            )
+                    auth_identity.provides.update(cache.get(
+                        ('role', DefaultRole.NODE),
+                        lambda: db.Role.get_by_name(DefaultRole.NODE).rules
+                    ))
 
                 if isinstance(auth, db.User):
-
-                    # add role permissions
-                    for role in auth.roles:
-                        for rule in role.rules:
-                            auth_identity.provides.add(
-                                RuleNeed(
-                                    name=rule.name,
-                                    scope=rule.scope,
-                                    operation=rule.operation
-                                )
-                            )
-
-                    # add 'extra' permissions
-                    for rule in auth.rules:
-                        auth_identity.provides.add(
-                            RuleNeed(
-                                name=rule.name,
-                                scope=rule.scope,
-                                operation=rule.operation
-                            )
-                        )
+                    # role permissions plus 'extra' permissions
+                    auth_identity.provides.update(cache.get(
+                        ('user', auth.id),
+                        lambda: [
+                            rule for role in auth.roles for rule in role.rules
+                        ] + auth.rules
+                    ))
 
                 identity_changed.send(current_app._get_current_object(),
                                       identity=auth_identity)
@@ -544,15 +527,10 @@ class ServerApp:
                 return auth
             else:
                 # container identity
-
-                for rule in db.Role.get_by_name(DefaultRole.CONTAINER).rules:
-                    auth_identity.provides.add(
-                        RuleNeed(
-                            name=rule.name,
-                            scope=rule.scope,
-                            operation=rule.operation
-                        )
-                    )
+                auth_identity.provides.update(cache.get(
+                    ('role', DefaultRole.CONTAINER),
+                    lambda: db.Role.get_by_name(DefaultRole.CONTAINER).rules
+                ))
                 identity_changed.send(current_app._get_current_object(),
                                       identity=auth_identity)
                 log.debug(identity)
@@ -622,6 +600,14 @@ class ServerApp:
                            failed_login_attempts=0,
                            last_login_attempt=None)
             user.save()
+
+        # the fingerprint of an API key cannot be derived from its hash, so
+        # nodes created before fingerprints were introduced get one when they
+        # log in
+        n_legacy_nodes = len(db.Node.get_without_api_key_fingerprint())
+        if n_legacy_nodes:
+            log.info(f"{n_legacy_nodes} node(s) do not have an API key "
+                     "fingerprint yet. It is stored when they log in.")
         return self
 
     def __node_status_worker(self) -> None:
@@ -641,13 +627,10 @@ class ServerApp:
                 # respond.
                 time.sleep(PING_INTERVAL_SECONDS + 5)
 
-                # Check for each node that is online if they have responded.
-                # Otherwise set them to offline.
-                online_status_nodes = db.Node.get_online_nodes()
-                for node in online_status_nodes:
-                    if node.last_seen < before_wait:
-                        node.status = 'offline'
-                        node.save()
+                # Set the nodes that have not responded to offline, in a
+                # single update. Buffered pings are written first.
+                LastSeenBuffer().flush()
+                db.Node.set_offline_if_not_seen_since(before_wait)
             except Exception:
                 log.exception('Node-status thread had an exception')
                 time.sleep(PING_INTERVAL_SECONDS)
@@ -676,6 +659,9 @@ def run_server(config: str, system_folders: bool = True) -> ServerApp:
     allow_drop_all = ctx.config["allow_drop_all"]
     Database().connect(uri=ctx.get_database_uri(),
                        allow_drop_all=allow_drop_all)
+    BlobStorage().configure(ctx.config.get('blob_storage'),
+                            path=ctx.get_blob_storage_path())
+    ResponseCache().configure(ctx.config.get('response_cache'))
     return ServerApp(ctx).start()
 
 
@@ -11,6 +11,7 @@ from vantage6.common import (
     error,
 )
 from vantage6.server.model.base import Database
+from vantage6.server.storage import BlobStorage
 from vantage6.cli.globals import DEFAULT_SERVER_SYSTEM_FOLDERS as S_FOL
 from vantage6.server.controller import fixture
 from vantage6.cli.configuration_wizard import (
@@ -88,6 +89,8 @@ def click_insert_context(func: callable) -> callable:
         allow_drop_all = ctx.config["allow_drop_all"]
         Database().connect(uri=ctx.get_database_uri(),
                            allow_drop_all=allow_drop_all)
+        BlobStorage().configure(ctx.config.get('blob_storage'),
+                                path=ctx.get_blob_storage_path())
 
         return func(ctx, *args, **kwargs)
 
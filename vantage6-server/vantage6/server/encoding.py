@@ -0,0 +1,52 @@
+"""
+Encoding of API responses as JSON.
+
+If the optional `orjson` package is installed, it is used to encode the
+responses. For large responses, such as pages with many runs, it is several
+times faster than the `json` module of the standard library. Data that
+`orjson` cannot encode, such as integers that do not fit in 64 bits, is
+encoded with the standard library.
+"""
+from __future__ import annotations
+
+import json
+import logging
+
+from vantage6.common import logger_name
+from vantage6.common.globals import STRING_ENCODING
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+module_name = logger_name(__name__)
+log = logging.getLogger(module_name)
+
+
+def dumps(data) -> bytes:
+    """
+    Encode data as JSON.
+
+    Parameters
+    ----------
+    data
+        Data to encode, consisting of dictionaries, lists, strings, numbers,
+        booleans and None
+
+    Returns
+    -------
+    bytes
+        The encoded data
+
+    Raises
+    ------
+    TypeError
+        If the data cannot be encoded
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            log.debug("orjson cannot encode the data, using json instead")
+    return json.dumps(data).encode(STRING_ENCODING)
@@ -48,6 +48,30 @@ DEFAULT_SUPPORT_EMAIL_ADDRESS = 'support@vantage6.ai'
 # default time that token is valid in minutes
 DEFAULT_EMAILED_TOKEN_VALIDITY_MINUTES = 60
 
+# payloads (inputs, results and logs) of at least this number of bytes are
+# stored in the blob storage, if one is configured
+BLOB_STORAGE_MIN_SIZE = 2**16
+
+# number of seconds that the rules of a user or fixed role are cached. Within
+# a server instance, the cache is cleared as soon as roles or rules change.
+# The expiry bounds how long changes made by other instances go unnoticed.
+PERMISSION_CACHE_TTL = 60
+
+# the times at which users and nodes were last seen are written to the
+# database at most once per this number of seconds
+LAST_SEEN_FLUSH_INTERVAL_SECONDS = 5
+
+# default maximum total size in bytes of the responses that are cached, and
+# the number of seconds that a cached response may be used. Within a server
+# instance, cached responses are invalidated as soon as the data they depend
+# on changes. The expiry bounds how long changes made by other instances go
+# unnoticed.
+RESPONSE_CACHE_MAX_SIZE = 64 * 2**20
+RESPONSE_CACHE_TTL = 10
+
+# number of items of a page that are serialized and encoded as JSON at once
+PAGE_ENCODING_CHUNK_SIZE = 100
+
 # pagination settings
 DEFAULT_PAGE = 1
 DEFAULT_PAGE_SIZE = 10
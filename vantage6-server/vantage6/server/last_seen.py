@@ -0,0 +1,122 @@
+"""
+Buffer for the times at which users and nodes were last seen.
+
+Every request of a user or node, and every ping of a node, updates the time
+at which it was last seen. Committing this for every request would make these
+writes contend with the actual work of the server. Instead, the times are
+kept in memory and written to the database with a single UPDATE statement at
+most every `LAST_SEEN_FLUSH_INTERVAL_SECONDS` seconds.
+"""
+from __future__ import annotations
+
+import datetime
+import logging
+import threading
+import time
+
+from sqlalchemy import sql
+from sqlalchemy.orm.session import Session
+
+from vantage6.common import logger_name, Singleton
+from vantage6.server.globals import LAST_SEEN_FLUSH_INTERVAL_SECONDS
+from vantage6.server.model.authenticatable import Authenticatable
+from vantage6.server.model.base import DatabaseSessionManager
+
+module_name = logger_name(__name__)
+log = logging.getLogger(module_name)
+
+
+class LastSeenBuffer(metaclass=Singleton):
+    """
+    Times at which users and nodes were last seen that have not been written
+    to the database yet.
+
+    Attributes
+    ----------
+    interval : float
+        Minimal number of seconds between two writes to the database
+    """
+
+    def __init__(self) -> None:
+        self.interval = LAST_SEEN_FLUSH_INTERVAL_SECONDS
+        self._last_seen = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def touch(self, auth_id: int,
+              when: datetime.datetime | None = None) -> None:
+        """
+        Register that a user or node has been seen. The buffer is written to
+        the database if that has not been done for a while.
+
+        Parameters
+        ----------
+        auth_id : int
+            Id of the user or node
+        when : datetime.datetime | None
+            Time at which it was seen. Defaults to now.
+        """
+        when = when or datetime.datetime.utcnow()
+        with self._lock:
+            if when > self._last_seen.get(auth_id, datetime.datetime.min):
+                self._last_seen[auth_id] = when
+            due = time.monotonic() - self._last_flush >= self.interval
+        if due:
+            self.flush()
+
+    def get(self, auth_id: int) -> datetime.datetime | None:
+        """
+        Get the time at which a user or node was last seen, if it has not
+        been written to the database yet.
+
+        Parameters
+        ----------
+        auth_id : int
+            Id of the user or node
+
+        Returns
+        -------
+        datetime.datetime | None
+            Time at which it was last seen, None if it is not in the buffer
+        """
+        with self._lock:
+            return self._last_seen.get(auth_id)
+
+    def flush(self, session: Session | None = None) -> None:
+        """
+        Write the buffered times to the database in a single UPDATE and
+        commit.
+
+        Parameters
+        ----------
+        session : Session | None
+            Database session. Defaults to the session of the current request
+            or thread.
+        """
+        with self._lock:
+            last_seen, self._last_seen = self._last_seen, {}
+            self._last_flush = time.monotonic()
+        if not last_seen:
+            return
+
+        session = session or DatabaseSessionManager.get_session()
+        table = Authenticatable.__table__
+        try:
+            session.execute(
+                table.update()
+                .where(table.c.id.in_(last_seen))
+                .values(last_seen=sql.case(
+                    last_seen, value=table.c.id, else_=table.c.last_seen
+                ))
+            )
+            session.commit()
+        except Exception:
+            session.rollback()
+            log.exception("Could not update when users and nodes were last "
+                          "seen")
+            # keep the times, so that they are written on the next attempt
+            with self._lock:
+                for auth_id, when in last_seen.items():
+                    if when > self._last_seen.get(auth_id,
+                                                  datetime.datetime.min):
+                        self._last_seen[auth_id] = when
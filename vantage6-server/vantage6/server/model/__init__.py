@@ -14,3 +14,4 @@ from vantage6.server.model.rule import Rule
 from vantage6.server.model.role_rule_association import role_rule_association
 from vantage6.server.model.algorithm_port import AlgorithmPort
 from vantage6.server.model.task_database import TaskDatabase
+from vantage6.server.model.counter import Counter
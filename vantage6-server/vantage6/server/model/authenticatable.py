@@ -1,6 +1,6 @@
 import bcrypt
 
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, DateTime, Index
 
 from vantage6.server.model.base import Base
 
@@ -24,6 +24,11 @@ class Authenticatable(Base):
     last_seen = Column(DateTime)
     status = Column(String)
 
+    # e.g. to find the nodes that are online
+    __table_args__ = (
+        Index('ix_authenticatable_type_status', 'type', 'status'),
+    )
+
     @staticmethod
     def hash(secret: str) -> str:
         """
@@ -5,12 +5,13 @@ from typing import Any
 from flask.globals import g
 
 from sqlalchemy import Column, Integer, inspect, Table, exists
+from sqlalchemy.engine import Connection
 from sqlalchemy.orm.session import Session
 from sqlalchemy.ext.declarative import declarative_base, declared_attr
 from sqlalchemy.orm.clsregistry import _ModuleMarker
 from sqlalchemy import create_engine
 from sqlalchemy.engine.url import make_url
-from sqlalchemy.orm import scoped_session, sessionmaker, RelationshipProperty
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.orm.exc import NoResultFound
 
 from vantage6.common import logger_name, Singleton
@@ -123,9 +124,10 @@ class Database(metaclass=Singleton):
         Base.metadata.create_all(bind=self.engine)
         log.info("Database initialized!")
 
-        # add columns that are not yet in the database (they may have been
-        # added in a newer minor version)
+        # add columns and indexes that are not yet in the database (they may
+        # have been added in a newer minor version)
         self.add_missing_columns()
+        self.add_missing_indexes()
 
     def add_missing_columns(self) -> None:
         """
@@ -147,6 +149,12 @@ class Database(metaclass=Singleton):
 
                 for col in non_existing_cols:
                     self.add_col_to_table(col, table_cls)
+
+                if non_existing_cols:
+                    with self.engine.begin() as connection:
+                        table_cls.fill_new_columns(
+                            connection, [col.key for col in non_existing_cols]
+                        )
             else:
                 log.error(
                     f"Model {table_cls} declares table {table_name} which does"
@@ -178,12 +186,10 @@ class Database(metaclass=Singleton):
         mapper = inspect(table_cls)
 
         non_existing_columns = []
-        for prop in mapper.attrs:
-            if not isinstance(prop, RelationshipProperty):
-                for column in prop.columns:
-                    if self.is_column_missing(column, column_names,
-                                              table_name):
-                        non_existing_columns.append(column)
+        for prop in mapper.column_attrs:
+            for column in prop.columns:
+                if self.is_column_missing(column, column_names, table_name):
+                    non_existing_columns.append(column)
 
         return non_existing_columns
 
@@ -208,6 +214,26 @@ class Database(metaclass=Singleton):
                                                    col_type)
         )
 
+    def add_missing_indexes(self) -> None:
+        """
+        Add indexes that are described in the SQLAlchemy models but are
+        missing in the database. These are not created by `create_all` if
+        their table already existed.
+        """
+        iengine = inspect(self.engine)
+        table_names = iengine.get_table_names()
+        for table in Base.metadata.sorted_tables:
+            if table.name not in table_names:
+                continue
+            existing = {
+                index['name'] for index in iengine.get_indexes(table.name)
+            }
+            for index in table.indexes:
+                if index.name not in existing:
+                    log.warn(f"Adding index {index.name} to table "
+                             f"{table.name} as it did not exist yet")
+                    index.create(bind=self.engine)
+
     @staticmethod
     def is_column_missing(column: Column, column_names: list[str],
                           table_name: str) -> bool:
@@ -382,6 +408,22 @@ class ModelBase:
         session.delete(self)
         session.commit()
 
+    @classmethod
+    def fill_new_columns(cls, connection: Connection,
+                         column_names: list[str]) -> None:
+        """
+        Fill columns that have been added to the table of an existing
+        database. By default, new columns are left empty.
+
+        Parameters
+        ----------
+        connection: Connection
+            Connection to the database
+        column_names: list[str]
+            Names of the columns that have been added
+        """
+        pass
+
     @classmethod
     def exists(cls, field: str, value: Any) -> bool:
         """
@@ -0,0 +1,227 @@
+"""
+Payloads of models that are stored in the blob storage if they are large.
+
+Blobs are written when a payload is set, but the database only refers to them
+once the transaction is committed. Therefore, blobs that are replaced or whose
+owner is deleted are only removed after the commit, and blobs that have been
+stored in a transaction that is not committed are removed again.
+"""
+import io
+import logging
+
+from typing import BinaryIO
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from vantage6.common import logger_name
+from vantage6.common.globals import STRING_ENCODING
+from vantage6.server.storage import BlobStorage
+
+log = logging.getLogger(logger_name(__name__))
+
+# keys in `Session.info` of the blobs that have been stored and the blobs that
+# are no longer referred to in the current transaction
+STORED_BLOBS_KEY = 'vantage6_stored_blobs'
+DISCARDED_BLOBS_KEY = 'vantage6_discarded_blobs'
+
+# attribute of instances that are not in a session yet, that holds their
+# stored and discarded blobs until they are added to a session
+PENDING_BLOBS_ATTR = '_pending_blobs'
+
+
+def blob_columns(name: str) -> tuple[str]:
+    """
+    Get the names of the columns in which a payload, or the reference to it in
+    the blob storage, is stored.
+
+    Parameters
+    ----------
+    name : str
+        Name of the payload
+
+    Returns
+    -------
+    tuple[str]
+        Names of the column attributes of the payload
+    """
+    return (f'_{name}', f'{name}_ref', f'{name}_size', f'{name}_checksum')
+
+
+def is_in_blob_storage(obj: object, name: str) -> bool:
+    """
+    Check if a payload of an object is stored in the blob storage.
+
+    Parameters
+    ----------
+    obj : object
+        Object that has the payload
+    name : str
+        Name of the payload
+
+    Returns
+    -------
+    bool
+        True if the payload is stored in the blob storage
+    """
+    return getattr(obj, f'{name}_ref') is not None
+
+
+def blob_property(name: str) -> property:
+    """
+    Create a property for a payload that is either stored in the database or
+    in the blob storage.
+
+    The payload is stored in the column `_<name>`. If it is stored in the blob
+    storage instead, the columns `<name>_ref`, `<name>_size` and
+    `<name>_checksum` contain the key, size and checksum of the blob, and the
+    blob is only loaded when the property is read. A payload can also be set
+    from a file, which is then copied to the blob storage in chunks.
+
+    Parameters
+    ----------
+    name : str
+        Name of the payload
+
+    Returns
+    -------
+    property
+        Property to get and set the payload
+    """
+    def getter(self) -> str | None:
+        ref = getattr(self, f'{name}_ref')
+        if ref is None:
+            return getattr(self, f'_{name}')
+        # cache the blob on the instance, as it may be read several times
+        # while handling a single request
+        cache = self.__dict__.setdefault('_blob_cache', {})
+        if ref not in cache:
+            cache[ref] = BlobStorage().load(
+                ref, getattr(self, f'{name}_checksum')
+            ).decode(STRING_ENCODING)
+        return cache[ref]
+
+    def setter(self, value: str | bytes | BinaryIO | None) -> None:
+        storage = BlobStorage()
+        old_ref = getattr(self, f'{name}_ref')
+        if hasattr(value, 'read'):
+            # a (spooled) file is only read into memory if it is stored in
+            # the database
+            size = value.seek(0, io.SEEK_END)
+            value.seek(0)
+            if not storage.enabled or size < storage.min_size:
+                value = value.read()
+        if isinstance(value, bytes):
+            value = value.decode(STRING_ENCODING)
+
+        new_ref = None
+        if isinstance(value, str):
+            data = value.encode(STRING_ENCODING)
+            if storage.enabled and len(data) >= storage.min_size:
+                new_ref = storage.store(name, data)
+                size, checksum = len(data), storage.checksum(data)
+        elif value is not None:
+            checksum = storage.checksum_file(value)
+            new_ref = storage.store_file(name, value)
+
+        if new_ref:
+            setattr(self, f'_{name}', None)
+            setattr(self, f'{name}_ref', new_ref)
+            setattr(self, f'{name}_size', size)
+            setattr(self, f'{name}_checksum', checksum)
+        else:
+            setattr(self, f'_{name}', value)
+            setattr(self, f'{name}_ref', None)
+            setattr(self, f'{name}_size', None)
+            setattr(self, f'{name}_checksum', None)
+
+        track_blobs(
+            self,
+            stored=[new_ref] if new_ref else [],
+            discarded=[old_ref] if old_ref else []
+        )
+
+    return property(getter, setter)
+
+
+def discard_blobs(obj: object, names: tuple[str]) -> None:
+    """
+    Remove the blobs of the payloads of an object once the current
+    transaction is committed, e.g. because the object is deleted.
+
+    Parameters
+    ----------
+    obj : object
+        Object that has the payloads
+    names : tuple[str]
+        Names of the payloads
+    """
+    refs = [getattr(obj, f'{name}_ref') for name in names]
+    track_blobs(obj, stored=[], discarded=[ref for ref in refs if ref])
+
+
+def track_blobs(obj: object, stored: list[str],
+                discarded: list[str]) -> None:
+    """
+    Register blobs that have been stored for an object, and blobs of the
+    object that are no longer referred to, in the transaction of its session.
+    If the object is not in a session yet, they are kept on the object until
+    it is added to one.
+
+    Parameters
+    ----------
+    obj : object
+        Object that has the payloads
+    stored : list[str]
+        Keys of blobs that have been stored
+    discarded : list[str]
+        Keys of blobs that are no longer referred to
+    """
+    if not stored and not discarded:
+        return
+    session = object_session(obj)
+    if session is None:
+        pending = obj.__dict__.setdefault(PENDING_BLOBS_ATTR, ([], []))
+    else:
+        pending = (session.info.setdefault(STORED_BLOBS_KEY, []),
+                   session.info.setdefault(DISCARDED_BLOBS_KEY, []))
+    pending[0].extend(stored)
+    pending[1].extend(discarded)
+
+
+@event.listens_for(Session, "after_attach")
+def attach_blobs(session: Session, obj: object) -> None:
+    """
+    Move the blobs of an object that has been added to a session to the
+    transaction of that session.
+    """
+    pending = obj.__dict__.pop(PENDING_BLOBS_ATTR, None)
+    if pending:
+        track_blobs(obj, stored=pending[0], discarded=pending[1])
+
+
+@event.listens_for(Session, "after_commit")
+def remove_discarded_blobs(session: Session) -> None:
+    """
+    Remove the blobs that are no longer referred to once the transaction has
+    been committed. The stored blobs are now referred to by the database.
+    """
+    session.info.pop(STORED_BLOBS_KEY, None)
+    for ref in session.info.pop(DISCARDED_BLOBS_KEY, ()):
+        BlobStorage().remove(ref)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def remove_uncommitted_blobs(session: Session, transaction) -> None:
+    """
+    Remove the blobs that have been stored in a transaction that ended
+    without being committed, e.g. because it has been rolled back. The blobs
+    that were discarded in it are still referred to by the database.
+    """
+    if transaction.parent is not None:
+        return
+    session.info.pop(DISCARDED_BLOBS_KEY, None)
+    for ref in session.info.pop(STORED_BLOBS_KEY, ()):
+        log.debug(f"Removing blob '{ref}' of a transaction that was not "
+                  "committed")
+        BlobStorage().remove(ref)
@@ -0,0 +1,116 @@
+from typing import Callable
+
+from sqlalchemy import Column, Integer, String, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+
+from vantage6.server.model.base import Base, Database
+
+
+class Counter(Base):
+    """
+    Table that contains counters from which unique numbers are allocated,
+    such as the job ids of tasks.
+
+    A counter is incremented in the database itself, so that processes or
+    threads that allocate numbers at the same time never receive the same
+    number.
+
+    Attributes
+    ----------
+    name : str
+        Name of the counter
+    value : int
+        Last number that has been allocated
+    """
+    # fields
+    name = Column(String, unique=True)
+    value = Column(Integer)
+
+    @classmethod
+    def next_value(cls, name: str, start: Callable[[Connection], int]) -> int:
+        """
+        Allocate the next number of a counter.
+
+        The counter is incremented in a short transaction on its own database
+        connection. The session of the caller is therefore never flushed,
+        committed or rolled back, so a task can allocate its job id and still
+        be created in a single transaction. Call this before the caller's
+        session has written anything, as the counter may otherwise have to
+        wait for the caller's locks (e.g. in SQLite).
+
+        Parameters
+        ----------
+        name : str
+            Name of the counter
+        start : Callable[[Connection], int]
+            Function that returns the last number that has been allocated.
+            It is only called if the counter does not exist yet, e.g. for
+            databases that were created before the counter was introduced.
+
+        Returns
+        -------
+        int
+            The allocated number
+        """
+        engine = Database().engine
+        try:
+            with engine.begin() as connection:
+                return cls._increment(connection, name, start)
+        except IntegrityError:
+            # the counter has been created by someone else in the meantime,
+            # so it can now be incremented
+            with engine.begin() as connection:
+                return cls._increment(connection, name, start)
+
+    @classmethod
+    def _increment(cls, connection: Connection, name: str,
+                   start: Callable[[Connection], int]) -> int:
+        """
+        Increment a counter, or create it if it does not exist.
+
+        Parameters
+        ----------
+        connection : Connection
+            Database connection in which a transaction has been started
+        name : str
+            Name of the counter
+        start : Callable[[Connection], int]
+            Function that returns the last number that has been allocated
+
+        Returns
+        -------
+        int
+            The new value of the counter
+
+        Raises
+        ------
+        IntegrityError
+            If the counter is created at the same time by someone else
+        """
+        table = cls.__table__
+        # the update locks the counter until the transaction is committed
+        updated = connection.execute(
+            table.update().where(table.c.name == name)
+            .values(value=table.c.value + 1)
+        ).rowcount
+        if not updated:
+            connection.execute(
+                table.insert().values(
+                    name=name, value=(start(connection) or 0) + 1
+                )
+            )
+        return connection.execute(
+            select(table.c.value).where(table.c.name == name)
+        ).scalar()
+
+    def __repr__(self) -> str:
+        """
+        String representation of the counter
+
+        Returns
+        -------
+        str
+            String representation of the counter
+        """
+        return f"<Counter {self.name}: {self.value}>"
@@ -1,12 +1,18 @@
 from __future__ import annotations
 import bcrypt
+import datetime
+import hashlib
 
 from vantage6.server.model.base import DatabaseSessionManager
 from sqlalchemy.orm import relationship, validates
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index, or_
 
 from vantage6.server.model.authenticatable import Authenticatable
 
+# maximum number of fingerprints of API keys that are remembered to not belong
+# to any node without fingerprint
+MAX_REJECTED_FINGERPRINTS = 10000
+
 
 class Node(Authenticatable):
     """
@@ -20,21 +26,32 @@ class Node(Authenticatable):
         Name of the node
     api_key : str
         API key of the node
+    api_key_fingerprint : str
+        Truncated SHA-256 digest of the API key, used to look up the node
+        without having to check the bcrypt hash of every node
     collaboration : :class:`~.model.collaboration.Collaboration`
         Collaboration that the node belongs to
     organization : :class:`~.model.organization.Organization`
         Organization that the node belongs to
     """
-    _hidden_attributes = ['api_key']
+    _hidden_attributes = ['api_key', 'api_key_fingerprint']
 
     id = Column(Integer, ForeignKey('authenticatable.id'), primary_key=True)
 
     # fields
     name = Column(String, unique=True)
     api_key = Column(String)
+    api_key_fingerprint = Column(String, index=True)
     collaboration_id = Column(Integer, ForeignKey("collaboration.id"))
     organization_id = Column(Integer, ForeignKey("organization.id"))
 
+    # a node is looked up by its organization and collaboration, e.g. to find
+    # the node that executes a run
+    __table_args__ = (
+        Index('ix_node_organization_id_collaboration_id', 'organization_id',
+              'collaboration_id'),
+    )
+
     # relationships
     collaboration = relationship("Collaboration", back_populates='nodes')
     organization = relationship("Organization", back_populates='nodes')
@@ -45,6 +62,11 @@ class Node(Authenticatable):
         'polymorphic_identity': 'node',
     }
 
+    # fingerprints of API keys that did not match any node without
+    # fingerprint. Such nodes are not created anymore, so these keys never
+    # have to be checked against them again.
+    _rejected_fingerprints: set[str] = set()
+
     @validates("api_key")
     def _validate_api_key(self, key: str, api_key: str) -> str:
         """
@@ -62,8 +84,30 @@ class Node(Authenticatable):
         str
             The hashed api_key
         """
+        self.api_key_fingerprint = self.fingerprint(api_key)
         return self.hash(api_key)
 
+    @staticmethod
+    def fingerprint(api_key: str) -> str:
+        """
+        Compute the lookup fingerprint of an API key.
+
+        The fingerprint is a truncated SHA-256 digest. It is only used to
+        narrow down the candidate nodes, the bcrypt hash is still checked
+        before a node is authenticated.
+
+        Parameters
+        ----------
+        api_key : str
+            The (unhashed) API key
+
+        Returns
+        -------
+        str
+            Fingerprint of the API key
+        """
+        return hashlib.sha256(api_key.encode('utf8')).hexdigest()[:16]
+
     def check_key(self, key: str) -> bool:
         """
         Checks if the provided key matches the stored key.
@@ -101,15 +145,55 @@ class Node(Authenticatable):
         """
         session = DatabaseSessionManager.get_session()
 
-        nodes = session.query(cls).all()
+        fingerprint = cls.fingerprint(api_key)
+        candidates = session.query(cls).filter_by(
+            api_key_fingerprint=fingerprint
+        ).all()
         session.commit()
-        for node in nodes:
-            is_correct_key = node.check_key(api_key)
-            if is_correct_key:
+        for node in candidates:
+            if node.check_key(api_key):
                 return node
+
+        if fingerprint in cls._rejected_fingerprints:
+            return None
+
+        # Nodes that were created before fingerprints were introduced do not
+        # have one yet, and it cannot be derived from the hashed key. Check
+        # those the old way and store the fingerprint on a match, so that the
+        # next lookup of this node is a keyed one.
+        for node in cls.get_without_api_key_fingerprint():
+            if node.check_key(api_key):
+                node.api_key_fingerprint = fingerprint
+                node.save()
+                return node
+
+        if len(cls._rejected_fingerprints) >= MAX_REJECTED_FINGERPRINTS:
+            cls._rejected_fingerprints.clear()
+        cls._rejected_fingerprints.add(fingerprint)
+
         # no node found with matching API key
         return None
 
+    @classmethod
+    def get_without_api_key_fingerprint(cls) -> list[Node]:
+        """
+        Return nodes that have an API key but no fingerprint of it, because
+        they were created before fingerprints were introduced. They get a
+        fingerprint when they log in for the first time.
+
+        Returns
+        -------
+        list[Node]
+            List of node models without API key fingerprint
+        """
+        session = DatabaseSessionManager.get_session()
+
+        result = session.query(cls).filter(
+            cls.api_key.isnot(None), cls.api_key_fingerprint.is_(None)
+        ).all()
+        session.commit()
+        return result
+
     @classmethod
     def get_online_nodes(cls) -> list[Node]:
         """
@@ -126,6 +210,33 @@ class Node(Authenticatable):
         session.commit()
         return result
 
+    @classmethod
+    def set_offline_if_not_seen_since(cls, time: datetime.datetime) -> int:
+        """
+        Set the status of online nodes that have not been seen since a
+        certain time to offline, in a single update.
+
+        Parameters
+        ----------
+        time : datetime.datetime
+            Nodes that have not been seen since this time are set offline
+
+        Returns
+        -------
+        int
+            Number of nodes that have been set offline
+        """
+        session = DatabaseSessionManager.get_session()
+        count = session.query(Authenticatable)\
+            .filter(Authenticatable.type == 'node')\
+            .filter(Authenticatable.status == 'online')\
+            .filter(or_(Authenticatable.last_seen < time,
+                        Authenticatable.last_seen.is_(None)))\
+            .update({Authenticatable.status: 'offline'},
+                    synchronize_session=False)
+        session.commit()
+        return count
+
     @classmethod
     def exists_by_id(cls, organization_id: int, collaboration_id: int) -> bool:
         """
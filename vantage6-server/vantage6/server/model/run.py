@@ -1,22 +1,38 @@
 import datetime
 import logging
 
-from sqlalchemy import Column, Text, DateTime, Integer, ForeignKey
-from sqlalchemy.orm import relationship
+from collections import Counter
+
+from sqlalchemy import (
+    Column, Text, DateTime, Integer, ForeignKey, Index, event, inspect
+)
+from sqlalchemy.orm import (
+    relationship, deferred, synonym, column_property, Session
+)
 from sqlalchemy.orm.exc import NoResultFound, MultipleResultsFound
+from sqlalchemy.orm.util import identity_key
 
 from vantage6.common import logger_name
+from vantage6.common.encryption import CryptorBase
 from vantage6.server.model.base import Base
 from vantage6.server.model import (
     Node,
     Collaboration,
     Organization
 )
-from vantage6.server.model.task import Task
+from vantage6.server.model.task import Task, AGGREGATE_COLUMNS
 from vantage6.server.model.base import DatabaseSessionManager
+from vantage6.server.model.blob import blob_property, discard_blobs
 
 log_ = logging.getLogger(logger_name(__name__))
 
+# payloads of a run that can be stored in the blob storage
+BLOB_FIELDS = ('input', 'result', 'log')
+
+# keys in `Session.info` to pass changes in runs between the flush events
+RUN_CHANGES_KEY = 'vantage6_run_changes'
+UPDATED_TASKS_KEY = 'vantage6_updated_tasks'
+
 
 class Run(Base):
     """
@@ -26,10 +42,15 @@ class Run(Base):
     The input and result fields will be encrypted and can be only read by the
     intended receiver of the message.
 
+    The input, result and log are stored in the blob storage instead of the
+    database if they are large and a blob storage is configured, see
+    :func:`~.model.blob.blob_property`.
+
     Attributes
     ----------
     input : str
-        Input data of the task
+        Input data of the task. If the task has a shared input, this only
+        contains the encrypted key of the shared input.
     task_id : int
         Id of the task that was executed
     organization_id : int
@@ -54,16 +75,40 @@ class Run(Base):
         List of ports that are part of this result
     """
 
+    __table_args__ = (
+        # the runs of a task, possibly for a single organization
+        Index('ix_run_task_id_organization_id', 'task_id', 'organization_id'),
+        # the (open) runs of an organization, e.g. when a node starts
+        Index('ix_run_organization_id_finished_at', 'organization_id',
+              'finished_at'),
+    )
+
     # fields
-    input = Column(Text)
+    _input = Column("input", Text)
     task_id = Column(Integer, ForeignKey("task.id"))
     organization_id = Column(Integer, ForeignKey("organization.id"))
-    result = Column(Text)
+    _result = deferred(Column("result", Text))
     assigned_at = Column(DateTime, default=datetime.datetime.utcnow)
     started_at = Column(DateTime)
     finished_at = Column(DateTime)
-    status = Column(Text)
-    log = Column(Text)
+    # the previous status is needed to update the run counts of the task
+    status = column_property(Column(Text), active_history=True)
+    _log = Column("log", Text)
+
+    # references to payloads in the blob storage
+    input_ref = Column(Text)
+    input_size = Column(Integer)
+    input_checksum = Column(Text)
+    result_ref = Column(Text)
+    result_size = Column(Integer)
+    result_checksum = Column(Text)
+    log_ref = Column(Text)
+    log_size = Column(Integer)
+    log_checksum = Column(Text)
+
+    input = synonym("_input", descriptor=blob_property("input"))
+    result = synonym("_result", descriptor=blob_property("result"))
+    log = synonym("_log", descriptor=blob_property("log"))
 
     # relationships
     task = relationship("Task", back_populates="runs")
@@ -105,6 +150,42 @@ class Run(Base):
             raise
         return node
 
+    @property
+    def full_input(self) -> str | None:
+        """
+        Returns the input of this run as it should be sent to the node.
+
+        If the task has a shared input, the encrypted key of this run is
+        combined with it, which results in the same format as input that was
+        encrypted for this run alone.
+
+        Returns
+        -------
+        str | None
+            The (encrypted) input of this run
+        """
+        if self.task is None or self.task.shared_input is None:
+            return self.input
+        return CryptorBase.join_envelope(self.input, self.task.shared_input)
+
+    @property
+    def full_input_size(self) -> int:
+        """
+        Returns the size of the input of this run as it should be sent to the
+        node, without loading it from the blob storage.
+
+        Returns
+        -------
+        int
+            Approximate number of bytes of the (encrypted) input
+        """
+        size = self.input_size if self.input_ref else len(self._input or '')
+        task = self.task
+        if task is not None:
+            size += task.shared_input_size if task.shared_input_ref \
+                else len(task._shared_input or '')
+        return size
+
     def __repr__(self) -> str:
         """
         Returns a string representation of the result.
@@ -122,3 +203,80 @@ class Run(Base):
             f"status: {self.status}"
             ">"
         )
+
+
+@event.listens_for(Run, "after_delete")
+def delete_blobs(mapper, connection, run: Run) -> None:
+    """
+    Delete the payloads of a run from the blob storage once the deletion of
+    the run is committed.
+    """
+    discard_blobs(run, BLOB_FIELDS)
+
+
+@event.listens_for(Session, "before_flush")
+def collect_run_changes(session: Session, flush_context, instances) -> None:
+    """
+    Collect how the number of runs per status changes for each task in this
+    flush. The tasks are updated accordingly in :func:`update_tasks`.
+    """
+    changes = {}
+
+    def add(run: Run, status: str | None, delta: int) -> None:
+        # the task of a new run may not have an id yet
+        task = run.task_id if run.task_id is not None else run.task
+        if task is None:
+            return
+        counts, finished_at = changes.get(task, (Counter(), None))
+        counts[Task.run_count_column(status)] += delta
+        if run.finished_at and (not finished_at or
+                                run.finished_at > finished_at):
+            finished_at = run.finished_at
+        changes[task] = (counts, finished_at)
+
+    for run in session.new:
+        if isinstance(run, Run):
+            add(run, run.status, 1)
+    for run in session.dirty:
+        if isinstance(run, Run):
+            history = inspect(run).attrs.status.history
+            if history.added:
+                add(run, history.deleted[0] if history.deleted else None, -1)
+                add(run, history.added[0], 1)
+    for run in session.deleted:
+        if isinstance(run, Run):
+            add(run, run.status, -1)
+
+    session.info[RUN_CHANGES_KEY] = changes
+
+
+@event.listens_for(Session, "after_flush")
+def update_tasks(session: Session, flush_context) -> None:
+    """
+    Update the run counts, status and finish time of the tasks of which runs
+    have been changed, in the same transaction as the runs themselves.
+    """
+    updated = set()
+    for task, (counts, finished_at) in \
+            session.info.pop(RUN_CHANGES_KEY, {}).items():
+        task_id = task if isinstance(task, int) else task.id
+        deltas = {column: delta for column, delta in counts.items() if delta}
+        if task_id is None or not deltas:
+            continue
+        Task.update_aggregates(
+            session.connection(), deltas, finished_at, task_id
+        )
+        updated.add(task_id)
+    session.info[UPDATED_TASKS_KEY] = updated
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def expire_tasks(session: Session, flush_context) -> None:
+    """
+    Expire the aggregated columns of updated tasks, so that they are reloaded
+    from the database.
+    """
+    for task_id in session.info.pop(UPDATED_TASKS_KEY, ()):
+        task = session.identity_map.get(identity_key(Task, task_id))
+        if task is not None:
+            session.expire(task, AGGREGATE_COLUMNS)
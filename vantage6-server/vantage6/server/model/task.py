@@ -1,11 +1,27 @@
 import datetime
 
-from sqlalchemy import Column, String, ForeignKey, Integer, sql, DateTime
-from sqlalchemy.orm import relationship
-from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy import (
+    Column, String, ForeignKey, Integer, sql, DateTime, Text, event
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import relationship, deferred, synonym
+from sqlalchemy.sql.expression import ColumnElement
 
 from vantage6.common.task_status import TaskStatus, has_task_failed
-from vantage6.server.model.base import Base, DatabaseSessionManager
+from vantage6.server.model.base import Base
+from vantage6.server.model.blob import blob_property, discard_blobs
+from vantage6.server.model.counter import Counter
+
+# columns of a task that count its runs per status. All statuses that indicate
+# a failure are counted as 'failed'.
+RUN_COUNT_COLUMNS = tuple(
+    f"runs_{status.value}" for status in (
+        TaskStatus.PENDING, TaskStatus.INITIALIZING, TaskStatus.ACTIVE,
+        TaskStatus.COMPLETED, TaskStatus.FAILED
+    )
+)
+# columns of a task that are derived from its runs
+AGGREGATE_COLUMNS = RUN_COUNT_COLUMNS + ('status', 'finished_at')
 
 
 class Task(Base):
@@ -15,7 +31,10 @@ class Task(Base):
     A Task can create algorithm Runs for multiple organizations. The input
     of the task is different for each organization (due to the encryption).
     Therefore the input for the task is encrypted for each organization
-    separately. The task originates from an organization to which the Runs
+    separately. If the same input is sent to all organizations, it is
+    encrypted only once and stored in `shared_input`: the Runs then only
+    contain the key that the shared input is encrypted with. The task
+    originates from an organization to which the Runs
     need to be encrypted, therefore the originating organization is also logged
 
     Attributes
@@ -38,6 +57,19 @@ class Task(Base):
         Id of the organization that created this task
     init_user_id : int
         Id of the user that created this task
+    shared_input : str
+        Encrypted input that is shared by all runs of this task (if any). It
+        is stored in the blob storage instead of the database if it is large
+        and a blob storage is configured, see
+        :func:`~.model.blob.blob_property`.
+    status : str
+        Status of the task, derived from the statuses of its runs
+    finished_at : datetime.datetime
+        Time at which the last run of the task finished, None if some of the
+        runs have not finished yet
+    runs_pending, runs_initializing, runs_active, runs_completed, runs_failed
+        Number of runs of the task with each status. All statuses that
+        indicate a failure are counted in `runs_failed`.
 
     collaboration : :class:`~.model.collaboration.Collaboration`
         Collaboration that this task belongs to
@@ -55,12 +87,35 @@ class Task(Base):
     name = Column(String)
     description = Column(String)
     image = Column(String)
-    collaboration_id = Column(Integer, ForeignKey("collaboration.id"))
-    job_id = Column(Integer)
-    parent_id = Column(Integer, ForeignKey("task.id"))
+    collaboration_id = Column(Integer, ForeignKey("collaboration.id"),
+                              index=True)
+    job_id = Column(Integer, index=True)
+    parent_id = Column(Integer, ForeignKey("task.id"), index=True)
     init_org_id = Column(Integer, ForeignKey("organization.id"))
     init_user_id = Column(Integer, ForeignKey("user.id"))
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # only loaded when needed, as it may be large
+    _shared_input = deferred(Column("shared_input", Text))
+    # reference to the shared input in the blob storage
+    shared_input_ref = Column(Text)
+    shared_input_size = Column(Integer)
+    shared_input_checksum = Column(Text)
+
+    shared_input = synonym(
+        "_shared_input", descriptor=blob_property("shared_input")
+    )
+
+    # aggregated from the runs of the task. These columns are kept up to date
+    # in the same transaction in which the runs are changed, so that tasks
+    # can be filtered and sorted on them without loading all their runs. A
+    # task without runs is considered completed.
+    status = Column(String, index=True, default=TaskStatus.COMPLETED.value)
+    finished_at = Column(DateTime)
+    runs_pending = Column(Integer, default=0)
+    runs_initializing = Column(Integer, default=0)
+    runs_active = Column(Integer, default=0)
+    runs_completed = Column(Integer, default=0)
+    runs_failed = Column(Integer, default=0)
 
     # relationships
     collaboration = relationship("Collaboration", back_populates="tasks")
@@ -74,62 +129,173 @@ class Task(Base):
     init_user = relationship("User", back_populates="created_tasks")
     databases = relationship("TaskDatabase", back_populates="task")
 
-    # TODO update in v4+, with renaming to 'run'
-    @hybrid_property
-    def finished_at(self) -> datetime.datetime | None:
+    @staticmethod
+    def run_count_column(status: TaskStatus | str | None) -> str:
         """
-        Determine the time at which a task was completed. This is the time at
-        which the last algorithm run was completed.
+        Get the column that counts the runs of a task with a certain status.
+
+        Parameters
+        ----------
+        status : TaskStatus | str | None
+            Status of the run. All statuses that indicate a failure are
+            counted in the same column.
 
         Returns
         -------
-        datetime.datetime | None
-            Time at which task was completed, None if task is not completed
+        str
+            Name of the column
         """
-        return max([r.finished_at for r in self.results]) \
-            if self.complete and self.results else None
+        if has_task_failed(status):
+            return f"runs_{TaskStatus.FAILED.value}"
+        return f"runs_{TaskStatus(status).value}"
 
-    @hybrid_property
-    def status(self) -> str:
+    @classmethod
+    def aggregate_values(cls, counts: dict[str, ColumnElement],
+                         finished_at: ColumnElement) -> dict:
         """
-        Returns the status of a task, which is derived from the statuses of
-        the underlying algorithm runs.
+        Get the values of the aggregated columns of a task from the number of
+        runs per status.
+
+        Parameters
+        ----------
+        counts : dict[str, ColumnElement]
+            SQL expression for the number of runs of the task for each of the
+            columns in `RUN_COUNT_COLUMNS`
+        finished_at : ColumnElement
+            SQL expression for the time at which the task finished, used if
+            none of the runs is still open
 
         Returns
         -------
-        str
-            Status of task
+        dict
+            Values to update the aggregated columns of the task with
+        """
+        # the status of the task is that of its 'least advanced' run, with
+        # the exception that a single failed run marks the whole task failed
+        status = sql.case(
+            *[
+                (counts[cls.run_count_column(run_status)] > 0,
+                 run_status.value)
+                for run_status in (TaskStatus.FAILED, TaskStatus.ACTIVE,
+                               TaskStatus.INITIALIZING, TaskStatus.PENDING)
+            ],
+            else_=TaskStatus.COMPLETED.value
+        )
+        open_runs = sum(
+            counts[cls.run_count_column(status)]
+            for status in (TaskStatus.PENDING, TaskStatus.INITIALIZING,
+                           TaskStatus.ACTIVE)
+        )
+        return {
+            **counts,
+            'status': status,
+            'finished_at': sql.case((open_runs > 0, None), else_=finished_at),
+        }
+
+    @classmethod
+    def update_aggregates(cls, connection: Connection,
+                          deltas: dict[str, int],
+                          finished_at: datetime.datetime | None,
+                          id_: int) -> None:
+        """
+        Update the aggregated columns of a task after its runs have changed.
+
+        The counts are incremented in SQL, so that concurrent updates of runs
+        of the same task do not overwrite each other.
+
+        Parameters
+        ----------
+        connection : Connection
+            Connection of the transaction in which the runs were changed
+        deltas : dict[str, int]
+            Change in the number of runs for (some of) the columns in
+            `RUN_COUNT_COLUMNS`
+        finished_at : datetime.datetime | None
+            Latest time at which one of the changed runs finished
+        id_ : int
+            Id of the task
         """
-        # TODO what if there are no result ids? -> currently returns unknown
-        run_statuses = [r.status for r in self.runs]
-        if any([has_task_failed(status) for status in run_statuses]):
-            return TaskStatus.FAILED.value
-        elif TaskStatus.ACTIVE in run_statuses:
-            return TaskStatus.ACTIVE.value
-        elif TaskStatus.INITIALIZING in run_statuses:
-            return TaskStatus.INITIALIZING.value
-        elif TaskStatus.PENDING in run_statuses:
-            return TaskStatus.PENDING.value
-        else:
-            return TaskStatus.COMPLETED.value
+        table = cls.__table__
+        counts = {
+            column: sql.func.coalesce(table.c[column], 0)
+            + deltas.get(column, 0)
+            for column in RUN_COUNT_COLUMNS
+        }
+        finished_at = sql.func.coalesce(
+            sql.literal(finished_at, DateTime),
+            table.c.finished_at,
+            sql.literal(datetime.datetime.utcnow(), DateTime)
+        )
+        connection.execute(
+            table.update()
+            .where(table.c.id == id_)
+            .values(cls.aggregate_values(counts, finished_at))
+        )
+
+    @classmethod
+    def fill_new_columns(cls, connection: Connection,
+                         column_names: list[str]) -> None:
+        """
+        Compute the aggregated columns of all tasks from their runs, when
+        these columns have been added to an existing database.
+
+        Parameters
+        ----------
+        connection : Connection
+            Connection to the database
+        column_names : list[str]
+            Names of the columns that have been added
+        """
+        if not set(AGGREGATE_COLUMNS) & set(column_names):
+            return
+        table = cls.__table__
+        runs = cls.metadata.tables['run']
+        in_task = runs.c.task_id == table.c.id
+
+        def count(*conditions) -> ColumnElement:
+            return sql.select(sql.func.count()).where(in_task, *conditions)\
+                .scalar_subquery()
+
+        counted = [s.value for s in (TaskStatus.PENDING,
+                                     TaskStatus.INITIALIZING,
+                                     TaskStatus.ACTIVE,
+                                     TaskStatus.COMPLETED)]
+        counts = {
+            cls.run_count_column(status): count(runs.c.status == status)
+            for status in counted
+        }
+        counts[cls.run_count_column(TaskStatus.FAILED)] = count(sql.or_(
+            runs.c.status.is_(None), runs.c.status.notin_(counted)
+        ))
+        connection.execute(table.update().values(counts))
+
+        # the counts are now available to determine the status
+        last_finished = sql.select(sql.func.max(runs.c.finished_at))\
+            .where(in_task).scalar_subquery()
+        values = cls.aggregate_values(
+            {column: table.c[column] for column in RUN_COUNT_COLUMNS},
+            last_finished
+        )
+        connection.execute(table.update().values(values))
 
     @classmethod
     def next_job_id(cls) -> int:
         """
-        Get the next available run id for a new task.
+        Allocate the job id for a new task. Job ids are allocated from a
+        counter, so that tasks that are created at the same time never get
+        the same job id.
 
         Returns
         -------
         int
-            Next available run id
+            Next available job id
         """
-        session = DatabaseSessionManager.get_session()
-        max_job_id = session.query(sql.func.max(cls.job_id)).scalar()
-        session.commit()
-        if max_job_id:
-            return max_job_id + 1
-        else:
-            return 1
+        return Counter.next_value(
+            'job_id',
+            start=lambda connection: connection.execute(
+                sql.select(sql.func.max(cls.__table__.c.job_id))
+            ).scalar()
+        )
 
     def __repr__(self) -> str:
         """
@@ -146,3 +312,12 @@ class Task(Base):
             f"collaboration:{self.collaboration.name}"
             ">"
         )
+
+
+@event.listens_for(Task, "after_delete")
+def delete_blobs(mapper, connection, task: Task) -> None:
+    """
+    Delete the shared input of a task from the blob storage once the deletion
+    of the task is committed.
+    """
+    discard_blobs(task, ('shared_input',))
@@ -1,25 +1,35 @@
 import logging
 import importlib
+import threading
+import time
 
 from collections import namedtuple
+from typing import Callable, Iterable
 from flask_principal import Permission, PermissionDenied
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
 
-from vantage6.server.globals import RESOURCES
+from vantage6.server.globals import RESOURCES, PERMISSION_CACHE_TTL
 from vantage6.server.default_roles import DefaultRole
 from vantage6.server.model.base import Base
 from vantage6.server.model.role import Role
 from vantage6.server.model.rule import Rule, Operation, Scope
+from vantage6.server.model.user import User
 from vantage6.server.model.base import DatabaseSessionManager
 from vantage6.server.utils import (
     obtain_auth_collaborations, obtain_auth_organization
 )
-from vantage6.common import logger_name
+from vantage6.common import logger_name, Singleton
 
 module_name = logger_name(__name__)
 log = logging.getLogger(module_name)
 
 RuleNeed = namedtuple("RuleNeed", ["name", "scope", "operation"])
 
+# key in `Session.info` to pass the identities whose permissions changed in a
+# flush to the commit
+CHANGED_PERMISSIONS_KEY = 'vantage6_changed_permissions'
+
 
 # TODO BvB 2023-07-27 this utility is a bit superfluous with the definition
 # of the operation and scope enums. We should remove it but then add longer
@@ -297,6 +307,118 @@ class RuleCollection(dict):
             raise ValueError(f"Unknown scope '{minimal_scope}'")
 
 
+class PermissionCache(metaclass=Singleton):
+    """
+    Cache of the rules that users and fixed roles (the node and container
+    roles) have, so that they do not have to be loaded from the database on
+    every request.
+
+    Entries are invalidated when the roles or rules they depend on change in
+    this process. Entries also expire after `PERMISSION_CACHE_TTL` seconds,
+    which limits how long changes made by other server instances go
+    unnoticed.
+    """
+
+    def __init__(self) -> None:
+        self._needs = {}
+        self._lock = threading.Lock()
+        # incremented on every invalidation, so that rules that were loaded
+        # before an invalidation are not stored afterwards
+        self._generation = 0
+
+    def get(self, key: tuple,
+            load: Callable[[], Iterable[Rule]]) -> frozenset[RuleNeed]:
+        """
+        Get the rules of an identity or fixed role.
+
+        Parameters
+        ----------
+        key : tuple
+            Key of the identity, ('user', <id>), or of the fixed role,
+            ('role', <name>)
+        load : Callable[[], Iterable[Rule]]
+            Function that loads the rules from the database if they are not
+            in the cache
+
+        Returns
+        -------
+        frozenset[RuleNeed]
+            The rules
+        """
+        with self._lock:
+            entry = self._needs.get(key)
+            generation = self._generation
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+
+        needs = frozenset(
+            RuleNeed(name=rule.name, scope=rule.scope,
+                     operation=rule.operation)
+            for rule in load()
+        )
+        with self._lock:
+            if generation == self._generation:
+                self._needs[key] = (needs, time.monotonic() +
+                                    PERMISSION_CACHE_TTL)
+        return needs
+
+    def invalidate(self, key: tuple | None = None) -> None:
+        """
+        Remove an entry from the cache.
+
+        Parameters
+        ----------
+        key : tuple | None
+            Key of the entry. If None, all entries are removed.
+        """
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._needs.clear()
+            else:
+                self._needs.pop(key, None)
+
+
+@event.listens_for(Session, "after_flush")
+def collect_permission_changes(session: Session, flush_context) -> None:
+    """
+    Collect the identities of which the permissions are changed in a flush.
+    A change of a role or rule may affect all identities, which is marked by
+    None.
+    """
+    changed = session.info.setdefault(CHANGED_PERMISSIONS_KEY, set())
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, (Role, Rule)):
+            changed.add(None)
+        elif isinstance(obj, User):
+            state = inspect(obj)
+            if obj in session.deleted or \
+                    state.attrs.roles.history.has_changes() or \
+                    state.attrs.rules.history.has_changes():
+                changed.add(('user', obj.id))
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_permissions(session: Session) -> None:
+    """
+    Remove the permissions that have been changed from the cache, once the
+    changes are committed.
+    """
+    changed = session.info.pop(CHANGED_PERMISSIONS_KEY, set())
+    cache = PermissionCache()
+    if None in changed:
+        cache.invalidate()
+    else:
+        for key in changed:
+            cache.invalidate(key)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def discard_permission_changes(session: Session, previous_transaction) -> None:
+    """Forget the permission changes of a transaction that is rolled back."""
+    session.info.pop(CHANGED_PERMISSIONS_KEY, None)
+
+
 class PermissionManager:
     """
     Loads the permissions and syncs rules in database with rules defined in
@@ -5,8 +5,9 @@ import logging
 
 from functools import wraps
 
-from flask import g, request
+from flask import g, request, Response
 from flask_restful import Resource, Api
+from flask_restful.utils import unpack
 from flask_mail import Mail
 from flask_jwt_extended import (
     get_jwt, get_jwt_identity, jwt_required
@@ -23,6 +24,10 @@ from vantage6.server.model.authenticatable import Authenticatable
 from vantage6.server.resource.common.output_schema import HATEOASModelSchema
 from vantage6.server.permission import PermissionManager
 from vantage6.server.resource.common.pagination import Page
+from vantage6.server.last_seen import LastSeenBuffer
+from vantage6.server.response_cache import (
+    CachedResponse, ResponseCache, table_names
+)
 
 log = logging.getLogger(logger_name(__name__))
 
@@ -78,6 +83,20 @@ class ServicesResources(Resource):
             for val in item.split(',')
         ]
 
+    @staticmethod
+    def links_payloads() -> bool:
+        """
+        Check whether the request asks to replace large payloads of runs by
+        links (`link_payloads=true`). Older clients do not ask for this, and
+        get the payloads themselves.
+
+        Returns
+        -------
+        bool
+            True if large payloads should be replaced by links
+        """
+        return request.args.get('link_payloads', '').lower() in ('true', '1')
+
     def dump(self, page: Page, schema: HATEOASModelSchema) -> dict:
         """
         Dump based on the request context (to paginate or not)
@@ -96,9 +115,11 @@ class ServicesResources(Resource):
         """
         return schema.meta_dump(page)
 
-    def response(self, page: Page, schema: HATEOASModelSchema):
+    def response(self, page: Page, schema: HATEOASModelSchema) -> Response:
         """
-        Prepare a valid HTTP OK response from a page object
+        Prepare a valid HTTP OK response from a page object. The items of the
+        page are encoded in chunks, see
+        :meth:`~vantage6.server.resource.common.output_schema.HATEOASModelSchema.meta_encode`.
 
         Parameters
         ----------
@@ -109,10 +130,11 @@ class ServicesResources(Resource):
 
         Returns
         -------
-        tuple
-            Tuple of (dumped page, HTTPStatus.OK, headers of the page)
+        Response
+            Response with the encoded page and the headers of the page
         """
-        return self.dump(page, schema), HTTPStatus.OK, page.headers
+        return Response(schema.meta_encode(page), HTTPStatus.OK,
+                        headers=page.headers, mimetype='application/json')
 
     @staticmethod
     def obtain_auth() -> db.Authenticatable | dict:
@@ -245,7 +267,9 @@ def only_for(types: tuple[str] = ('user', 'node', 'container')) -> callable:
 
 def get_and_update_authenticatable_info(auth_id: int) -> db.Authenticatable:
     """
-    Get user or node from ID and update last time seen online.
+    Get user or node from ID and update last time seen online. The time is
+    buffered and written to the database in bulk, see
+    :class:`~vantage6.server.last_seen.LastSeenBuffer`.
 
     Parameters
     ----------
@@ -258,8 +282,7 @@ def get_and_update_authenticatable_info(auth_id: int) -> db.Authenticatable:
         User or node database model
     """
     auth = db.Authenticatable.get(auth_id)
-    auth.last_seen = datetime.datetime.utcnow()
-    auth.save()
+    LastSeenBuffer().touch(auth.id)
     return auth
 
 
@@ -269,6 +292,86 @@ with_user = only_for(("user",))
 with_node = only_for(("node",))
 with_container = only_for(("container",))
 
+# tables that determine what an identity is allowed to see. All cached
+# responses depend on these.
+PERMISSION_TABLES = (
+    db.User.__table__, db.Node.__table__, db.Role, db.Rule, db.Member,
+    db.Permission, db.UserPermission, db.role_rule_association
+)
+
+
+def cached_response(*sources) -> callable:
+    """
+    Decorator that caches the responses of a GET endpoint per request
+    arguments and identity, see :mod:`vantage6.server.response_cache`. It
+    must be applied after the endpoint protection decorator (e.g.
+    :func:`only_for`), so that the identity is known.
+
+    Parameters
+    ----------
+    *sources : type | Table
+        Models and association tables that the response depends on. The
+        tables that determine the permissions of the identity are added
+        automatically.
+
+    Returns
+    -------
+    function
+        Decorator function that can be used to cache responses
+    """
+    tables = table_names(sources + PERMISSION_TABLES)
+
+    def cache_decorator(fn):
+        @wraps(fn)
+        def decorator(self, *args, **kwargs):
+            cache = ResponseCache()
+            if not cache.enabled:
+                return fn(self, *args, **kwargs)
+
+            key = (
+                request.endpoint,
+                tuple(sorted(kwargs.items())),
+                tuple(sorted(request.args.items(multi=True))),
+                identity_scope(),
+            )
+            # the versions are obtained before the response is created, so
+            # that changes made in the meantime invalidate the response
+            versions = cache.versions(tables)
+            cached = cache.get(key, versions)
+            if cached is None:
+                response = fn(self, *args, **kwargs)
+                if not isinstance(response, Response):
+                    response = self.api.make_response(*unpack(response))
+                if response.status_code != HTTPStatus.OK:
+                    return response
+                cached = CachedResponse.from_response(
+                    response, versions, cache.ttl
+                )
+                cache.put(key, tables, cached)
+
+            # answers with '304 Not Modified' if the client sent the ETag
+            return cached.to_response().make_conditional(request)
+        return decorator
+    return cache_decorator
+
+
+def identity_scope() -> tuple:
+    """
+    Get the identity that makes the request, which determines what it is
+    allowed to see.
+
+    Returns
+    -------
+    tuple
+        Type and id of the user or node. For an algorithm container, the id
+        of its node and task.
+    """
+    if g.user:
+        return ('user', g.user.id)
+    if g.node:
+        return ('node', g.node.id)
+    return ('container', g.container['node_id'], g.container['task_id'])
+
 
 def parse_datetime(dt: str = None, default: datetime = None) -> datetime:
     """
@@ -24,6 +24,7 @@ from vantage6.server.resource.common.output_schema import (
     NodeSchemaSimple
 )
 from vantage6.server.resource import (
+    cached_response,
     with_user,
     only_for,
     ServicesResources
@@ -140,6 +141,7 @@ class CollaborationBase(ServicesResources):
 class Collaborations(CollaborationBase):
 
     @only_for(['user', 'node'])
+    @cached_response(db.Collaboration)
     def get(self):
         """Returns a list of collaborations
         ---
@@ -246,7 +248,9 @@ class Collaborations(CollaborationBase):
 
         # paginate the results
         try:
-            page = Pagination.from_query(q, request)
+            page = Pagination.from_query(
+                q, request, schema=collaboration_schema
+            )
         except ValueError as e:
             return {'msg': str(e)}, HTTPStatus.BAD_REQUEST
 
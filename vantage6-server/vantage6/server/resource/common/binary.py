@@ -0,0 +1,108 @@
+"""
+Helpers to transfer (encrypted) inputs and results in binary format.
+
+Inputs and results are stored as base64 encoded strings, which is also how
+they are sent in JSON bodies. The binary format leaves out the base64
+encoding of the (encrypted) message, which makes large payloads a third
+smaller and avoids parsing them as JSON. The conversion between both formats
+is done in chunks, and uploads are spooled to a temporary file rather than
+being held in memory as a whole.
+"""
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Iterator
+
+import flask
+
+from vantage6.common.encryption import (
+    STREAM_CHUNK_SIZE,
+    base64_to_binary_chunks,
+    binary_to_base64_chunks,
+    iter_chunks
+)
+from vantage6.common.globals import RESULT_SPOOL_MAX_SIZE
+
+BINARY_MIMETYPE = 'application/octet-stream'
+
+
+def spool_binary_as_text(stream: BinaryIO, encrypted: bool,
+                         header_fields: int = 2) -> SpooledTemporaryFile:
+    """
+    Read data in binary format and convert it to the stored string format.
+
+    The converted data is written to a temporary file, that is only kept in
+    memory while it is small. The caller should close it.
+
+    Parameters
+    ----------
+    stream : BinaryIO
+        File-like object with the data in binary format
+    encrypted : bool
+        Whether the data is encrypted
+    header_fields : int
+        Number of header fields of encrypted data: 2 for the `key$iv$` of
+        inputs and results, 1 for the `iv$` of a shared input
+
+    Returns
+    -------
+    SpooledTemporaryFile
+        File with the data as base64 encoded string, positioned at the start
+
+    Raises
+    ------
+    ValueError
+        If encrypted data does not start with an encrypted key and iv
+    """
+    spooled = SpooledTemporaryFile(max_size=RESULT_SPOOL_MAX_SIZE)
+    try:
+        for chunk in binary_to_base64_chunks(iter_chunks(stream), encrypted,
+                                             header_fields):
+            spooled.write(chunk)
+    except Exception:
+        spooled.close()
+        raise
+    spooled.seek(0)
+    return spooled
+
+
+def iter_text_as_binary(text: str, encrypted: bool) -> Iterator[bytes]:
+    """
+    Convert data in the stored string format to binary format, in chunks.
+
+    Parameters
+    ----------
+    text : str
+        The data as base64 encoded string
+    encrypted : bool
+        Whether the data is encrypted
+
+    Returns
+    -------
+    Iterator[bytes]
+        Chunks of the data in binary format
+    """
+    text_chunks = (
+        text[i:i + STREAM_CHUNK_SIZE].encode()
+        for i in range(0, len(text), STREAM_CHUNK_SIZE)
+    )
+    return base64_to_binary_chunks(text_chunks, encrypted)
+
+
+def binary_response(text: str, encrypted: bool) -> flask.Response:
+    """
+    Create a streamed response that contains data in binary format.
+
+    Parameters
+    ----------
+    text : str
+        The data as base64 encoded string
+    encrypted : bool
+        Whether the data is encrypted
+
+    Returns
+    -------
+    flask.Response
+        Response with the data as `application/octet-stream`
+    """
+    return flask.Response(
+        iter_text_as_binary(text, encrypted), mimetype=BINARY_MIMETYPE
+    )
@@ -347,6 +347,7 @@ class TaskInputSchema(_NameValidationSchema):
     image = fields.String(required=True, validate=Length(min=1))
     collaboration_id = fields.Integer(required=True, validate=Range(min=1))
     organizations = fields.List(fields.Dict(), required=True)
+    shared_input = fields.String()
     databases = fields.List(fields.Dict(), allow_none=True)
 
     @validates('organizations')
@@ -407,7 +408,24 @@ class TaskInputSchema(_NameValidationSchema):
                             f"Database preprocessing {prepro} is missing a "
                             "'function'"
                         )
-            allowed_keys = {'label', 'preprocessing', 'query', 'sheet_name'}
+            if 'columns' in database:
+                if not isinstance(database['columns'], list) or not all(
+                    isinstance(column, str) for column in database['columns']
+                ):
+                    raise ValidationError(
+                        'Database columns must be a list of column names'
+                    )
+            if 'filters' in database:
+                if not isinstance(database['filters'], list) or not all(
+                    isinstance(filter_, list) and len(filter_) == 3
+                    for filter_ in database['filters']
+                ):
+                    raise ValidationError(
+                        'Database filters must be a list of [column, '
+                        'operator, value] lists'
+                    )
+            allowed_keys = {'label', 'preprocessing', 'query', 'sheet_name',
+                            'columns', 'filters'}
             if not set(database.keys()).issubset(set(allowed_keys)):
                 raise ValidationError(
                     f"Database {database} contains unknown keys. Allowed keys "
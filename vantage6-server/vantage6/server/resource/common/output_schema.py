@@ -1,19 +1,36 @@
 # -*- coding: utf-8 -*-
+import functools
 import logging
 import base64
 
-from marshmallow import fields
+import sqlalchemy as sa
+
+from marshmallow import fields, pre_dump
+from sqlalchemy.orm import selectinload, undefer
+from sqlalchemy.orm.interfaces import MANYTOONE
 from marshmallow_sqlalchemy import SQLAlchemyAutoSchema
 from flask import url_for
 
 from vantage6.server import db
 from vantage6.common import logger_name
-from vantage6.common.globals import STRING_ENCODING
+from vantage6.common.globals import STRING_ENCODING, BINARY_TRANSFER_MIN_SIZE
 from vantage6.server.model import Base, User
+from vantage6.server.model.base import DatabaseSessionManager
+from vantage6.server.encoding import dumps
+from vantage6.server.globals import PAGE_ENCODING_CHUNK_SIZE
+from vantage6.server.model.blob import blob_columns, is_in_blob_storage
+from vantage6.server.model.run import BLOB_FIELDS
 from vantage6.server.resource.common.pagination import Pagination
 
 log = logging.getLogger(logger_name(__name__))
 
+# columns of a run in which its payloads, or the references to them in the
+# blob storage, are stored. The payloads are serialized through their
+# properties instead.
+RUN_BLOB_COLUMNS = tuple(
+    column for name in BLOB_FIELDS for column in blob_columns(name)
+)
+
 
 def create_one_to_many_link(obj: Base, link_to: str, link_from: str) -> str:
     """
@@ -43,12 +60,48 @@ def create_one_to_many_link(obj: Base, link_to: str, link_from: str) -> str:
     return url_for(endpoint, **values)
 
 
+@functools.cache
+def _foreign_key_attribute(model: type[Base], name: str) -> str | None:
+    """
+    Get the attribute that holds the foreign key of a many-to-one relationship.
+
+    Parameters
+    ----------
+    model : type[Base]
+        SQLAlchemy model that has the relationship
+    name : str
+        Name of the relationship
+
+    Returns
+    -------
+    str | None
+        Name of the foreign key attribute, or None if `name` is not a
+        many-to-one relationship on a single column
+    """
+    mapper = sa.inspect(model)
+    relation = mapper.relationships.get(name)
+    if relation is None or relation.direction is not MANYTOONE or \
+            len(relation.local_columns) != 1:
+        return None
+    column, = relation.local_columns
+    return mapper.get_property_by_column(column).key
+
+
 class HATEOASModelSchema(SQLAlchemyAutoSchema):
     """
     This class is used to convert foreign-key fields to HATEOAS specification.
+
+    Attributes
+    ----------
+    eager_load : tuple
+        SQLAlchemy loader options that load the relationships that are used
+        by the schema, so that serializing a list of resources does not
+        require a query per resource. These are applied by
+        :meth:`Pagination.from_query`.
     """
 
     api = None
+    eager_load = ()
 
     def __init__(self, *args, **kwargs) -> None:
 
@@ -79,6 +132,10 @@ class HATEOASModelSchema(SQLAlchemyAutoSchema):
         """
         Create a HATEOAS link to a related object.
 
+        For many-to-one relationships, the id of the related object is read
+        from the foreign key column, so that the related object does not have
+        to be loaded from the database.
+
         Parameters
         ----------
         name : str
@@ -96,35 +153,37 @@ class HATEOASModelSchema(SQLAlchemyAutoSchema):
             HATEOAS link to the related object, or None if the related object
             does not exist.
         """
-        # get the related object
-        elem = getattr(obj, name)
+        endpoint = endpoint if endpoint else name
+
+        foreign_key = _foreign_key_attribute(type(obj), name)
+        if foreign_key:
+            id_ = getattr(obj, foreign_key)
+        else:
+            elem = getattr(obj, name)
+            id_ = elem.id if elem else None
 
         # create the link
-        endpoint = endpoint if endpoint else name
-        if elem:
-            return self._hateoas_link_from_related_resource(elem, endpoint)
+        if id_ is not None:
+            return self._hateoas_link(id_, endpoint)
         else:
             return None
 
-    def _hateoas_link_from_related_resource(
-        self, elem: Base, name: str
-    ) -> dict:
+    def _hateoas_link(self, id_: int, name: str) -> dict:
         """
-        Construct a HATEOAS link from a related object.
+        Construct a HATEOAS link to a resource.
 
         Parameters
         ----------
-        elem : Base
-            SQLAlchemy resource for which the link is created
+        id_ : int
+            Id of the resource to which the link is created
         name : str
             Name of the resource
 
         Returns
         -------
         dict
-            HATEOAS link to the related object
+            HATEOAS link to the resource
         """
-        _id = elem.id
         endpoint = name + "_with_id"
         if self.api:
             if not self.api.owns_endpoint(endpoint):
@@ -135,8 +194,8 @@ class HATEOASModelSchema(SQLAlchemyAutoSchema):
             )
             verbs.remove("HEAD")
             verbs.remove("OPTIONS")
-            url = url_for(endpoint, id=_id)
-            return {"id": _id, "link": url, "methods": verbs}
+            url = url_for(endpoint, id=id_)
+            return {"id": id_, "link": url, "methods": verbs}
         else:
             log.error("No API found?")
 
@@ -159,14 +218,50 @@ class HATEOASModelSchema(SQLAlchemyAutoSchema):
         data = self.dump(pagination.page.items, many=True)
         return {'data': data, 'links': pagination.metadata_links}
 
+    def meta_encode(self, pagination: Pagination) -> list[bytes]:
+        """
+        Serialize and encode paginated database resources as JSON, in the
+        same structure as :meth:`meta_dump`.
+
+        The resources are serialized and encoded in chunks of
+        `PAGE_ENCODING_CHUNK_SIZE` items, so that the serialized form of
+        only one chunk is kept in memory at a time.
+
+        Parameters
+        ----------
+        pagination : Pagination
+            Paginated database resources
+
+        Returns
+        -------
+        list[bytes]
+            Parts of the JSON document, which can be written to the response
+            one after the other
+        """
+        items = pagination.page.items
+        parts = [b'{"data": [']
+        for start in range(0, len(items), PAGE_ENCODING_CHUNK_SIZE):
+            chunk = self.dump(
+                items[start:start + PAGE_ENCODING_CHUNK_SIZE], many=True
+            )
+            if start:
+                parts.append(b', ')
+            # strip the brackets of the encoded list
+            parts.append(dumps(chunk)[1:-1])
+        parts.append(
+            b'], "links": ' + dumps(pagination.metadata_links) + b'}'
+        )
+        return parts
+
 
 # /task/{id}
 class TaskSchema(HATEOASModelSchema):
     class Meta:
         model = db.Task
+        exclude = ('shared_input',) + blob_columns('shared_input')
+
+    eager_load = (selectinload(db.Task.databases),)
 
-    status = fields.String()
-    finished_at = fields.DateTime()
     collaboration = fields.Method("collaboration")
     runs = fields.Function(lambda obj: create_one_to_many_link(
         obj, link_to="run", link_from="task_id"
@@ -196,8 +291,12 @@ class ResultSchema(HATEOASModelSchema):
     class Meta:
         model = db.Run
         exclude = ("assigned_at", "started_at", "finished_at", "status",
-                   "ports", "organization", "log", "input",)
+                   "ports", "organization") + RUN_BLOB_COLUMNS
 
+    # results are deferred by default as they may be large
+    eager_load = (undefer(db.Run._result),)
+
+    result = fields.Function(lambda obj: obj.result)
     run = fields.Method("make_run_link")
     task = fields.Method("task")
 
@@ -213,38 +312,124 @@ class ResultSchema(HATEOASModelSchema):
 # /task/{id}?include=runs
 class TaskWithRunSchema(TaskSchema):
     """Returns the TaskSchema plus the correspoding runs."""
+    eager_load = TaskSchema.eager_load + (
+        selectinload(db.Task.runs).selectinload(db.Run.ports),
+        undefer(db.Task._shared_input),
+    )
+
     runs = fields.Nested('RunSchema', many=True)
 
+    @pre_dump(pass_many=True)
+    def load_nodes(self, data: db.Task | list[db.Task], many: bool,
+                   **kwargs) -> db.Task | list[db.Task]:
+        """
+        Load the nodes of the runs of all tasks in a single query, instead of
+        a query per task.
+        """
+        tasks = data if many else [data]
+        load_run_nodes([run for task in tasks for run in task.runs])
+        return data
+
 
 # /task/{id}?include=results
 class TaskWithResultSchema(TaskSchema):
     """Returns the TaskSchema plus the correspoding results."""
+    eager_load = TaskSchema.eager_load + (
+        selectinload(db.Task.results).undefer(db.Run._result),
+    )
+
     results = fields.Nested('ResultSchema', many=True)
 
 
 # /task/{id}?include=runs,results
-class TaskWithRunAndResultSchema(TaskSchema):
+class TaskWithRunAndResultSchema(TaskWithRunSchema):
     """Returns the TaskSchema plus the correspoding runs and results."""
-    runs = fields.Nested('RunSchema', many=True)
+    eager_load = TaskWithRunSchema.eager_load + (
+        selectinload(db.Task.results).undefer(db.Run._result),
+    )
+
     results = fields.Nested('ResultSchema', many=True)
 
 
 
 
 class RunSchema(HATEOASModelSchema):
+    """
+    Schema of a run.
+
+    If the context of the schema (or of the schema in which it is nested)
+    contains `link_payloads=True`, payloads are only included if they can be
+    serialized without loading them. Inputs of at least
+    `BINARY_TRANSFER_MIN_SIZE` bytes and inputs in the blob storage are then
+    replaced by a link to `/run/<id>/input`, where they can be retrieved in
+    binary format. Logs in the blob storage are replaced by a link to
+    `/run/<id>`, which includes them. Clients request this for lists of
+    runs, so that a page neither contains many large inputs nor requires
+    loading a blob per run.
+    """
     class Meta:
         model = db.Run
-        exclude = ('result',)
+        exclude = RUN_BLOB_COLUMNS
 
+    # the task is needed for the (shared) input
+    eager_load = (
+        selectinload(db.Run.task).undefer(db.Task._shared_input),
+        selectinload(db.Run.ports),
+    )
+
+    input = fields.Method("input_")
+    log = fields.Method("log_")
     organization = fields.Method("organization")
     task = fields.Method("task")
     results = fields.Method("result_link")
-    node = fields.Function(
-        serialize=lambda obj: RunNodeSchema().dump(obj.node, many=False)
-    )
-    ports = fields.Function(
-        serialize=lambda obj: RunPortSchema().dump(obj.ports, many=True)
-    )
+    node = fields.Method("node_")
+    ports = fields.Nested('RunPortSchema', many=True)
+
+    @functools.cached_property
+    def node_schema(self) -> 'RunNodeSchema':
+        # created once per schema instead of once per run, as creating a
+        # schema is more expensive than serializing a node with it
+        return RunNodeSchema()
+
+    def node_(self, obj: db.Run) -> dict:
+        # use the node loaded by `load_nodes` if available
+        node = obj.__dict__['_node'] if '_node' in obj.__dict__ else obj.node
+        return self.node_schema.dump(node, many=False)
+
+    @pre_dump(pass_many=True)
+    def load_nodes(self, data: db.Run | list[db.Run], many: bool,
+                   **kwargs) -> db.Run | list[db.Run]:
+        """
+        Load the nodes of all runs that are serialized in a single query,
+        instead of a query per run.
+        """
+        load_run_nodes(data if many else [data])
+        return data
+
+    def input_(self, obj: db.Run) -> str | dict | None:
+        if self.context.get('link_payloads') and (
+            obj.full_input_size >= BINARY_TRANSFER_MIN_SIZE or
+            is_in_blob_storage(obj, 'input') or
+            (obj.task is not None and
+             is_in_blob_storage(obj.task, 'shared_input'))
+        ):
+            return {
+                "id": obj.id,
+                "link": url_for("run_input_with_id", id=obj.id),
+                "methods": ["GET"]
+            }
+        return obj.full_input
+
+    def log_(self, obj: db.Run) -> str | dict | None:
+        if self.context.get('link_payloads') and \
+                is_in_blob_storage(obj, 'log'):
+            # the log is part of the single run
+            return {
+                "id": obj.id,
+                "link": url_for("run_with_id", id=obj.id),
+                "methods": ["GET"]
+            }
+        return obj.log
 
     @staticmethod
     def result_link(obj):
@@ -255,15 +440,52 @@ class RunSchema(HATEOASModelSchema):
         }
 
 
+def load_run_nodes(runs: list[db.Run]) -> None:
+    """
+    Load the nodes that executed the given runs in a single query. The node
+    of each run is stored on the run, where it is used by
+    :class:`RunSchema`.
+
+    Parameters
+    ----------
+    runs : list[db.Run]
+        Runs of which the nodes should be loaded
+    """
+    runs = [run for run in runs if '_node' not in run.__dict__]
+    if not runs:
+        return
+
+    session = DatabaseSessionManager.get_session()
+    nodes = session.query(db.Node).filter(
+        db.Node.organization_id.in_({run.organization_id for run in runs}),
+        db.Node.collaboration_id.in_(
+            {run.task.collaboration_id for run in runs if run.task}
+        )
+    ).all()
+    nodes = {
+        (node.organization_id, node.collaboration_id): node for node in nodes
+    }
+    for run in runs:
+        collaboration_id = run.task.collaboration_id if run.task else None
+        run.__dict__['_node'] = nodes.get(
+            (run.organization_id, collaboration_id)
+        )
+
+
 class RunTaskIncludedSchema(RunSchema):
+    eager_load = RunSchema.eager_load + (
+        selectinload(db.Run.task).selectinload(db.Task.runs),
+        selectinload(db.Run.task).selectinload(db.Task.databases),
+    )
+
     task = fields.Nested('TaskSchema', many=False, exclude=["runs"])
 
 
 class RunNodeSchema(HATEOASModelSchema):
     class Meta:
         model = db.Node
-        exclude = ('type', 'api_key', 'collaboration', 'organization',
-                   'last_seen')
+        exclude = ('type', 'api_key', 'api_key_fingerprint', 'collaboration',
+                   'organization', 'last_seen')
 
 
 class PortSchema(HATEOASModelSchema):
@@ -324,6 +546,8 @@ class CollaborationSchema(HATEOASModelSchema):
 
 
 class NodeSchema(HATEOASModelSchema):
+    eager_load = (selectinload(db.Node.config),)
+
     organization = fields.Method("organization")
     collaboration = fields.Method("collaboration")
     config = fields.Nested('NodeConfigSchema', many=True,
@@ -331,7 +555,7 @@ class NodeSchema(HATEOASModelSchema):
 
     class Meta:
         model = db.Node
-        exclude = ('api_key',)
+        exclude = ('api_key', 'api_key_fingerprint',)
 
 
 class NodeConfigSchema(HATEOASModelSchema):
@@ -344,7 +568,8 @@ class NodeSchemaSimple(HATEOASModelSchema):
 
     class Meta:
         model = db.Node
-        exclude = ('collaboration', 'api_key', 'type',)
+        exclude = ('collaboration', 'api_key', 'api_key_fingerprint',
+                   'type',)
 
 
 class UserSchema(HATEOASModelSchema):
@@ -368,6 +593,14 @@ class UserWithPermissionDetailsSchema(UserSchema):
     A schema for API responses that contains regular user details plus
     additional permission details for the user to be used by the UI.
     """
+    eager_load = (
+        selectinload(db.User.rules),
+        selectinload(db.User.roles).selectinload(db.Role.rules),
+        selectinload(db.User.organization)
+        .selectinload(db.Organization.collaborations)
+        .selectinload(db.Collaboration.organizations),
+    )
+
     permissions = fields.Method("permissions_")
 
     @staticmethod
@@ -1,16 +1,24 @@
 from __future__ import annotations
 
+import base64
+import binascii
 import math
 import logging
 import flask
 import sqlalchemy
 
+from typing import TYPE_CHECKING
 from urllib.parse import urlencode
 
 from vantage6.common import logger_name
 from vantage6.server.globals import DEFAULT_PAGE, DEFAULT_PAGE_SIZE
 from vantage6.server import db
 
+if TYPE_CHECKING:
+    from vantage6.server.resource.common.output_schema import (
+        HATEOASModelSchema
+    )
+
 module_name = logger_name(__name__)
 log = logging.getLogger(module_name)
 
@@ -159,11 +167,14 @@ class Pagination:
     @classmethod
     def from_query(
         cls, query: sqlalchemy.orm.query, request: flask.Request,
-        paginate: bool = True
+        paginate: bool = True, schema: HATEOASModelSchema = None
     ) -> Pagination:
         """
         Create a Pagination object from a query.
 
+        If the request contains a `cursor` parameter, the query is paginated
+        with a cursor instead of page numbers, see :class:`CursorPagination`.
+
         Parameters
         ----------
         query : sqlalchemy.orm.query
@@ -172,12 +183,19 @@ class Pagination:
             Request object
         paginate : bool
             Whether to paginate the query or not, default True
+        schema : HATEOASModelSchema, optional
+            Schema with which the items will be serialized. Its eager loading
+            options are applied to the query, so that the relationships that
+            the schema uses are loaded for all items at once.
 
         Returns
         -------
         Pagination
             Pagination object
         """
+        if paginate and 'cursor' in request.args:
+            return CursorPagination.from_query(query, request, schema)
+
         # We remove the ordering of the query since it doesn't matter for
         # getting a count and might have performance implications as discussed
         # on this Flask-SqlAlchemy issue
@@ -202,6 +220,9 @@ class Pagination:
         if request.args.get('sort', False):
             query = cls._add_sorting(query, request.args.get('sort'))
 
+        if schema is not None and schema.eager_load:
+            query = query.options(*schema.eager_load)
+
         items = query.distinct().limit(per_page).offset((page_id-1)*per_page)\
             .all()
 
@@ -288,3 +309,212 @@ class Pagination:
                     sorter = sorter[1:]
                 query = query.order_by(sorter)
         return query
+
+
+class CursorPage:
+    """
+    Page of items that is obtained with a cursor.
+
+    Parameters
+    ----------
+    items : list[db.Base]
+        List of database resources on this page
+    next_cursor : str | None
+        Cursor to the next page, None if this is the last page
+    total : int | None
+        Total number of items, None if it was not requested
+
+    Attributes
+    ----------
+    items : list[db.Base]
+        List of resources on the current page
+    next_cursor : str | None
+        Cursor to the next page
+    has_next : bool
+        True if there is a next page, False otherwise
+    total : int | None
+        Total number of items
+    """
+    def __init__(self, items: list[db.Base], next_cursor: str | None,
+                 total: int | None) -> None:
+        self.items = items
+        self.next_cursor = next_cursor
+        self.has_next = next_cursor is not None
+        self.total = total
+
+
+class CursorPagination(Pagination):
+    """
+    Pagination of a query with a cursor (keyset pagination).
+
+    Instead of skipping the items of previous pages with an offset, which
+    gets slower for every next page, the items are ordered by descending id
+    and each page starts after the last id of the previous page. The cursor
+    is an opaque string that encodes that id. An empty cursor requests the
+    first page.
+
+    The total number of items is only counted if the request contains
+    `include_total=true`, as counting all items can be slow for large tables.
+
+    Parameters
+    ----------
+    items : list[db.Base]
+        List of database resources on this page
+    next_cursor : str | None
+        Cursor to the next page, None if this is the last page
+    total : int | None
+        Total number of items, None if it was not requested
+    request : flask.Request
+        Request object
+    """
+    def __init__(self, items: list[db.Base], next_cursor: str | None,
+                 total: int | None, request: flask.Request) -> None:
+        self.page = CursorPage(items, next_cursor, total)
+        self.request = request
+
+    @property
+    def headers(self) -> dict:
+        """
+        Set the headers for the response.
+
+        Returns
+        -------
+        dict
+            Response headers
+        """
+        headers = {
+            'Link': self.link_header,
+            'access-control-expose-headers': 'Link',
+        }
+        if self.page.total is not None:
+            headers['total-count'] = self.page.total
+            headers['access-control-expose-headers'] = 'total-count, Link'
+        return headers
+
+    @property
+    def metadata_links(self) -> dict:
+        """
+        Construct links to the first, current and next page.
+
+        Returns
+        -------
+        dict
+            Links to other pages
+        """
+        url = self.request.path
+        args = self.request.args.copy()
+
+        navs = [
+            {'rel': 'first', 'cursor': ''},
+            {'rel': 'self', 'cursor': args.get('cursor', '')},
+            {'rel': 'next', 'cursor': self.page.next_cursor},
+        ]
+
+        links = {}
+        for nav in navs:
+            if nav['cursor'] is not None:
+                args['cursor'] = nav['cursor']
+                links[nav['rel']] = f'{url}?{urlencode(args)}'
+
+        return links
+
+    @classmethod
+    def from_query(
+        cls, query: sqlalchemy.orm.query, request: flask.Request,
+        schema: HATEOASModelSchema = None
+    ) -> CursorPagination:
+        """
+        Create a CursorPagination object from a query.
+
+        Parameters
+        ----------
+        query : sqlalchemy.orm.query
+            Query to paginate. Its ordering is replaced by descending id.
+        request : flask.Request
+            Request object
+        schema : HATEOASModelSchema, optional
+            Schema with which the items will be serialized, of which the eager
+            loading options are applied to the query
+
+        Returns
+        -------
+        CursorPagination
+            CursorPagination object
+
+        Raises
+        ------
+        ValueError
+            If the cursor is invalid or if sorting is requested, which is not
+            supported in combination with a cursor
+        """
+        if request.args.get('sort'):
+            raise ValueError(
+                "The 'sort' parameter cannot be combined with a 'cursor'"
+            )
+        per_page = cls._get_per_page(request)
+        last_id = cls.decode_cursor(request.args.get('cursor'))
+
+        model = query.column_descriptions[0]['entity']
+
+        total = None
+        if request.args.get('include_total', '').lower() in ('true', '1'):
+            total = query.distinct().order_by(None).count()
+
+        query = query.order_by(None).order_by(model.id.desc())
+        if last_id is not None:
+            query = query.filter(model.id < last_id)
+        if schema is not None and schema.eager_load:
+            query = query.options(*schema.eager_load)
+
+        # fetch one additional item to find out if there is a next page
+        items = query.distinct().limit(per_page + 1).all()
+        next_cursor = None
+        if len(items) > per_page:
+            items = items[:per_page]
+            next_cursor = cls.encode_cursor(items[-1].id)
+
+        return cls(items, next_cursor, total, request)
+
+    @staticmethod
+    def encode_cursor(id_: int) -> str:
+        """
+        Create the cursor to the page that starts after an item.
+
+        Parameters
+        ----------
+        id_ : int
+            Id of the last item of the current page
+
+        Returns
+        -------
+        str
+            Opaque cursor
+        """
+        return base64.urlsafe_b64encode(str(id_).encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str | None) -> int | None:
+        """
+        Get the id after which a page starts from its cursor.
+
+        Parameters
+        ----------
+        cursor : str | None
+            Cursor to decode. An empty cursor refers to the first page.
+
+        Returns
+        -------
+        int | None
+            Id of the last item of the previous page, None for the first page
+
+        Raises
+        ------
+        ValueError
+            If the cursor is invalid
+        """
+        if not cursor:
+            return None
+        try:
+            return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+        except (ValueError, binascii.Error):
+            raise ValueError("The 'cursor' parameter is invalid")
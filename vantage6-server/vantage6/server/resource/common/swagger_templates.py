@@ -38,6 +38,15 @@ swagger_template = {
                             " keys 'method', kwargs', 'args'."
                         )
                     },
+                    "shared_input": {
+                        "type": "string",
+                        "description": (
+                            "Encrypted input that is shared by all "
+                            "organizations. If given, the 'input' of each "
+                            "organization should only contain the encrypted "
+                            "key of the shared input for that organization."
+                        )
+                    },
                     "databases": {
                         "type": "array",
                         "items": {"type": "dict"},
@@ -6,7 +6,9 @@ from flask import g, request
 from flask_restful import Api
 
 from vantage6.common import generate_apikey
-from vantage6.server.resource import with_user_or_node, with_user
+from vantage6.server.resource import (
+    cached_response, with_user_or_node, with_user
+)
 from vantage6.server.resource import ServicesResources
 from vantage6.server.resource.common.pagination import Pagination
 from vantage6.server.permission import (
@@ -111,6 +113,7 @@ class NodeBase(ServicesResources):
 class Nodes(NodeBase):
 
     @with_user_or_node
+    @cached_response(db.Node, db.NodeConfig)
     def get(self):
         """Returns a list of nodes
         ---
@@ -249,7 +252,7 @@ class Nodes(NodeBase):
 
         # paginate results
         try:
-            page = Pagination.from_query(q, request)
+            page = Pagination.from_query(q, request, schema=node_schema)
         except ValueError as e:
             return {'msg': str(e)}, HTTPStatus.BAD_REQUEST
 
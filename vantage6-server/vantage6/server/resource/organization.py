@@ -18,7 +18,7 @@ from vantage6.server.resource.common.input_schema import (
     OrganizationInputSchema
 )
 from vantage6.server.resource import (
-    only_for, with_user, ServicesResources
+    cached_response, only_for, with_user, ServicesResources
 )
 from vantage6.server.resource.common.output_schema import OrganizationSchema
 
@@ -108,6 +108,7 @@ class OrganizationBase(ServicesResources):
 class Organizations(OrganizationBase):
 
     @only_for(("user", "node", "container"))
+    @cached_response(db.Organization)
     def get(self):
         """ Returns a list organizations
         ---
@@ -227,7 +228,8 @@ class Organizations(OrganizationBase):
 
         # paginate the results
         try:
-            page = Pagination.from_query(query=q, request=request)
+            page = Pagination.from_query(query=q, request=request,
+                                         schema=org_schema)
         except ValueError as e:
             return {'msg': str(e)}, HTTPStatus.BAD_REQUEST
 
@@ -438,4 +440,15 @@ class Organization(OrganizationBase):
                 setattr(organization, field, data[field])
 
         organization.save()
+
+        # let the nodes know that they should no longer use a cached version
+        # of the public key of this organization
+        if data.get('public_key') is not None:
+            for collaboration in organization.collaborations:
+                self.socketio.emit(
+                    'organization_updated', {'id': organization.id},
+                    namespace='/tasks',
+                    room=f'collaboration_{collaboration.id}'
+                )
+
         return org_schema.dump(organization, many=False), HTTPStatus.OK
@@ -325,7 +325,8 @@ class Roles(RoleBase):
 
         # paginate results
         try:
-            page = Pagination.from_query(query=q, request=request)
+            page = Pagination.from_query(query=q, request=request,
+                                         schema=role_schema)
         except ValueError as e:
             return {'msg': str(e)}, HTTPStatus.BAD_REQUEST
 
@@ -822,5 +823,6 @@ class RoleRules(RoleBase):
 
         # Ok jumped all hoopes, remove it..
         role.rules.remove(rule)
+        role.save()
 
         return rule_schema.dump(role.rules, many=True), HTTPStatus.OK
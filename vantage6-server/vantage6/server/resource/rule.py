@@ -177,7 +177,8 @@ class Rules(ServicesResources):
 
         # paginate results
         try:
-            page = Pagination.from_query(q, request, paginate=paginate)
+            page = Pagination.from_query(q, request, paginate=paginate,
+                                         schema=rule_schema)
         except ValueError as e:
             return {'msg': str(e)}, HTTPStatus.BAD_REQUEST
 
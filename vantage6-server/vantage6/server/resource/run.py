@@ -17,6 +17,7 @@ from vantage6.server.permission import (
     Operation as P
 )
 from vantage6.server.resource import (
+    cached_response,
     with_node,
     only_for,
     parse_datetime,
@@ -24,6 +25,11 @@ from vantage6.server.resource import (
 )
 from vantage6.server.resource.common.input_schema import RunInputSchema
 from vantage6.server.resource.common.pagination import Pagination
+from vantage6.server.resource.common.binary import (
+    BINARY_MIMETYPE,
+    binary_response,
+    spool_binary_as_text
+)
 from vantage6.server.resource.common.output_schema import (
     RunSchema, RunTaskIncludedSchema, ResultSchema
 )
@@ -77,6 +83,20 @@ def setup(api: Api, api_base: str, services: dict) -> None:
         methods=('GET',),
         resource_class_kwargs=services
     )
+    api.add_resource(
+        RunInput,
+        path + '/<int:id>/input',
+        endpoint='run_input_with_id',
+        methods=('GET',),
+        resource_class_kwargs=services
+    )
+    api.add_resource(
+        RunResult,
+        path + '/<int:id>/result',
+        endpoint='run_result_with_id',
+        methods=('GET', 'PUT'),
+        resource_class_kwargs=services
+    )
     # TODO v4+ implement a PATCH method and use it to update the result. Then,
     # remove that from patching it in the Run resource.
     api.add_resource(
@@ -91,6 +111,8 @@ def setup(api: Api, api_base: str, services: dict) -> None:
 # Schemas
 run_schema = RunSchema()
 run_inc_schema = RunTaskIncludedSchema()
+run_link_schema = RunSchema(context={'link_payloads': True})
+run_inc_link_schema = RunTaskIncludedSchema(context={'link_payloads': True})
 result_schema = ResultSchema()
 run_input_schema = RunInputSchema()
 
@@ -224,12 +246,18 @@ class MultiRunBase(RunBase):
 class Runs(MultiRunBase):
 
     @only_for(('node', 'user', 'container'))
+    @cached_response(db.Run, db.Task, db.AlgorithmPort, db.Node)
     def get(self):
         """ Returns a list of runs
         ---
 
         description: >-
-            Returns a list of all runs you are allowed to see.\n
+            Returns a list of all runs you are allowed to see. With
+            `link_payloads=true`, inputs of at least 1 MiB, and inputs that
+            are stored in the blob storage, are replaced by a link to
+            `/run/{id}/input`, from which they can be retrieved in binary
+            format. Logs that are stored in the blob storage are then
+            replaced by a link to `/run/{id}`, which includes them.\n
 
             ### Permission Table\n
             |Rule name|Scope|Operation|Assigned to node|Assigned to container|
@@ -310,6 +338,12 @@ class Runs(MultiRunBase):
               schema:
                 type: string (can be multiple)
               description: Include 'task' to include task data.
+            - in: query
+              name: link_payloads
+              schema:
+                type: boolean
+              description: Whether to replace large inputs by a link to
+                retrieve them in binary format (default=false)
             - in: query
               name: page
               schema:
@@ -320,6 +354,20 @@ class Runs(MultiRunBase):
               schema:
                 type: integer
               description: Number of items per page (default 10)
+            - in: query
+              name: cursor
+              schema:
+                type: string
+              description: Cursor of the page to return. Pages are then
+                ordered by descending id and no page numbers are used. Use an
+                empty cursor for the first page, and the cursor in the 'next'
+                link for the next pages. Cannot be combined with 'sort'.
+            - in: query
+              name: include_total
+              schema:
+                type: boolean
+              description: Whether to count the total number of items when
+                a cursor is used (default=false)
             - in: query
               name: sort
               schema:
@@ -347,14 +395,19 @@ class Runs(MultiRunBase):
         if not isinstance(query, sa.orm.query.Query):
             return query
 
+        # serialization of the models
+        if self.links_payloads():
+            s = run_inc_link_schema if self.is_included('task') \
+                else run_link_schema
+        else:
+            s = run_inc_schema if self.is_included('task') else run_schema
+
         try:
-            page = Pagination.from_query(query=query, request=request)
+            page = Pagination.from_query(query=query, request=request,
+                                         schema=s)
         except ValueError as e:
             return {'msg': str(e)}, HTTPStatus.BAD_REQUEST
 
-        # serialization of the models
-        s = run_inc_schema if self.is_included('task') else run_schema
-
         return self.response(page, s)
 
 
@@ -452,6 +505,20 @@ class Results(MultiRunBase):
               schema:
                 type: integer
               description: Number of items per page
+            - in: query
+              name: cursor
+              schema:
+                type: string
+              description: Cursor of the page to return. Pages are then
+                ordered by descending id and no page numbers are used. Use an
+                empty cursor for the first page, and the cursor in the 'next'
+                link for the next pages. Cannot be combined with 'sort'.
+            - in: query
+              name: include_total
+              schema:
+                type: boolean
+              description: Whether to count the total number of items when
+                a cursor is used (default=false)
             - in: query
               name: sort
               schema:
@@ -477,7 +544,11 @@ class Results(MultiRunBase):
         if not isinstance(query, sa.orm.query.Query):
             return query
 
-        page = Pagination.from_query(query=query, request=request)
+        try:
+            page = Pagination.from_query(query=query, request=request,
+                                         schema=result_schema)
+        except ValueError as e:
+            return {'msg': str(e)}, HTTPStatus.BAD_REQUEST
 
         return self.response(page, result_schema)
 
@@ -664,7 +735,9 @@ class Run(SingleRunBase):
         run.started_at = parse_datetime(data.get("started_at"),
                                         run.started_at)
         run.finished_at = parse_datetime(data.get("finished_at"))
-        run.result = data.get("result")
+        # the result may have been uploaded separately in binary format
+        if "result" in data:
+            run.result = data.get("result")
         run.log = data.get("log")
         run.status = data.get("status", run.status)
         run.save()
@@ -725,3 +798,196 @@ class Result(SingleRunBase):
             return run
 
         return result_schema.dump(run, many=False), HTTPStatus.OK
+
+
+class RunInput(SingleRunBase):
+    """Resource for /api/run/<id>/input"""
+
+    @only_for(('node', 'user', 'container'))
+    def get(self, id):
+        """ Get the input of a run in binary format
+        ---
+        description: >-
+            Returns the (encrypted) input of a run as
+            `application/octet-stream`. Unlike in the JSON representation of
+            the run, the encrypted message is not base64 encoded. \n
+
+            ### Permission Table\n
+            |Rule name|Scope|Operation|Assigned to node|Assigned to container|
+            Description|\n
+            |--|--|--|--|--|--|\n
+            |Run|Global|View|❌|❌|View any run|\n
+            |Run|Collaboration|View|✅|✅|View the runs of your
+            organization's collaborations|\n
+            |Run|Organization|View|❌|❌|View any run from a task created by
+            your organization|\n
+            |Run|Own|View|❌|❌|View any run from a task created by you|\n
+
+            Accessible to users.
+
+        parameters:
+          - in: path
+            name: id
+            schema:
+              type: integer
+            minimum: 1
+            description: Algorithm run id
+            required: true
+
+        responses:
+          200:
+              description: Ok
+          401:
+              description: Unauthorized
+          404:
+              description: Run id not found or run has no input
+
+        security:
+          - bearerAuth: []
+
+        tags: ["Algorithm"]
+        """
+        run = self.get_single_run(id)
+        # return error code if run is not found
+        if not isinstance(run, db_Run):
+            return run
+
+        input_ = run.full_input
+        if input_ is None:
+            return {'msg': f'Run id={id} has no input!'}, \
+                HTTPStatus.NOT_FOUND
+        return binary_response(input_, run.task.collaboration.encrypted)
+
+
+class RunResult(SingleRunBase):
+    """Resource for /api/run/<id>/result"""
+
+    @only_for(('node', 'user', 'container'))
+    def get(self, id):
+        """ Get the result of a run in binary format
+        ---
+        description: >-
+            Returns the (encrypted) result of a run as
+            `application/octet-stream`. Unlike in the JSON representation of
+            the result, the encrypted message is not base64 encoded. \n
+
+            ### Permission Table\n
+            |Rule name|Scope|Operation|Assigned to node|Assigned to container|
+            Description|\n
+            |--|--|--|--|--|--|\n
+            |Run|Global|View|❌|❌|View any result|\n
+            |Run|Collaboration|View|✅|✅|View the results of your
+            organization's collaborations|\n
+            |Run|Organization|View|❌|❌|View any result from a task created
+            by your organization|\n
+            |Run|Own|View|❌|❌|View any result from a task created by you|\n
+
+            Accessible to users.
+
+        parameters:
+          - in: path
+            name: id
+            schema:
+              type: integer
+            minimum: 1
+            description: Algorithm run id
+            required: true
+
+        responses:
+          200:
+              description: Ok
+          401:
+              description: Unauthorized
+          404:
+              description: Run id not found or run has no result
+
+        security:
+          - bearerAuth: []
+
+        tags: ["Algorithm"]
+        """
+        run = self.get_single_run(id)
+        # return error code if run is not found
+        if not isinstance(run, db_Run):
+            return run
+
+        if run.result is None:
+            return {'msg': f'Run id={id} has no result!'}, \
+                HTTPStatus.NOT_FOUND
+        return binary_response(run.result, run.task.collaboration.encrypted)
+
+    @with_node
+    def put(self, id):
+        """Upload the result of a run in binary format
+        ---
+        description: >-
+          Upload the (encrypted) result of a run as
+          `application/octet-stream`. Unlike in the JSON body of `PATCH
+          /run/{id}`, the encrypted message should not be base64 encoded.
+          Only done if the request comes from the correct, authenticated node,
+          before the run is finished.
+
+        parameters:
+          - in: path
+            name: id
+            schema:
+              type: integer
+              minimum: 1
+            description: Algorithm run id
+            required: true
+
+        requestBody:
+          content:
+            application/octet-stream:
+              schema:
+                type: string
+                format: binary
+
+        responses:
+          200:
+            description: Ok
+          400:
+            description: Run already finished or result is not properly
+              formatted
+          401:
+            description: Unauthorized
+          404:
+            description: Run id not found
+
+        security:
+          - bearerAuth: []
+
+        tags: ["Algorithm"]
+        """
+        run = db_Run.get(id)
+        if not run:
+            return {'msg': f'Run id={id} not found!'}, HTTPStatus.NOT_FOUND
+
+        if request.mimetype != BINARY_MIMETYPE:
+            return {'msg': f'Result should be sent as {BINARY_MIMETYPE}'}, \
+                HTTPStatus.BAD_REQUEST
+
+        if run.organization_id != g.node.organization_id:
+            log.warn(
+                f"{g.node.name} tries to update a run that does not belong "
+                f"to them ({run.organization_id}/{g.node.organization_id})."
+            )
+            return {"msg": "This is not your algorithm run to PUT!"}, \
+                HTTPStatus.UNAUTHORIZED
+
+        if run.finished_at is not None:
+            return {
+                "msg": "Cannot update an already finished algorithm run!"
+            }, HTTPStatus.BAD_REQUEST
+
+        try:
+            result = spool_binary_as_text(
+                request.stream, run.task.collaboration.encrypted)
+        except ValueError as e:
+            return {'msg': f'Result is not properly formatted: {e}'}, \
+                HTTPStatus.BAD_REQUEST
+        with result:
+            run.result = result
+        run.save()
+
+        return {'msg': f'Result of run id={id} uploaded'}, HTTPStatus.OK
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import logging
 import json
+from typing import BinaryIO
 
 from flask import g, request, url_for
 from flask_restful import Api
@@ -18,7 +19,9 @@ from vantage6.server.permission import (
     PermissionManager,
     Operation as P
 )
-from vantage6.server.resource import only_for, ServicesResources, with_user
+from vantage6.server.resource import (
+    cached_response, only_for, ServicesResources, with_user
+)
 from vantage6.server.resource.common.output_schema import (
     TaskSchema,
     TaskWithResultSchema,
@@ -27,6 +30,7 @@ from vantage6.server.resource.common.output_schema import (
 )
 from vantage6.server.resource.common.input_schema import TaskInputSchema
 from vantage6.server.resource.common.pagination import Pagination
+from vantage6.server.resource.common.binary import spool_binary_as_text
 from vantage6.server.resource.event import kill_task
 
 
@@ -115,6 +119,10 @@ task_schema = TaskSchema()
 task_run_schema = TaskWithRunSchema()
 task_result_schema = TaskWithResultSchema()
 task_result_run_schema = TaskWithRunAndResultSchema()
+task_run_link_schema = TaskWithRunSchema(context={'link_payloads': True})
+task_result_run_link_schema = TaskWithRunAndResultSchema(
+    context={'link_payloads': True}
+)
 
 task_input_schema = TaskInputSchema()
 
@@ -138,9 +146,11 @@ class TaskBase(ServicesResources):
             Schema to use for serialization
         """
         if self.is_included('runs') and self.is_included('results'):
-            return task_result_run_schema
+            return task_result_run_link_schema if self.links_payloads() \
+                else task_result_run_schema
         elif self.is_included('runs'):
-            return task_run_schema
+            return task_run_link_schema if self.links_payloads() \
+                else task_run_schema
         elif self.is_included('results'):
             return task_result_schema
         else:
@@ -150,6 +160,7 @@ class TaskBase(ServicesResources):
 class Tasks(TaskBase):
 
     @only_for(("user", "node", "container"))
+    @cached_response(db.Task, db.Run, db.TaskDatabase)
     def get(self):
         """List tasks
         ---
@@ -254,12 +265,19 @@ class Tasks(TaskBase):
             description: Include 'results' to include the task's results,
               'runs' to include details on algorithm runs. For including
                multiple, do either `include=x,y` or `include=x&include=y`.
+          - in: query
+            name: link_payloads
+            schema:
+              type: boolean
+            description: Whether to replace large inputs of included runs by
+              a link to retrieve them in binary format (default=false)
           - in: query
             name: status
             schema:
               type: string
-            description: Filter by task status, e.g. 'active' for active
-              tasks, 'completed' for finished or 'crashed' for failed tasks.
+            description: Filter by task status, i.e. 'pending',
+              'initializing', 'active', 'completed' or 'failed'. A task has
+              failed if any of its runs has failed.
           - in: query
             name: page
             schema:
@@ -270,6 +288,20 @@ class Tasks(TaskBase):
             schema:
               type: integer
             description: Number of items per page (default=10)
+          - in: query
+            name: cursor
+            schema:
+              type: string
+            description: Cursor of the page to return. Pages are then
+              ordered by descending id and no page numbers are used. Use an
+              empty cursor for the first page, and the cursor in the 'next'
+              link for the next pages. Cannot be combined with 'sort'.
+          - in: query
+            name: include_total
+            schema:
+              type: boolean
+            description: Whether to count the total number of items when
+              a cursor is used (default=false)
           - in: query
             name: sort
             schema:
@@ -386,10 +418,13 @@ class Tasks(TaskBase):
                     HTTPStatus.UNAUTHORIZED
             q = q.filter(db.Task.job_id == job_id)
 
-        for param in ['name', 'image', 'description', 'status']:
+        for param in ['name', 'image', 'description']:
             if param in args:
                 q = q.filter(getattr(db.Task, param).like(args[param]))
 
+        if 'status' in args:
+            q = q.filter(db.Task.status == args['status'])
+
         if 'run_id' in args:
             run_id = int(args['run_id'])
             run = db.Run.get(run_id)
@@ -420,18 +455,21 @@ class Tasks(TaskBase):
                     f"'{args['is_user_created']}'. Should be an integer."
                 )}, HTTPStatus.BAD_REQUEST
 
-        # order to get latest task first
-        q = q.order_by(desc(db.Task.id))
+        # order to get latest task first, unless another sorting is requested
+        # (as that would only be applied to tasks with the same id)
+        if 'sort' not in args:
+            q = q.order_by(desc(db.Task.id))
+
+        # serialization schema
+        schema = self._select_schema()
 
         # paginate tasks
         try:
-            page = Pagination.from_query(query=q, request=request)
+            page = Pagination.from_query(query=q, request=request,
+                                         schema=schema)
         except ValueError as e:
             return {'msg': str(e)}, HTTPStatus.BAD_REQUEST
 
-        # serialization schema
-        schema = self._select_schema()
-
         return self.response(page, schema)
 
     @only_for(("user", "container"))
@@ -465,11 +503,28 @@ class Tasks(TaskBase):
           to create tasks: they are only allowed to create tasks in the same
           collaboration using the same image.\n
 
+          Large inputs that are shared by all organizations may be uploaded
+          in binary format instead of in the JSON body. In that case, send a
+          `multipart/form-data` request with the task definition as JSON in
+          the `task` field, and the shared input in the `shared_input` file
+          field. As in the binary result endpoints, the encrypted message
+          should then not be base64 encoded.\n
+
         requestBody:
           content:
             application/json:
               schema:
                 $ref: '#/components/schemas/Task'
+            multipart/form-data:
+              schema:
+                properties:
+                  task:
+                    type: string
+                    description: The task definition as JSON
+                  shared_input:
+                    type: string
+                    format: binary
+                    description: Input shared by all organizations
 
         responses:
           200:
@@ -488,10 +543,38 @@ class Tasks(TaskBase):
 
         tags: ["Task"]
         """
-        return self.post_task(request.get_json(), self.socketio, self.r)
+        if request.mimetype != 'multipart/form-data':
+            return self.post_task(request.get_json(), self.socketio, self.r)
+
+        # task definition and shared input in binary format are sent
+        # separately
+        try:
+            data = json.loads(request.form.get('task', ''))
+        except json.JSONDecodeError:
+            data = None
+        if not isinstance(data, dict):
+            return {'msg': 'Field task should contain the task as JSON'}, \
+                HTTPStatus.BAD_REQUEST
+        shared_input = request.files.get('shared_input')
+        if shared_input:
+            collaboration_id = data.get('collaboration_id')
+            collaboration = db.Collaboration.get(collaboration_id) \
+                if collaboration_id else None
+            encrypted = collaboration.encrypted if collaboration else False
+            try:
+                shared_input = spool_binary_as_text(
+                    shared_input.stream, encrypted, header_fields=1)
+            except ValueError as e:
+                return {'msg': f'Shared input is not properly formatted: {e}'
+                        }, HTTPStatus.BAD_REQUEST
+            with shared_input:
+                return self.post_task(data, self.socketio, self.r,
+                                      shared_input_file=shared_input)
+        return self.post_task(data, self.socketio, self.r)
 
     @staticmethod
-    def post_task(data: dict, socketio: SocketIO, rules: RuleCollection):
+    def post_task(data: dict, socketio: SocketIO, rules: RuleCollection,
+                  shared_input_file: BinaryIO = None):
         """
         Create new task and algorithm runs. Send the task to the nodes.
 
@@ -499,6 +582,9 @@ class Tasks(TaskBase):
         ----------
         data : dict
             Task data
+        shared_input_file : BinaryIO, optional
+            File with the shared input as base64 encoded string, which is
+            used instead of the `shared_input` in the task data
         """
         # validate request body
         errors = task_input_schema.validate(data)
@@ -577,66 +663,66 @@ class Tasks(TaskBase):
                 return {"msg": "Container-token is not valid"}, \
                     HTTPStatus.UNAUTHORIZED
 
-        # permissions ok, create task record and TaskDatabase records
-        task = db.Task(collaboration=collaboration, name=data.get('name', ''),
-                       description=data.get('description', ''), image=image,
-                       init_org=init_org)
-
-        # create job_id. Users can only create top-level -tasks (they will not
-        # have sub-tasks). Therefore, always create a new job_id. Tasks created
-        # by containers are always sub-tasks
-        if g.user:
-            task.job_id = task.next_job_id()
-            task.init_user_id = g.user.id
-            log.debug(f"New job_id {task.job_id}")
-        elif g.container:
-            task.parent_id = g.container["task_id"]
-            parent = db.Task.get(g.container["task_id"])
-            task.job_id = parent.job_id
-            task.init_user_id = parent.init_user_id
-            log.debug(f"Sub task from parent_id={task.parent_id}")
-
-        # save the databases that the task uses
+        # validate the databases that the task uses before anything is
+        # created, so that a rejected request leaves nothing behind
         databases = data.get('databases')
         if isinstance(databases, str):
             databases = [{'label': databases}]
         elif databases is None:
             databases = []
-        db_records = []
         for database in databases:
             if 'label' not in database:
                 return {'msg': "Database label missing! The dictionary "
                         f"{database} should contain a 'label' key"}, \
                     HTTPStatus.BAD_REQUEST
+
+        # create job_id. Users can only create top-level -tasks (they will not
+        # have sub-tasks). Therefore, always create a new job_id. Tasks created
+        # by containers are always sub-tasks. The job id is allocated before
+        # the task is created, as it is allocated outside of this session.
+        parent_id = None
+        if g.user:
+            job_id = db.Task.next_job_id()
+            init_user_id = g.user.id
+            log.debug(f"New job_id {job_id}")
+        elif g.container:
+            parent_id = g.container["task_id"]
+            parent = db.Task.get(parent_id)
+            job_id = parent.job_id
+            init_user_id = parent.init_user_id
+            log.debug(f"Sub task from parent_id={parent_id}")
+
+        # permissions ok, create task record and TaskDatabase records
+        task = db.Task(collaboration=collaboration, name=data.get('name', ''),
+                       description=data.get('description', ''), image=image,
+                       init_org=init_org, job_id=job_id,
+                       init_user_id=init_user_id, parent_id=parent_id,
+                       shared_input=data.get('shared_input')
+                       if shared_input_file is None else shared_input_file)
+
+        # save the databases that the task uses
+        for database in databases:
             # remove label from the database dictionary, which apart from it
             # may only contain some optional parameters . Save optional
             # parameters as JSON without spaces to database
             label = database.pop('label')
-            db_records.append(db.TaskDatabase(
-                task_id=task.id,
+            db.TaskDatabase(
+                task=task,
                 database=label,
                 parameters=json.dumps(database, separators=(',', ':'))
-            ))
-
-        # All checks completed, save task to database
-        task.save()
-        [db_record.save() for db_record in db_records]  # pylint: disable=W0106
-
-        # send socket event that task has been created
-        socketio.emit(
-            "task_created", {
-                "task_id": task.id,
-                "job_id": task.job_id,
-                "collaboration_id": collaboration_id,
-                "init_org_id": init_org.id,
-            }, room=f"collaboration_{collaboration_id}", namespace='/tasks'
-        )
+            )
 
-        # now we need to create results for the nodes to fill. Each node
-        # receives their instructions from a result, not from the task itself
+        # now we need to create runs for the nodes to fill. Each node
+        # receives their instructions from a run, not from the task itself.
+        # The organizations are loaded in a single query.
         log.debug(f"Assigning task to {len(organizations_json_list)} nodes.")
+        organizations = {
+            organization.id: organization for organization in
+            g.session.query(db.Organization)
+            .filter(db.Organization.id.in_(org_ids))
+        }
         for org in organizations_json_list:
-            organization = db.Organization.get(org['id'])
+            organization = organizations[org['id']]
             log.debug(f"Assigning task to '{organization.name}'.")
             input_ = org.get('input')
             # FIXME: legacy input from the client, could be removed at some
@@ -644,16 +730,29 @@ class Tasks(TaskBase):
             if isinstance(input_, dict):
                 input_ = json.dumps(input_).encode(STRING_ENCODING)
             # Create run
-            run = db.Run(
+            db.Run(
                 task=task,
                 organization=organization,
                 input=input_,
                 status=TaskStatus.PENDING
             )
-            run.save()
 
-        # notify nodes a new task available (only to online nodes), nodes that
-        # are offline will receive this task on sign in.
+        # All checks completed, save the task with its databases and runs in
+        # a single transaction
+        g.session.add(task)
+        g.session.commit()
+
+        # only notify about the task once it has been committed, so that it
+        # can be retrieved. Nodes that are offline will receive the task on
+        # sign in.
+        socketio.emit(
+            "task_created", {
+                "task_id": task.id,
+                "job_id": task.job_id,
+                "collaboration_id": collaboration_id,
+                "init_org_id": init_org.id,
+            }, room=f"collaboration_{collaboration_id}", namespace='/tasks'
+        )
         socketio.emit('new_task', task.id, namespace='/tasks',
                       room=f'collaboration_{task.collaboration_id}')
 
@@ -777,6 +876,12 @@ class Task(TaskBase):
             description: Include 'results' to include the task's results,
               'runs' to include details on algorithm runs. For including
               multiple, do either `include=x,y` or `include=x&include=y`.
+          - in: query
+            name: link_payloads
+            schema:
+              type: boolean
+            description: Whether to replace large inputs of included runs by
+              a link to retrieve them in binary format (default=false)
 
         responses:
           200:
@@ -309,7 +309,8 @@ class Users(UserBase):
 
         # paginate results
         try:
-            page = Pagination.from_query(query=q, request=request)
+            page = Pagination.from_query(query=q, request=request,
+                                         schema=user_schema)
         except ValueError as e:
             return {'msg': str(e)}, HTTPStatus.BAD_REQUEST
 
@@ -0,0 +1,356 @@
+"""
+Cache of the responses of read-heavy GET endpoints.
+
+The UI and scripts poll endpoints such as `/task` and `/run` frequently, while
+the data behind them changes much less often. The responses of these
+endpoints are therefore cached per endpoint, request arguments and identity
+(user, node or algorithm container) that made the request.
+
+Every table has a version that is incremented when changes to that table are
+committed. A cached response is only used as long as the versions of the
+tables it depends on have not changed. Responses carry an ETag, so that
+clients that send it back in the `If-None-Match` header receive a
+`304 Not Modified` response without a body.
+
+The versions only track the changes that are made by this server instance.
+Cached responses therefore also expire after a number of seconds, which
+limits how long changes made by other instances go unnoticed.
+
+The cache is configured in the `response_cache` section of the server
+configuration file.
+"""
+from __future__ import annotations
+
+import collections
+import hashlib
+import logging
+import threading
+import time
+
+from typing import Hashable, Iterable, NamedTuple
+
+from flask import Response
+from sqlalchemy import event, inspect, Table
+from sqlalchemy.orm import object_mapper
+from sqlalchemy.orm.session import Session, ORMExecuteState
+
+from vantage6.common import logger_name, Singleton
+from vantage6.server.globals import (
+    RESPONSE_CACHE_MAX_SIZE,
+    RESPONSE_CACHE_TTL,
+)
+
+module_name = logger_name(__name__)
+log = logging.getLogger(module_name)
+
+# key in `Session.info` under which the names of the tables that are changed
+# in the current transaction are collected
+CHANGED_TABLES_KEY = 'response_cache_changed_tables'
+
+
+class CachedResponse(NamedTuple):
+    """
+    Response that is stored in the cache.
+
+    Attributes
+    ----------
+    body : bytes
+        Body of the response
+    headers : list[tuple[str, str]]
+        Headers of the response, including the ETag
+    etag : str
+        Hash of the body
+    versions : tuple[int]
+        Versions of the tables that the response depends on, at the time the
+        response was created
+    expires_at : float
+        Time (see `time.monotonic`) at which the response expires
+    """
+    body: bytes
+    headers: list[tuple[str, str]]
+    etag: str
+    versions: tuple[int]
+    expires_at: float
+
+    @classmethod
+    def from_response(cls, response: Response, versions: tuple[int],
+                      ttl: float) -> CachedResponse:
+        """
+        Create a cached response from a response, and set the ETag of the
+        response.
+
+        Parameters
+        ----------
+        response : Response
+            Response to store
+        versions : tuple[int]
+            Versions of the tables that the response depends on
+        ttl : float
+            Number of seconds that the response may be used
+
+        Returns
+        -------
+        CachedResponse
+            The response to store in the cache
+        """
+        body = response.get_data()
+        etag = hashlib.sha1(body).hexdigest()
+        response.set_etag(etag)
+        return cls(body, response.headers.to_wsgi_list(), etag, versions,
+                   time.monotonic() + ttl)
+
+    def to_response(self) -> Response:
+        """
+        Create a response from the cached response.
+
+        Returns
+        -------
+        Response
+            The response
+        """
+        return Response(self.body, headers=self.headers)
+
+    @property
+    def size(self) -> int:
+        """
+        Number of bytes that the response occupies, approximately.
+
+        Returns
+        -------
+        int
+            Size of the response
+        """
+        return len(self.body) + sum(
+            len(name) + len(value) for name, value in self.headers
+        )
+
+
+class ResponseCache(metaclass=Singleton):
+    """
+    Least recently used cache of responses, bounded by the total size of the
+    responses.
+
+    Attributes
+    ----------
+    max_size : int
+        Maximum total size of the cached responses in bytes. A value of 0
+        disables the cache.
+    ttl : float
+        Number of seconds that a cached response may be used
+    """
+
+    def __init__(self) -> None:
+        self.max_size = RESPONSE_CACHE_MAX_SIZE
+        self.ttl = RESPONSE_CACHE_TTL
+        self._responses: collections.OrderedDict[Hashable, CachedResponse] = \
+            collections.OrderedDict()
+        self._size = 0
+        self._versions = collections.Counter()
+        self._lock = threading.Lock()
+
+    def configure(self, config: dict | None) -> None:
+        """
+        Configure the cache from the `response_cache` section of the server
+        configuration. Cached responses are removed.
+
+        Parameters
+        ----------
+        config : dict | None
+            Configuration of the cache. The keys `max_size` (in MB) and `ttl`
+            (in seconds) are optional.
+        """
+        config = config or {}
+        with self._lock:
+            self.max_size = int(
+                config.get('max_size', RESPONSE_CACHE_MAX_SIZE / 2**20)
+                * 2**20
+            )
+            self.ttl = config.get('ttl', RESPONSE_CACHE_TTL)
+            self._responses.clear()
+            self._size = 0
+        log.debug("Response cache: max %s bytes, ttl %s seconds",
+                  self.max_size, self.ttl)
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Whether responses are cached.
+
+        Returns
+        -------
+        bool
+            True if the cache is enabled
+        """
+        return self.max_size > 0
+
+    def versions(self, tables: Iterable[str]) -> tuple[int]:
+        """
+        Get the current versions of tables.
+
+        Parameters
+        ----------
+        tables : Iterable[str]
+            Names of the tables
+
+        Returns
+        -------
+        tuple[int]
+            Versions of the tables, in the same order
+        """
+        with self._lock:
+            return tuple(self._versions[table] for table in tables)
+
+    def get(self, key: Hashable, versions: tuple[int]) -> \
+            CachedResponse | None:
+        """
+        Get a cached response.
+
+        Parameters
+        ----------
+        key : Hashable
+            Key of the response
+        versions : tuple[int]
+            Current versions of the tables that the response depends on
+
+        Returns
+        -------
+        CachedResponse | None
+            The cached response, or None if there is no response for this key
+            or if it is no longer valid
+        """
+        with self._lock:
+            cached = self._responses.get(key)
+            if cached is None:
+                return None
+            if cached.versions != versions or \
+                    cached.expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._responses.move_to_end(key)
+            return cached
+
+    def put(self, key: Hashable, tables: Iterable[str],
+            cached: CachedResponse) -> None:
+        """
+        Store a response. The response is not stored if one of the tables it
+        depends on has been changed while it was created, or if it is larger
+        than the cache.
+
+        Parameters
+        ----------
+        key : Hashable
+            Key of the response
+        tables : Iterable[str]
+            Names of the tables that the response depends on
+        cached : CachedResponse
+            The response
+        """
+        size = cached.size
+        if size > self.max_size:
+            return
+        with self._lock:
+            if cached.versions != tuple(self._versions[t] for t in tables):
+                return
+            if key in self._responses:
+                self._remove(key)
+            self._responses[key] = cached
+            self._size += size
+            while self._size > self.max_size:
+                self._remove(next(iter(self._responses)))
+
+    def bump(self, tables: Iterable[str]) -> None:
+        """
+        Increment the versions of tables, which invalidates the responses
+        that depend on them.
+
+        Parameters
+        ----------
+        tables : Iterable[str]
+            Names of the tables that have been changed
+        """
+        with self._lock:
+            for table in tables:
+                self._versions[table] += 1
+
+    def _remove(self, key: Hashable) -> None:
+        """
+        Remove a response. Must be called while holding the lock.
+
+        Parameters
+        ----------
+        key : Hashable
+            Key of the response
+        """
+        self._size -= self._responses.pop(key).size
+
+
+def table_names(sources: Iterable[type | Table]) -> tuple[str]:
+    """
+    Get the names of the tables of models and association tables.
+
+    Parameters
+    ----------
+    sources : Iterable[type | Table]
+        Models (e.g. `db.Node`) and association tables (e.g. `db.Member`).
+        For models that inherit from another model, the tables of both are
+        included.
+
+    Returns
+    -------
+    tuple[str]
+        Sorted names of the tables
+    """
+    names = set()
+    for source in sources:
+        if isinstance(source, Table):
+            names.add(source.name)
+        else:
+            names.update(table.name for table in inspect(source).tables)
+    return tuple(sorted(names))
+
+
+@event.listens_for(Session, "after_flush")
+def collect_changed_objects(session: Session, flush_context) -> None:
+    """
+    Collect the tables of the objects that are changed in a flush, including
+    the association tables of changed many-to-many relationships.
+    """
+    changed = session.info.setdefault(CHANGED_TABLES_KEY, set())
+    for obj in session.new | session.dirty | session.deleted:
+        mapper = object_mapper(obj)
+        changed.update(table.name for table in mapper.tables)
+        state = inspect(obj)
+        for relationship in mapper.relationships:
+            if relationship.secondary is not None and \
+                    state.attrs[relationship.key].history.has_changes():
+                changed.add(relationship.secondary.name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def collect_changed_tables(orm_execute_state: ORMExecuteState) -> None:
+    """
+    Collect the tables that are changed by INSERT, UPDATE and DELETE
+    statements that are executed directly, such as bulk updates.
+    """
+    if orm_execute_state.is_insert or orm_execute_state.is_update or \
+            orm_execute_state.is_delete:
+        orm_execute_state.session.info.setdefault(
+            CHANGED_TABLES_KEY, set()
+        ).add(orm_execute_state.statement.table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_responses(session: Session) -> None:
+    """
+    Increment the versions of the tables that have been changed, once the
+    changes are committed.
+    """
+    changed = session.info.pop(CHANGED_TABLES_KEY, None)
+    if changed:
+        ResponseCache().bump(changed)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def discard_changed_tables(session: Session, previous_transaction) -> None:
+    """Forget the changed tables of a transaction that is rolled back."""
+    session.info.pop(CHANGED_TABLES_KEY, None)
@@ -0,0 +1,459 @@
+"""
+Storage of large payloads outside of the relational database.
+
+Inputs, results and logs of algorithm runs can become large. To prevent that
+they bloat the database, they can be stored in a blob storage instead. The
+database then only keeps a reference to the blob, its size and its checksum.
+
+Two storage backends are available:
+
+*Local*
+    Blobs are stored as files in a directory on the server.
+
+*S3*
+    Blobs are stored in a bucket of an S3-compatible object storage (e.g. AWS
+    S3 or MinIO). This requires the optional `boto3` package.
+
+The storage is configured in the `blob_storage` section of the server
+configuration file. If that section is absent, all payloads are stored in the
+database.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import BinaryIO
+
+from vantage6.common import logger_name, Singleton
+from vantage6.server.globals import BLOB_STORAGE_MIN_SIZE
+
+try:
+    import boto3
+except ImportError:
+    boto3 = None
+
+module_name = logger_name(__name__)
+log = logging.getLogger(module_name)
+
+
+class BlobStorageError(Exception):
+    """Exception raised when a blob cannot be stored or retrieved."""
+    pass
+
+
+class StorageBackend(ABC):
+    """
+    Base class of blob storage backends. Blobs are identified by a key, which
+    is a relative path such as `result/<uuid>`.
+    """
+
+    @abstractmethod
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Store a blob.
+
+        Parameters
+        ----------
+        key : str
+            Key of the blob
+        data : bytes
+            Contents of the blob
+        """
+
+    def put_file(self, key: str, file: BinaryIO) -> None:
+        """
+        Store a blob from a file, from its current position onwards.
+        Backends that can copy a file without reading it into memory as a
+        whole override this.
+
+        Parameters
+        ----------
+        key : str
+            Key of the blob
+        file : BinaryIO
+            File-like object with the contents of the blob
+        """
+        self.put(key, file.read())
+
+    @abstractmethod
+    def get(self, key: str) -> bytes:
+        """
+        Retrieve a blob.
+
+        Parameters
+        ----------
+        key : str
+            Key of the blob
+
+        Returns
+        -------
+        bytes
+            Contents of the blob
+
+        Raises
+        ------
+        BlobStorageError
+            If the blob does not exist
+        """
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """
+        Delete a blob. Deleting a blob that does not exist is not an error.
+
+        Parameters
+        ----------
+        key : str
+            Key of the blob
+        """
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Store blobs as files in a local directory.
+
+    Parameters
+    ----------
+    path : str | Path
+        Directory in which the blobs are stored. It is created if it does not
+        exist.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path).resolve()
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def _file(self, key: str) -> Path:
+        """
+        Get the file in which a blob is stored.
+
+        Parameters
+        ----------
+        key : str
+            Key of the blob
+
+        Returns
+        -------
+        Path
+            Location of the blob
+
+        Raises
+        ------
+        BlobStorageError
+            If the key points outside of the storage directory
+        """
+        file_ = (self.path / key).resolve()
+        if self.path not in file_.parents:
+            raise BlobStorageError(f"Invalid blob key '{key}'")
+        return file_
+
+    def put(self, key: str, data: bytes) -> None:
+        self.put_file(key, io.BytesIO(data))
+
+    def put_file(self, key: str, file: BinaryIO) -> None:
+        file_ = self._file(key)
+        file_.parent.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first so that a blob is never read while
+        # it is only partially written
+        fd, tmp = tempfile.mkstemp(dir=file_.parent)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(file, f)
+            os.replace(tmp, file_)
+        except Exception:
+            os.unlink(tmp)
+            raise
+
+    def get(self, key: str) -> bytes:
+        try:
+            return self._file(key).read_bytes()
+        except FileNotFoundError as e:
+            raise BlobStorageError(f"Blob '{key}' does not exist") from e
+
+    def delete(self, key: str) -> None:
+        self._file(key).unlink(missing_ok=True)
+
+
+class S3StorageBackend(StorageBackend):
+    """
+    Store blobs in a bucket of an S3-compatible object storage.
+
+    Parameters
+    ----------
+    bucket : str
+        Name of the bucket. It should already exist.
+    prefix : str, optional
+        Prefix for the keys of the blobs, e.g. to share a bucket between
+        several servers
+    client : object, optional
+        S3 client to use. If not given, a `boto3` client is created with the
+        remaining keyword arguments.
+    endpoint_url : str, optional
+        URL of the object storage. Required for other storages than AWS S3.
+    access_key : str, optional
+        Access key of the object storage
+    secret_key : str, optional
+        Secret key of the object storage
+    region : str, optional
+        Region of the bucket
+    """
+
+    def __init__(self, bucket: str, prefix: str = '', client: object = None,
+                 endpoint_url: str = None, access_key: str = None,
+                 secret_key: str = None, region: str = None) -> None:
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        if client is None:
+            if boto3 is None:
+                raise BlobStorageError(
+                    "The S3 blob storage requires the 'boto3' package. "
+                    "Install it with `pip install boto3`."
+                )
+            client = boto3.client(
+                's3',
+                endpoint_url=endpoint_url,
+                aws_access_key_id=access_key,
+                aws_secret_access_key=secret_key,
+                region_name=region
+            )
+        self.client = client
+
+    def _key(self, key: str) -> str:
+        """Get the object key of a blob."""
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put(self, key: str, data: bytes) -> None:
+        self.client.put_object(
+            Bucket=self.bucket, Key=self._key(key), Body=data
+        )
+
+    def put_file(self, key: str, file: BinaryIO) -> None:
+        # uploads large files in parts
+        self.client.upload_fileobj(file, self.bucket, self._key(key))
+
+    def get(self, key: str) -> bytes:
+        try:
+            response = self.client.get_object(
+                Bucket=self.bucket, Key=self._key(key)
+            )
+        except Exception as e:
+            raise BlobStorageError(
+                f"Blob '{key}' could not be retrieved: {e}"
+            ) from e
+        return response['Body'].read()
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+
+class BlobStorage(metaclass=Singleton):
+    """
+    Blob storage of the server. As long as no backend is configured, payloads
+    are kept in the database.
+
+    Attributes
+    ----------
+    backend : StorageBackend | None
+        Backend in which the blobs are stored
+    min_size : int
+        Payloads smaller than this number of bytes are kept in the database
+    """
+
+    def __init__(self) -> None:
+        self.backend = None
+        self.min_size = BLOB_STORAGE_MIN_SIZE
+
+    def configure(self, config: dict | None, path: str | Path = None) -> None:
+        """
+        Configure the blob storage from the `blob_storage` section of the
+        server configuration.
+
+        Parameters
+        ----------
+        config : dict | None
+            Blob storage configuration. If None, payloads are stored in the
+            database.
+        path : str | Path, optional
+            Directory of the local storage. Overrides the `path` in the
+            configuration, which is used when the server runs in a Docker
+            container.
+
+        Raises
+        ------
+        BlobStorageError
+            If the configuration is invalid
+        """
+        if not config:
+            self.backend = None
+            return
+
+        type_ = config.get('type', 'local')
+        if type_ == 'local':
+            path = path or config.get('path')
+            if not path:
+                raise BlobStorageError(
+                    "A 'path' is required for the local blob storage"
+                )
+            self.backend = LocalStorageBackend(path)
+        elif type_ == 's3':
+            if not config.get('bucket'):
+                raise BlobStorageError(
+                    "A 'bucket' is required for the S3 blob storage"
+                )
+            self.backend = S3StorageBackend(
+                bucket=config['bucket'],
+                prefix=config.get('prefix', ''),
+                endpoint_url=config.get('endpoint_url'),
+                access_key=config.get('access_key'),
+                secret_key=config.get('secret_key'),
+                region=config.get('region')
+            )
+        else:
+            raise BlobStorageError(f"Unknown blob storage type '{type_}'")
+
+        self.min_size = config.get('min_size', BLOB_STORAGE_MIN_SIZE)
+        log.info(f"Storing payloads of at least {self.min_size} bytes in the "
+                 f"{type_} blob storage")
+
+    @property
+    def enabled(self) -> bool:
+        """Whether a blob storage backend is configured."""
+        return self.backend is not None
+
+    @staticmethod
+    def checksum(data: bytes) -> str:
+        """
+        Compute the checksum of a blob.
+
+        Parameters
+        ----------
+        data : bytes
+            Contents of the blob
+
+        Returns
+        -------
+        str
+            SHA-256 hex digest of the contents
+        """
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def checksum_file(file: BinaryIO) -> str:
+        """
+        Compute the checksum of a blob in a file, from its current position
+        onwards. The file is read in chunks, and returned to that position.
+
+        Parameters
+        ----------
+        file : BinaryIO
+            Seekable file-like object with the contents of the blob
+
+        Returns
+        -------
+        str
+            SHA-256 hex digest of the contents
+        """
+        start = file.tell()
+        sha256 = hashlib.sha256()
+        while chunk := file.read(io.DEFAULT_BUFFER_SIZE * 16):
+            sha256.update(chunk)
+        file.seek(start)
+        return sha256.hexdigest()
+
+    def store(self, kind: str, data: bytes) -> str:
+        """
+        Store a new blob.
+
+        Parameters
+        ----------
+        kind : str
+            Kind of payload, e.g. 'result'. Used as prefix of the key.
+        data : bytes
+            Contents of the blob
+
+        Returns
+        -------
+        str
+            Key of the blob
+        """
+        key = f"{kind}/{uuid.uuid4().hex}"
+        self.backend.put(key, data)
+        return key
+
+    def store_file(self, kind: str, file: BinaryIO) -> str:
+        """
+        Store a new blob from a file, without reading it into memory as a
+        whole.
+
+        Parameters
+        ----------
+        kind : str
+            Kind of payload, e.g. 'result'. Used as prefix of the key.
+        file : BinaryIO
+            File-like object with the contents of the blob
+
+        Returns
+        -------
+        str
+            Key of the blob
+        """
+        key = f"{kind}/{uuid.uuid4().hex}"
+        self.backend.put_file(key, file)
+        return key
+
+    def load(self, key: str, checksum: str | None = None) -> bytes:
+        """
+        Load a blob and verify its checksum.
+
+        Parameters
+        ----------
+        key : str
+            Key of the blob
+        checksum : str | None
+            Expected checksum of the blob. Not verified if None.
+
+        Returns
+        -------
+        bytes
+            Contents of the blob
+
+        Raises
+        ------
+        BlobStorageError
+            If no backend is configured, the blob does not exist or its
+            checksum does not match
+        """
+        if not self.enabled:
+            raise BlobStorageError(
+                f"Blob '{key}' cannot be loaded: no blob storage is configured"
+            )
+        data = self.backend.get(key)
+        if checksum and self.checksum(data) != checksum:
+            raise BlobStorageError(f"Checksum of blob '{key}' does not match")
+        return data
+
+    def remove(self, key: str) -> None:
+        """
+        Delete a blob. Failures are logged, as an orphaned blob should not
+        prevent the deletion of its owner.
+
+        Parameters
+        ----------
+        key : str
+            Key of the blob
+        """
+        if not self.enabled:
+            log.warning(f"Blob '{key}' not deleted: no blob storage configured")
+            return
+        try:
+            self.backend.delete(key)
+        except Exception as e:
+            log.warning(f"Could not delete blob '{key}': {e}")
@@ -1,6 +1,5 @@
 import logging
 import jwt
-import datetime as dt
 
 from flask import request, session
 from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
@@ -12,6 +11,7 @@ from vantage6.server import db
 from vantage6.server.model.authenticatable import Authenticatable
 from vantage6.server.model.rule import Operation, Scope
 from vantage6.server.model.base import DatabaseSessionManager
+from vantage6.server.last_seen import LastSeenBuffer
 
 ALL_NODES_ROOM = 'all_nodes'
 
@@ -336,9 +336,11 @@ class DefaultSocketNamespace(Namespace):
         ping and sets them as online.
         """
         auth = db.Authenticatable.get(session.auth_id)
-        auth.status = 'online'
-        auth.last_seen = dt.datetime.utcnow()
-        auth.save()
+        LastSeenBuffer().touch(auth.id)
+        # the status only has to be written if it changes
+        if auth.status != 'online':
+            auth.status = 'online'
+            auth.save()
 
     def __join_room_and_notify(self, room: str) -> None:
         """
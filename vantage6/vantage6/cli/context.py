@@ -91,6 +91,30 @@ class ServerContext(AppContext):
 
         return uri
 
+    def get_blob_storage_path(self) -> Path | None:
+        """
+        Obtain the directory of the local blob storage from the environment or
+        the configuration. The `VANTAGE6_BLOB_STORAGE_PATH` environment
+        variable is used by the Docker container.
+
+        Returns
+        -------
+        Path | None
+            Directory of the local blob storage, or None if no local blob
+            storage is configured
+        """
+        path = os.environ.get("VANTAGE6_BLOB_STORAGE_PATH")
+        if path:
+            return Path(path)
+
+        config = self.config.get('blob_storage') or {}
+        if config.get('type', 'local') != 'local' or not config.get('path'):
+            return None
+
+        # relative paths are relative to the data directory, like the path
+        # of a local database
+        return self.data_dir / config['path']
+
     @property
     def docker_container_name(self) -> str:
         """
@@ -381,6 +405,22 @@ class NodeContext(AppContext):
             f"{self.docker_container_name}-squid-vol"
         )
 
+    @property
+    def docker_dataset_cache_volume_name(self) -> str:
+        """
+        Docker volume in which the databases that are converted to parquet
+        are stored.
+
+        Returns
+        -------
+        str
+            Docker volume name
+        """
+        return os.environ.get(
+            'DATASET_CACHE_VOLUME_NAME',
+            f"{self.docker_container_name}-dataset-cache-vol"
+        )
+
     @property
     def proxy_log_file(self):
         return self.log_file_name(type_="proxy_server")
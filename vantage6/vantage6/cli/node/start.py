@@ -169,6 +169,9 @@ def cli_node_start(name: str, config: str, system_folders: bool, image: str,
     vpn_volume = docker_client.volumes.create(ctx.docker_vpn_volume_name)
     ssh_volume = docker_client.volumes.create(ctx.docker_ssh_volume_name)
     squid_volume = docker_client.volumes.create(ctx.docker_squid_volume_name)
+    dataset_cache_volume = docker_client.volumes.create(
+        ctx.docker_dataset_cache_volume_name
+    )
 
     info("Creating file & folder mounts")
     # FIXME: should obtain mount points from DockerNodeContext
@@ -179,6 +182,7 @@ def cli_node_start(name: str, config: str, system_folders: bool, image: str,
         ("/mnt/vpn", vpn_volume.name),
         ("/mnt/ssh", ssh_volume.name),
         ("/mnt/squid", squid_volume.name),
+        ("/mnt/dataset-cache", dataset_cache_volume.name),
         ("/mnt/config", str(ctx.config_dir)),
         ("/var/run/docker.sock", "/var/run/docker.sock"),
     ]
@@ -233,6 +237,7 @@ def cli_node_start(name: str, config: str, system_folders: bool, image: str,
     env = {
         "DATA_VOLUME_NAME": data_volume.name,
         "VPN_VOLUME_NAME": vpn_volume.name,
+        "DATASET_CACHE_VOLUME_NAME": dataset_cache_volume.name,
         "PRIVATE_KEY": "/mnt/private_key.pem"
     }
 
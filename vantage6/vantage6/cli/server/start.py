@@ -140,6 +140,16 @@ def cli_server_start(ctx: ServerContext, ip: str, port: int, image: str,
                 "is reachable from the Docker container")
         info("Consider using the docker-compose method to start a server")
 
+    # mount the directory of the local blob storage, if any
+    blob_storage_path = ctx.get_blob_storage_path()
+    if blob_storage_path:
+        os.makedirs(blob_storage_path, exist_ok=True)
+        mounts.append(docker.types.Mount(
+            "/mnt/blob-storage/", str(blob_storage_path), type="bind"
+        ))
+        environment_vars = environment_vars or {}
+        environment_vars["VANTAGE6_BLOB_STORAGE_PATH"] = "/mnt/blob-storage"
+
     # Create a docker network for the server and other services like RabbitMQ
     # to reside in
     server_network_mgr = NetworkManager(